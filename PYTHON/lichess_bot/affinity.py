@@ -0,0 +1,219 @@
+"""CPU pinning, nice levels and CPU accounting per class of work.
+
+The bot runs three kinds of work on the same machine:
+- ``engine``:   C engine subprocesses choosing moves in live games
+- ``analysis``: post-game analysis (the analyzer script and its Stockfish)
+- ``network``:  the bot's own Python threads (event stream, game streams, HTTP)
+
+Each class gets a ``CpuPolicy`` (allowed CPUs and a nice level). Policies are
+applied to a subprocess right after it is launched and to a Python thread when
+it starts. Children inherit affinity and nice from their parent, so Stockfish
+started by a pinned analyzer stays on the analysis cores.
+
+By default live engines get the first ``reserved`` cores and analysis gets the
+remaining ones at a lower priority; network threads are left unpinned.
+
+CPU time is accumulated per class: subprocesses report their own rusage when
+reaped (which includes their reaped children), engines started by
+python-chess are read from /proc before they quit, and ``network`` is this
+process's own CPU time.
+"""
+
+import logging
+import os
+import resource
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional
+
+from PYTHON.stockfish_analysis.cpus import cpu_list_arg, format_cpu_list, parse_cpu_list  # noqa: F401 (re-exported)
+
+from . import metrics
+
+CPU_CLASSES = ("engine", "analysis", "network")
+
+CPU_SECONDS = metrics.REGISTRY.counter(
+    "lichess_bot_cpu_seconds_total", "CPU time used per class of work", ("cpu_class",)
+)
+
+
+def available_cpus() -> List[int]:
+    """CPUs this process may run on (respects an outer taskset/cgroup)."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return list(range(os.cpu_count() or 1))
+
+
+@dataclass(frozen=True)
+class CpuPolicy:
+    cpus: Optional[FrozenSet[int]] = None  # None = leave affinity alone
+    nice: int = 0  # added to the inherited nice level; 0 = unchanged
+
+    def apply_to_pid(self, pid: int) -> None:
+        """Pin a launched subprocess and lower its priority. Failures are logged, not raised."""
+        try:
+            if self.cpus:
+                os.sched_setaffinity(pid, self.cpus)
+            if self.nice:
+                os.setpriority(os.PRIO_PROCESS, pid, os.getpriority(os.PRIO_PROCESS, pid) + self.nice)
+        except (AttributeError, OSError) as e:
+            logging.debug("Could not apply CPU policy to pid %s: %s", pid, e)
+
+    def apply_to_process(self, pid: int) -> None:
+        """Apply to every existing thread of a running process (e.g. an engine's search threads)."""
+        try:
+            tids = [int(t) for t in os.listdir(f"/proc/{pid}/task")]
+        except (OSError, ValueError):
+            tids = [pid]
+        for tid in tids:
+            self.apply_to_pid(tid)
+
+    def apply_to_current_thread(self) -> None:
+        """Linux scopes affinity and nice per thread, so this only affects the calling thread."""
+        self.apply_to_pid(threading.get_native_id())
+
+    def describe(self) -> str:
+        cpus = format_cpu_list(self.cpus) if self.cpus else "any"
+        return f"cpus={cpus} nice=+{self.nice}"
+
+
+@dataclass(frozen=True)
+class AffinityConfig:
+    engine: CpuPolicy = field(default_factory=CpuPolicy)
+    analysis: CpuPolicy = field(default_factory=CpuPolicy)
+    network: CpuPolicy = field(default_factory=CpuPolicy)
+
+    def describe(self) -> str:
+        return ", ".join(f"{name}: {getattr(self, name).describe()}" for name in CPU_CLASSES)
+
+
+def default_affinity(reserved: int = 1, analysis_nice: int = 10) -> AffinityConfig:
+    """Keep live engines on the first ``reserved`` cores and analysis on the rest.
+
+    On a machine with too few cores to split, nothing is pinned and analysis
+    only runs at a lower priority.
+    """
+    cpus = available_cpus()
+    if reserved <= 0 or len(cpus) <= reserved:
+        return AffinityConfig(analysis=CpuPolicy(nice=analysis_nice))
+    return AffinityConfig(
+        engine=CpuPolicy(cpus=frozenset(cpus[:reserved])),
+        analysis=CpuPolicy(cpus=frozenset(cpus[reserved:]), nice=analysis_nice),
+    )
+
+
+class CpuUsage:
+    """Thread-safe accumulator of CPU seconds per class."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seconds: Dict[str, float] = {}
+        self._own_reported = 0.0
+
+    def add(self, cpu_class: str, seconds: float) -> None:
+        with self._lock:
+            self._seconds[cpu_class] = self._seconds.get(cpu_class, 0.0) + seconds
+        CPU_SECONDS.inc(seconds, cpu_class=cpu_class)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return CPU seconds per class; ``network`` is this process's own CPU time."""
+        ru = resource.getrusage(resource.RUSAGE_SELF)
+        own = ru.ru_utime + ru.ru_stime
+        with self._lock:
+            delta = max(0.0, own - self._own_reported)
+            self._own_reported += delta
+            self._seconds["network"] = self._own_reported
+            out = dict(self._seconds)
+        CPU_SECONDS.inc(delta, cpu_class="network")
+        return {c: out.get(c, 0.0) for c in CPU_CLASSES}
+
+    def report(self) -> str:
+        return " ".join(f"{c}={s:.2f}s" for c, s in self.snapshot().items())
+
+
+CPU_USAGE = CpuUsage()
+
+
+def process_cpu_seconds(pid: int) -> float:
+    """CPU time used so far by a running process (all its threads), or 0.0 if unknown.
+
+    For children that are not started through ``launch``, e.g. engines started
+    by python-chess; read before the process exits.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+        # utime and stime are fields 14 and 15 of stat; fields[0] here is field 3
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+_measured_popen_cls = None
+
+
+def _measured_popen():
+    """Return a Popen subclass that keeps the child's rusage when it is reaped.
+
+    ``subprocess`` reaps children with ``os.waitpid``, which discards the
+    resource usage. The subclass reaps with ``os.wait4`` in its public
+    ``poll`` and ``wait`` (which ``communicate`` and the context manager go
+    through) and sets ``returncode`` itself, so ``subprocess`` never waits
+    for the child again. The rusage includes descendants the child itself
+    waited for. Built on first use so importing this module does not import
+    ``subprocess``.
+    """
+    global _measured_popen_cls
+    if _measured_popen_cls is None:
+        import subprocess
+        import time
+
+        class MeasuredPopen(subprocess.Popen):
+            cpu_seconds: float = 0.0
+
+            def _wait4(self, flags: int) -> bool:
+                """Reap the child if it has exited; False while it is still running."""
+                if self.returncode is not None:
+                    return True
+                try:
+                    pid, status, ru = os.wait4(self.pid, flags)
+                except ChildProcessError:
+                    return True  # already reaped; Popen reports what it knows
+                if pid != self.pid:
+                    return False
+                self.cpu_seconds = ru.ru_utime + ru.ru_stime
+                self.returncode = os.waitstatus_to_exitcode(status)
+                return True
+
+            def poll(self):
+                self._wait4(os.WNOHANG)
+                return super().poll()
+
+            def wait(self, timeout=None):
+                if timeout is None:
+                    self._wait4(0)
+                else:
+                    deadline = time.monotonic() + timeout
+                    delay = 0.0005
+                    while not self._wait4(os.WNOHANG):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise subprocess.TimeoutExpired(self.args, timeout)
+                        time.sleep(min(delay, remaining))
+                        delay = min(delay * 2, 0.05)
+                return super().wait(timeout)
+
+        _measured_popen_cls = MeasuredPopen
+    return _measured_popen_cls
+
+
+def launch(args: List[str], *, policy: Optional[CpuPolicy] = None, **popen_kwargs):
+    """Start a subprocess and apply ``policy`` to it immediately.
+
+    The returned Popen has a ``cpu_seconds`` attribute, filled in once it is reaped.
+    """
+    proc = _measured_popen()(args, **popen_kwargs)
+    if policy is not None:
+        policy.apply_to_pid(proc.pid)
+    return proc
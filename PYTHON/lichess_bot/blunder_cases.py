@@ -0,0 +1,178 @@
+"""Store of blunder regression cases, written by tools/generate_blunder_tests.py.
+
+Cases live in a JSON lines file (``tests/blunder_cases.jsonl``), one case per
+line, keyed by the position (its EPD, see stockfish_analysis/positions.py) and
+the blunder move in UCI. The same blunder reached from several games, at other
+move numbers or by a transposition is one case; the games it came from are
+listed with it and their number is its ``weight``.
+
+The store keeps an index of the file in memory, so adding a case or updating
+it is a dictionary lookup plus one appended line; nothing is rewritten. When
+a case changes, its new line supersedes the old one (the last line for a key
+wins) and the file is compacted once superseded lines make up most of it.
+
+``tests/test_blunders_all.py`` reads the cases with ``load_cases`` when pytest
+collects it.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from PYTHON.stockfish_analysis.positions import position_key
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "tests", "blunder_cases.jsonl")
+
+
+def case_key(fen: str, blunder_uci: str) -> str:
+    return f"{position_key(fen)} {blunder_uci}"
+
+
+@dataclass
+class BlunderCase:
+    fen: str  # position before the blunder
+    blunder: str  # UCI
+    best: Optional[str] = None  # UCI of the analysis' best suggestion
+    ply: int = 0
+    side: str = ""  # "W" or "B"
+    games: List[str] = field(default_factory=list)  # lichess game ids of the logs it came from
+
+    @property
+    def key(self) -> str:
+        return case_key(self.fen, self.blunder)
+
+    @property
+    def weight(self) -> int:
+        """How many games the blunder was logged in (at least 1)."""
+        return max(1, len(self.games))
+
+    @property
+    def label(self) -> str:
+        """Test id, e.g. ``ply23_B_d8h4_best_g7g6``."""
+        label = f"ply{self.ply}_{self.side}_{self.blunder}"
+        return label + f"_best_{self.best}" if self.best else label
+
+
+def _read(path: str) -> Iterator[BlunderCase]:
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                fields = json.loads(line)
+                if "game" in fields:  # written before cases listed all their games
+                    game = fields.pop("game")
+                    fields.setdefault("games", [game] if game else [])
+                yield BlunderCase(**fields)
+            except (ValueError, TypeError):
+                continue  # a line cut short by an interrupted run
+
+
+def _ends_mid_line(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+    except FileNotFoundError:
+        return False
+
+
+def load_cases(path: str = DEFAULT_PATH) -> List[BlunderCase]:
+    """All cases of a store file in the order they were first added; [] if there is no file."""
+    latest: Dict[str, BlunderCase] = {}
+    for case in _read(path):
+        latest[case.key] = case
+    return list(latest.values())
+
+
+class BlunderCaseStore:
+    """Indexed, append-only view of a case file; use as a context manager or call ``close``."""
+
+    # Compact on close when superseded lines outnumber the live cases
+    COMPACT_RATIO = 1.0
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._cases: Dict[str, BlunderCase] = {}
+        self._lines = 0
+        for case in _read(path):
+            self._cases[case.key] = case
+            self._lines += 1
+        self._out = None
+
+    def __len__(self) -> int:
+        return len(self._cases)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._cases
+
+    def get(self, fen: str, blunder_uci: str) -> Optional[BlunderCase]:
+        return self._cases.get(case_key(fen, blunder_uci))
+
+    def cases(self) -> List[BlunderCase]:
+        return list(self._cases.values())
+
+    def add(self, case: BlunderCase) -> str:
+        """Add a case, or merge it into the stored case for the same position and move.
+
+        Merging takes the new best move (if any) and adds the new games.
+        Returns "added", "updated" (the best move or the games changed) or
+        "unchanged".
+        """
+        current = self._cases.get(case.key)
+        if current is not None:
+            best = case.best or current.best
+            games = current.games + [g for g in case.games if g not in current.games]
+            if best == current.best and games == current.games:
+                return "unchanged"
+            case = BlunderCase(**{**asdict(current), "best": best, "games": games})
+            status = "updated"
+        else:
+            status = "added"
+        self._cases[case.key] = case
+        self._append(case)
+        return status
+
+    def _append(self, case: BlunderCase) -> None:
+        if self._out is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            cut_short = _ends_mid_line(self.path)
+            self._out = open(self.path, "a", encoding="utf-8")
+            if cut_short:
+                self._out.write("\n")  # keep the partial line of an interrupted run off the next case
+        self._out.write(json.dumps(asdict(case)) + "\n")
+        self._lines += 1
+
+    def compact(self) -> None:
+        """Rewrite the file with one line per case, in place of superseded ones."""
+        self._close_out()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for case in self._cases.values():
+                f.write(json.dumps(asdict(case)) + "\n")
+        os.replace(tmp_path, self.path)
+        self._lines = len(self._cases)
+
+    def _close_out(self) -> None:
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+
+    def close(self) -> None:
+        self._close_out()
+        if self._lines - len(self._cases) > self.COMPACT_RATIO * len(self._cases):
+            self.compact()
+
+    def __enter__(self) -> "BlunderCaseStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,10 +1,18 @@
+from __future__ import annotations
+
+import contextlib
 import os
+import queue
 import shutil
-import subprocess
 import logging
-from typing import Optional, Tuple
+import time
+from typing import TYPE_CHECKING, Iterator, Optional, Tuple
+
+from . import metrics
+from .affinity import CPU_USAGE, CpuPolicy, launch
 
-import chess
+if TYPE_CHECKING:
+    import chess
 
 
 class RandomEngine:
@@ -20,8 +28,17 @@ class RandomEngine:
     - If the binary is missing or returns an invalid/illegal move, raise.
     """
 
-    def __init__(self, *, engine_path: Optional[str] = None, max_time_sec: float = 2.0, depth: Optional[int] = None):
+    def __init__(
+        self,
+        *,
+        engine_path: Optional[str] = None,
+        max_time_sec: float = 2.0,
+        depth: Optional[int] = None,
+        cpu_policy: Optional[CpuPolicy] = None,
+    ):
         self.max_time_sec = max_time_sec
+        # CPU pinning / nice level applied to every engine subprocess (see affinity.py)
+        self.cpu_policy = cpu_policy
         # depth is accepted for compatibility with existing callers but is unused;
         # the C engine handles its own scoring/selection.
         self.depth = depth
@@ -34,6 +51,9 @@ class RandomEngine:
             )
         )
         self.engine_path = engine_path or default_path
+        # Calls made and wall time spent in them, for per-test and benchmark reports
+        self.calls = 0
+        self.call_seconds = 0.0
         if not os.path.isfile(self.engine_path) or not os.access(self.engine_path, os.X_OK):
             raise FileNotFoundError(
                 f"C engine not found or not executable at '{self.engine_path}'. "
@@ -41,20 +61,36 @@ class RandomEngine:
             )
 
     def _call_engine(self, args: list[str], *, timeout: float) -> str:
+        started = time.perf_counter()
         try:
-            proc = subprocess.run(
-                [self.engine_path] + args,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                check=True,
-            )
-        except subprocess.CalledProcessError as e:
-            stderr = (e.stderr or "").strip()
-            raise RuntimeError(f"C engine failed: {stderr or e}") from e
-        except subprocess.TimeoutExpired as e:
-            raise TimeoutError("C engine timed out") from e
-        out = (proc.stdout or "").strip()
+            with metrics.ENGINE_LATENCY.time():
+                return self._run_engine(args, timeout=timeout)
+        finally:
+            self.calls += 1
+            self.call_seconds += time.perf_counter() - started
+
+    def _run_engine(self, args: list[str], *, timeout: float) -> str:
+        import subprocess
+
+        with launch(
+            [self.engine_path] + args,
+            policy=self.cpu_policy,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        ) as proc:
+            try:
+                stdout, stderr = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired as e:
+                proc.kill()
+                proc.communicate()
+                raise TimeoutError("C engine timed out") from e
+            finally:
+                CPU_USAGE.add("engine", proc.cpu_seconds)
+        if proc.returncode != 0:
+            stderr = (stderr or "").strip()
+            raise RuntimeError(f"C engine failed: {stderr or f'exit status {proc.returncode}'}")
+        out = (stdout or "").strip()
         return out
 
     def choose_move(self, board: chess.Board) -> chess.Move:
@@ -62,6 +98,8 @@ class RandomEngine:
         return mv
 
     def choose_move_with_explanation(self, board: chess.Board, *, time_budget_sec: float) -> Tuple[Optional[chess.Move], str]:
+        import chess
+
         # Collect legal moves and send to engine as plain UCI tokens.
         legal = list(board.legal_moves)
         if not legal:
@@ -99,6 +137,8 @@ class RandomEngine:
         where explanations are concise JSON snippets from the engine. All logic is
         delegated to the C binary; no scoring is done in Python.
         """
+        import chess
+
         legal = list(board.legal_moves)
         if not legal:
             return 0.0, "no_legal_moves", None, "no_best_move"
@@ -139,3 +179,29 @@ class RandomEngine:
             pass
 
         return cand_score, cand_expl, best_move, best_expl
+
+
+class EnginePool:
+    """
+    A fixed set of RandomEngine instances, each lent to one thread at a time.
+
+    Engines are created once and reused across games, puzzles or tests
+    instead of being built per call site. Use ``with pool.acquire() as engine``.
+    """
+
+    def __init__(self, size: int = 1, **engine_kwargs):
+        self.engines = [RandomEngine(**engine_kwargs) for _ in range(max(1, size))]
+        self._idle: "queue.Queue[RandomEngine]" = queue.Queue()
+        for engine in self.engines:
+            self._idle.put(engine)
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    @contextlib.contextmanager
+    def acquire(self) -> Iterator[RandomEngine]:
+        engine = self._idle.get()
+        try:
+            yield engine
+        finally:
+            self._idle.put(engine)
@@ -1,10 +1,16 @@
+from __future__ import annotations
+
 import json
 import logging
 import time
-from typing import Dict, Generator, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Generator, Optional, Tuple
 
 import requests
-import chess
+
+from . import metrics
+
+if TYPE_CHECKING:
+    import chess
 
 
 LICHESS_API = "https://lichess.org"
@@ -20,22 +26,37 @@ class LichessAPI:
             "User-Agent": "minimal-lichess-bot/0.1 (+https://lichess.org)"
         })
 
-    def _request(self, method: str, url: str, *, raise_for_status: bool = False, **kwargs) -> requests.Response:
-        """Wrapper around session.request that logs every request/response.
+    def _request(
+        self,
+        method: str,
+        url: str,
+        *,
+        endpoint: Optional[str] = None,
+        raise_for_status: bool = False,
+        **kwargs,
+    ) -> requests.Response:
+        """Wrapper around session.request that logs and measures every request/response.
 
         - Logs start (method+URL) and end (status, elapsed).
         - On 4xx/5xx, logs a warning with a small snippet of the response body.
+        - Records latency and status code per `endpoint` (a URL template without ids).
         - Optionally raises for status.
         """
+        endpoint = endpoint or url.replace(LICHESS_API, "")
         t0 = time.monotonic()
-        logging.info(f"HTTP {method} {url} -> sending")
+        logging.debug("HTTP %s %s -> sending", method, url)
         try:
             r = self.session.request(method, url, **kwargs)
         except Exception as e:
-            logging.error(f"HTTP {method} {url} -> exception: {e}")
+            logging.error("HTTP %s %s -> exception: %s", method, url, e)
+            metrics.HTTP_RESPONSES.inc(method=method, endpoint=endpoint, status="error")
             raise
         elapsed = time.monotonic() - t0
         status = r.status_code
+        metrics.HTTP_LATENCY.observe(elapsed, method=method, endpoint=endpoint)
+        metrics.HTTP_RESPONSES.inc(method=method, endpoint=endpoint, status=str(status))
+        if status == 429:
+            metrics.HTTP_RATE_LIMITED.inc(method=method, endpoint=endpoint)
         if status >= 400:
             # Log a brief error body snippet if available
             snippet = None
@@ -45,11 +66,11 @@ class LichessAPI:
             except Exception:
                 snippet = None
             if snippet:
-                logging.warning(f"HTTP {method} {url} -> {status} in {elapsed:.2f}s body='{snippet}'")
+                logging.warning("HTTP %s %s -> %s in %.2fs body='%s'", method, url, status, elapsed, snippet)
             else:
-                logging.warning(f"HTTP {method} {url} -> {status} in {elapsed:.2f}s")
+                logging.warning("HTTP %s %s -> %s in %.2fs", method, url, status, elapsed)
         else:
-            logging.info(f"HTTP {method} {url} -> {status} in {elapsed:.2f}s")
+            logging.debug("HTTP %s %s -> %s in %.2fs", method, url, status, elapsed)
         if raise_for_status:
             r.raise_for_status()
         return r
@@ -57,20 +78,27 @@ class LichessAPI:
     def stream_events(self) -> Generator[Dict, None, None]:
         url = f"{LICHESS_API}/api/stream/event"
         backoff = 0.5
+        first_attempt = True
         while True:
+            if not first_attempt:
+                metrics.STREAM_RECONNECTS.inc()
+            first_attempt = False
             try:
                 # Use NDJSON Accept and no timeout for long-lived stream
                 headers = {"Accept": "application/x-ndjson"}
-                with self._request("GET", url, headers=headers, stream=True, timeout=None) as r:
+                with self._request(
+                    "GET", url, endpoint="/api/stream/event", headers=headers, stream=True, timeout=None
+                ) as r:
                     r.raise_for_status()
                     backoff = 0.5  # reset on success
+                    metrics.STREAM_CONNECTED.set(1)
                     for line in r.iter_lines(decode_unicode=True):
                         if not line:
                             continue
                         try:
                             yield json.loads(line)
                         except json.JSONDecodeError:
-                            logging.debug(f"Skipping non-JSON line: {line}")
+                            logging.debug("Skipping non-JSON line: %s", line)
             except requests.HTTPError as e:
                 status = getattr(e.response, "status_code", None)
                 if status == 429:
@@ -79,18 +107,24 @@ class LichessAPI:
                     backoff = min(8.0, backoff * 2)
                     continue
                 raise
+            finally:
+                metrics.STREAM_CONNECTED.set(0)
 
     def accept_challenge(self, challenge_id: str) -> None:
         url = f"{LICHESS_API}/api/challenge/{challenge_id}/accept"
-        self._request("POST", url, timeout=30, raise_for_status=True)
+        self._request("POST", url, endpoint="/api/challenge/{id}/accept", timeout=30, raise_for_status=True)
 
     def decline_challenge(self, challenge_id: str, reason: str = "generic") -> None:
         url = f"{LICHESS_API}/api/challenge/{challenge_id}/decline"
         data = {"reason": reason}
-        self._request("POST", url, data=data, timeout=30, raise_for_status=True)
+        self._request(
+            "POST", url, endpoint="/api/challenge/{id}/decline", data=data, timeout=30, raise_for_status=True
+        )
 
     def join_game_stream(self, game_id: str, my_color: Optional[str]) -> Tuple[chess.Board, str]:
         """Deprecated: use stream_game_events and parse initial state there."""
+        import chess
+
         # Fallback to initial behavior for compatibility
         url = f"{LICHESS_API}/api/board/game/stream/{game_id}"
         board = chess.Board()
@@ -128,7 +162,9 @@ class LichessAPI:
     def stream_game_events(self, game_id: str) -> Generator[Dict, None, None]:
         url = f"{LICHESS_API}/api/board/game/stream/{game_id}"
         headers = {"Accept": "application/x-ndjson"}
-        with self._request("GET", url, headers=headers, stream=True, timeout=None) as r:
+        with self._request(
+            "GET", url, endpoint="/api/board/game/stream/{id}", headers=headers, stream=True, timeout=None
+        ) as r:
             r.raise_for_status()
             for line in r.iter_lines(decode_unicode=True):
                 if not line:
@@ -136,19 +172,20 @@ class LichessAPI:
                 try:
                     yield json.loads(line)
                 except json.JSONDecodeError:
-                    logging.debug(f"Skipping non-JSON line in game {game_id}: {line}")
+                    logging.debug("Skipping non-JSON line in game %s: %s", game_id, line)
 
     def make_move(self, game_id: str, move: chess.Move) -> None:
         url = f"{LICHESS_API}/api/board/game/{game_id}/move/{move.uci()}"
-        r = self._request("POST", url, timeout=30)
+        endpoint = "/api/board/game/{id}/move/{move}"
+        r = self._request("POST", url, endpoint=endpoint, timeout=30)
         if r.status_code in (400, 409):
             # Likely not our turn or move already played; do not retry to avoid spam
             r.raise_for_status()
             return
         if r.status_code == 429:
-            logging.warning(f"HTTP POST {url} -> 429; retrying once after 0.5s")
+            logging.warning("HTTP POST %s -> 429; retrying once after 0.5s", url)
             time.sleep(0.5)
-            r = self._request("POST", url, timeout=30)
+            r = self._request("POST", url, endpoint=endpoint, timeout=30)
         r.raise_for_status()
 
     def get_game_state(self, game_id: str) -> Optional[Dict]:
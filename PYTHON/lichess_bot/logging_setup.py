@@ -0,0 +1,132 @@
+"""Queue-based logging for the bot.
+
+Game threads race the clock, so they should not block on terminal or file I/O.
+``configure_logging`` installs a single ``QueueHandler`` on the root logger;
+records are handed to a background ``QueueListener`` thread which formats and
+writes them. Messages use lazy ``%s`` arguments, so the string is only built
+on the writer thread and only for records that survive level checks and
+sampling.
+
+DEBUG output can be thinned per game with ``GameDebugSampler``: game threads
+are named ``game-<id>``, so the thread name is used as the per-game key. A
+game thread calls ``end_game_logging`` when its game is over, so the sampler
+does not keep state for every game the bot has played.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+LOG_FORMAT = "[%(asctime)s] %(levelname)s %(processName)s/%(threadName)s: %(message)s"
+
+
+@dataclass
+class LogConfig:
+    level: str = "INFO"
+    # Keep 1 of every N DEBUG records per game thread (1 keeps all)
+    debug_every: int = 1
+    # Keep at most this many DEBUG records per second per game thread (0 = unlimited)
+    debug_per_sec: float = 0.0
+
+
+class GameDebugSampler(logging.Filter):
+    """Sample and rate-limit DEBUG records per thread; INFO and above always pass."""
+
+    def __init__(self, every: int = 1, per_sec: float = 0.0):
+        super().__init__()
+        self.every = max(1, int(every))
+        self.per_sec = max(0.0, float(per_sec))
+        self._seen: Dict[str, int] = {}
+        self._windows: Dict[str, Tuple[float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        key = record.threadName or ""
+        if self.every > 1:
+            n = self._seen.get(key, 0)
+            self._seen[key] = n + 1
+            if n % self.every:
+                return False
+        if self.per_sec > 0:
+            now = time.monotonic()
+            start, count = self._windows.get(key, (now, 0))
+            if now - start >= 1.0:
+                start, count = now, 0
+            if count >= self.per_sec:
+                self._windows[key] = (start, count)
+                return False
+            self._windows[key] = (start, count + 1)
+        return True
+
+    def forget(self, thread_name: str) -> None:
+        """Drop the counters of a thread whose game is over."""
+        self._seen.pop(thread_name, None)
+        self._windows.pop(thread_name, None)
+
+
+def end_game_logging() -> None:
+    """Evict the calling game thread from the DEBUG samplers on the root logger."""
+    name = threading.current_thread().name
+    for handler in logging.getLogger().handlers:
+        for f in handler.filters:
+            if isinstance(f, GameDebugSampler):
+                f.forget(name)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock ``prepare`` formats the message on the calling thread. Records
+    stay in this process, so they can be enqueued as-is.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(config: LogConfig, stream=None) -> logging.handlers.QueueListener:
+    """Route all logging through a queue to a background writer thread.
+
+    Safe to call more than once; the previous listener is stopped and replaced.
+    """
+    global _listener
+    stop_logging()
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.setLevel(getattr(logging, config.level.upper(), logging.INFO))
+
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(q)
+    if config.debug_every > 1 or config.debug_per_sec > 0:
+        handler.addFilter(GameDebugSampler(config.debug_every, config.debug_per_sec))
+    root.addHandler(handler)
+
+    _listener = logging.handlers.QueueListener(q, writer, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the background writer, if running."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -1,368 +1,571 @@
+"""Lichess bot entry point.
+
+Startup only imports what the event loop needs before it connects (requests,
+logging, metrics). python-chess, subprocess, multiprocessing and the HTTP
+server are imported on first use: when the first game starts, when a
+worker pool or metrics port is requested, or at game end for analysis.
+``tests/test_startup.py`` enforces this and an import-time budget.
+"""
+
 import argparse
-import json
 import logging
 import os
 import threading
-import time
 from typing import Optional
 
-import chess
-import chess.pgn
-import subprocess
-import sys
-
+from . import metrics
+from .affinity import CPU_USAGE, AffinityConfig, CpuPolicy, cpu_list_arg, default_affinity, process_cpu_seconds
 from .engine import RandomEngine
 from .lichess_api import LichessAPI
+from .logging_setup import LogConfig, configure_logging, end_game_logging
 from .utils import backoff_sleep, get_and_increment_version
 
+# Per-game post-game analysis progress, kept next to the game logs
+ANALYSIS_PROGRESS_FILE = "lichess_bot_analysis_progress.sqlite"
+# Unix socket of a running analysis_daemon.py to send post-game analysis to (unset = analyse in-process)
+ANALYSIS_SOCKET_ENV = "LICHESS_BOT_ANALYSIS_SOCKET"
+# Longest wait for the daemon to accept a job or send its next ply before falling back to in-process analysis
+ANALYSIS_DAEMON_TIMEOUT_SEC = 300.0
 
-def run_bot(log_level: str = "INFO", decline_correspondence: bool = False) -> None:
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper(), logging.INFO),
-        format="[%(asctime)s] %(levelname)s %(threadName)s: %(message)s",
-    )
 
-    token = os.getenv("LICHESS_TOKEN")
-    if not token:
-        raise RuntimeError("LICHESS_TOKEN environment variable is required")
+def handle_game(
+    api: LichessAPI,
+    engine: RandomEngine,
+    game_id: str,
+    bot_version: int,
+    my_color: Optional[str] = None,
+    affinity: Optional[AffinityConfig] = None,
+) -> None:
+    """Play a single game to completion, then write its PGN and analysis to a per-game log."""
+    affinity = affinity or AffinityConfig()
+    affinity.network.apply_to_current_thread()
+    metrics.ACTIVE_GAMES.inc()
+    try:
+        _play_game(api, engine, game_id, bot_version, my_color, affinity)
+    finally:
+        metrics.ACTIVE_GAMES.dec()
+        logging.info("CPU usage after game %s: %s", game_id, CPU_USAGE.report())
+        end_game_logging()
 
-    logging.info("Token present. Initializing client and engine...")
-    # Self-incrementing bot version (persisted on disk)
-    bot_version = get_and_increment_version()
-    logging.info(f"Bot version: v{bot_version}")
-    api = LichessAPI(token)
-    engine = RandomEngine()
 
-    game_threads = {}
+def _play_game(
+    api: LichessAPI,
+    engine: RandomEngine,
+    game_id: str,
+    bot_version: int,
+    my_color: Optional[str],
+    affinity: AffinityConfig,
+) -> None:
+    # Deferred from startup: only games need python-chess
+    import chess
+    import chess.pgn
 
-    def handle_game(game_id: str, my_color: Optional[str] = None):
-        logging.info(f"Starting game thread for {game_id} [bot v{bot_version}]")
-        board = chess.Board()
-        color: Optional[str] = my_color
-        # Track how many moves we have already processed; start at -1 so we act on the first state (0 moves)
-        last_handled_len = -1
-        # Prepare a per-game log file
-        game_log_path = os.path.join(os.getcwd(), f"lichess_bot_game_{game_id}.log")
-        try:
-            with open(game_log_path, "w") as lf:
-                lf.write(f"game {game_id} started\n")
-                lf.write(f"bot_version v{bot_version}\n")
-        except Exception:
-            game_log_path = None
-        # Simple time manager state
-        my_ms = None
-        opp_ms = None
-        inc_ms = 0
-        # Meta info for logging/PGN
-        game_date_iso: Optional[str] = None
-        white_name: Optional[str] = None
-        black_name: Optional[str] = None
-        site_url: Optional[str] = None
-        try:
-            # Only send moves on authoritative gameState events to avoid race
-            # conditions right after gameFull arrives.
-            seen_game_full = False
-            for event in api.stream_game_events(game_id):
-                et = event.get("type")
-                if et in ("gameFull", "gameState"):
-                    # Determine moves list and optional status
-                    if et == "gameFull":
-                        state = event.get("state", {})
-                        moves = state.get("moves", "")
-                        status = state.get("status")
-                        # clocks are in milliseconds if present
-                        my_ms = state.get("wtime") if color == "white" else state.get("btime")
-                        opp_ms = state.get("btime") if color == "white" else state.get("wtime")
-                        inc_ms = state.get("winc") or state.get("binc") or 0
-                        # Discover my color from gameFull
-                        white_id = event["white"].get("id")
-                        black_id = event["black"].get("id")
-                        white_name = event["white"].get("name") or white_id or "?"
-                        black_name = event["black"].get("name") or black_id or "?"
-                        # Set site and date if available
-                        try:
-                            # Lichess event may include 'createdAt' ms epoch
-                            created_ms = event.get("createdAt") or event.get("createdAtDate")
-                            if created_ms:
-                                import datetime
-                                game_date_iso = datetime.datetime.utcfromtimestamp(int(created_ms)/1000).strftime("%Y.%m.%d")
-                        except Exception:
-                            pass
-                        site_url = f"https://lichess.org/{game_id}"
-                        me = api.get_my_user_id()
-                        if me == white_id:
-                            color = "white"
-                        elif me == black_id:
-                            color = "black"
-                        logging.info(f"Game {game_id}: joined as {color} (gameFull)")
-                        seen_game_full = True
-                    else:
-                        moves = event.get("moves", "")
-                        status = event.get("status")
-                        # update clocks from gameState if present
-                        if color == "white":
-                            my_ms = event.get("wtime", my_ms)
-                            opp_ms = event.get("btime", opp_ms)
-                            inc_ms = event.get("winc", inc_ms)
-                        elif color == "black":
-                            my_ms = event.get("btime", my_ms)
-                            opp_ms = event.get("wtime", opp_ms)
-                            inc_ms = event.get("binc", inc_ms)
-
-                    moves_list = moves.split() if moves else []
-                    new_len = len(moves_list)
-                    logging.info(
-                        f"Game {game_id}: event={et}, moves={new_len}, color={color}"
-                    )
-                    if new_len == last_handled_len:
-                        logging.debug(f"Game {game_id}: position unchanged (len={new_len}), skipping")
-                        continue
-
-                    # Rebuild board from moves
-                    board = chess.Board()
-                    for m in moves_list:
-                        try:
-                            board.push_uci(m)
-                        except Exception:
-                            logging.debug(f"Game {game_id}: could not apply move {m}")
-
-                    if color is None:
-                        logging.info(f"Game {game_id}: color unknown yet; waiting for gameFull")
-                        # Do not mark this position handled on gameFull; wait for authoritative gameState
-                        if et == "gameState":
-                            last_handled_len = new_len
-                        continue
-
-                    is_white_turn = board.turn
-                    my_turn = (is_white_turn and color == "white") or ((not is_white_turn) and color == "black")
-                    logging.info(
-                        f"Game {game_id}: turn={'white' if is_white_turn else 'black'}, my_turn={my_turn}"
-                    )
-                    # Move policy:
-                    # - Always move on 'gameState' (authoritative)
-                    # - Also allow moving on the initial 'gameFull' when there are zero moves and it's our turn.
-                    #   This avoids stalling at game start when Lichess doesn't immediately send a 'gameState' for 0 moves.
-                    allow_move = (et == "gameState") or (et == "gameFull" and new_len == 0)
-                    if my_turn and allow_move:
-                        # Compute a per-move time budget (seconds) based on remaining time
-                        # Heuristic: use min( max_time_sec, max(0.05, 0.6 * my_time_left/remaining_moves + inc) )
-                        # Estimate remaining moves as 30 - ply/2 bounded to [10, 60]
-                        est_moves_left = max(10, min(60, 30 - board.fullmove_number // 2))
-                        time_left_sec = (my_ms or 0) / 1000.0
-                        inc_sec = (inc_ms or 0) / 1000.0
-                        budget = 0.6 * (time_left_sec / max(1, est_moves_left)) + 0.5 * inc_sec
-                        # Spend more time per move (requested): double the budget
-                        budget *= 2.0
-                        # Keep within reasonable bounds
-                        budget = max(0.05, min(engine.max_time_sec, budget))
-                        move, reason = engine.choose_move_with_explanation(board, time_budget_sec=budget)
-                        if move is None:
-                            logging.info(f"Game {game_id}: no legal moves (game likely over)")
-                            break
-                        try:
-                            # Double-check legality just before sending to avoid 400s when state changed.
-                            if move not in board.legal_moves:
-                                logging.info(f"Game {game_id}: selected move no longer legal; skipping send")
-                            else:
-                                logging.info(f"Game {game_id}: playing {move.uci()} (budget={budget:.2f}s, my_time_left={time_left_sec:.1f}s, inc={inc_sec:.2f}s)")
-                                if game_log_path:
-                                    with open(game_log_path, "a") as lf:
-                                        lf.write(f"ply {last_handled_len+1}: {move.uci()}\n{reason}\n\n")
-                                api.make_move(game_id, move)
-                        except Exception as e:
-                            logging.warning(f"Game {game_id}: move {move.uci()} failed: {e}")
-                    # Mark this position as handled on authoritative gameState, or after we've
-                    # actually attempted a move (including the first move on gameFull len=0).
-                    if et == "gameState" or (my_turn and allow_move):
-                        last_handled_len = new_len
-                    if status in {"mate", "resign", "stalemate", "timeout", "draw"}:
-                        logging.info(f"Game {game_id} finished: {status}")
-                        break
-                elif et == "chatLine":
-                    continue
-                elif et == "opponentGone":
-                    continue
-        except Exception as e:
-            logging.exception(f"Game {game_id} thread error: {e}")
-        finally:
-            # On game end, write full PGN to the log file
-            try:
-                if game_log_path:
-                    game = chess.pgn.Game.from_board(board)
-                    # Record the bot version in the PGN headers
+    logging.info("Starting game thread for %s [bot v%s]", game_id, bot_version)
+    board = chess.Board()
+    color: Optional[str] = my_color
+    # Track how many moves we have already processed; start at -1 so we act on the first state (0 moves)
+    last_handled_len = -1
+    # Prepare a per-game log file
+    game_log_path = os.path.join(os.getcwd(), f"lichess_bot_game_{game_id}.log")
+    try:
+        with open(game_log_path, "w") as lf:
+            lf.write(f"game {game_id} started\n")
+            lf.write(f"bot_version v{bot_version}\n")
+    except Exception:
+        game_log_path = None
+    # Simple time manager state
+    my_ms = None
+    opp_ms = None
+    inc_ms = 0
+    # Meta info for logging/PGN
+    game_date_iso: Optional[str] = None
+    white_name: Optional[str] = None
+    black_name: Optional[str] = None
+    site_url: Optional[str] = None
+    try:
+        # Only send moves on authoritative gameState events to avoid race
+        # conditions right after gameFull arrives.
+        seen_game_full = False
+        for event in api.stream_game_events(game_id):
+            et = event.get("type")
+            if et in ("gameFull", "gameState"):
+                # Determine moves list and optional status
+                if et == "gameFull":
+                    state = event.get("state", {})
+                    moves = state.get("moves", "")
+                    status = state.get("status")
+                    # clocks are in milliseconds if present
+                    my_ms = state.get("wtime") if color == "white" else state.get("btime")
+                    opp_ms = state.get("btime") if color == "white" else state.get("wtime")
+                    inc_ms = state.get("winc") or state.get("binc") or 0
+                    # Discover my color from gameFull
+                    white_id = event["white"].get("id")
+                    black_id = event["black"].get("id")
+                    white_name = event["white"].get("name") or white_id or "?"
+                    black_name = event["black"].get("name") or black_id or "?"
+                    # Set site and date if available
                     try:
-                        game.headers["BotVersion"] = f"v{bot_version}"
-                        if site_url:
-                            game.headers["Site"] = site_url
-                        if game_date_iso:
-                            game.headers["Date"] = game_date_iso
-                        if white_name:
-                            game.headers["White"] = white_name
-                        if black_name:
-                            game.headers["Black"] = black_name
+                        # Lichess event may include 'createdAt' ms epoch
+                        created_ms = event.get("createdAt") or event.get("createdAtDate")
+                        if created_ms:
+                            import datetime
+                            game_date_iso = datetime.datetime.utcfromtimestamp(int(created_ms)/1000).strftime("%Y.%m.%d")
                     except Exception:
                         pass
-                    with open(game_log_path, "a") as lf:
-                        lf.write("\nPGN:\n")
-                        exporter = chess.pgn.StringExporter(headers=True, variations=False, comments=False)
-                        lf.write(game.accept(exporter))
-                        lf.write("\n")
-                # After PGN is written, run analysis and save it to the same file (inserted before PGN)
-                if game_log_path:
-                    analysis_text: Optional[str] = None
+                    site_url = f"https://lichess.org/{game_id}"
+                    me = api.get_my_user_id()
+                    if me == white_id:
+                        color = "white"
+                    elif me == black_id:
+                        color = "black"
+                    logging.info("Game %s: joined as %s (gameFull)", game_id, color)
+                    seen_game_full = True
+                else:
+                    moves = event.get("moves", "")
+                    status = event.get("status")
+                    # update clocks from gameState if present
+                    if color == "white":
+                        my_ms = event.get("wtime", my_ms)
+                        opp_ms = event.get("btime", opp_ms)
+                        inc_ms = event.get("winc", inc_ms)
+                    elif color == "black":
+                        my_ms = event.get("btime", my_ms)
+                        opp_ms = event.get("wtime", opp_ms)
+                        inc_ms = event.get("binc", inc_ms)
+
+                moves_list = moves.split() if moves else []
+                new_len = len(moves_list)
+                logging.debug("Game %s: event=%s, moves=%s, color=%s", game_id, et, new_len, color)
+                if new_len == last_handled_len:
+                    logging.debug("Game %s: position unchanged (len=%s), skipping", game_id, new_len)
+                    continue
+
+                # Rebuild board from moves
+                board = chess.Board()
+                for m in moves_list:
                     try:
-                        analyze_script = os.path.join(
-                            os.path.dirname(os.path.dirname(__file__)),
-                            "stockfish_analysis",
-                            "analyze_chess_game.py",
-                        )
-                        if os.path.isfile(analyze_script):
-                            # Estimate total plies from the final board
-                            try:
-                                total_plies = len(board.move_stack)
-                            except Exception:
-                                total_plies = 0
+                        board.push_uci(m)
+                    except Exception:
+                        logging.debug("Game %s: could not apply move %s", game_id, m)
 
-                            logging.info(
-                                f"Game {game_id}: starting post-game analysis ({total_plies} plies)"
-                            )
-                            # Run analyzer unbuffered and stream output for progress
-                            proc = subprocess.Popen(
-                                [sys.executable, "-u", analyze_script, game_log_path],
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                text=True,
-                                bufsize=1,
-                            )
-                            analyzed = 0
-                            lines: list[str] = []
-                            ply_line_re = __import__("re").compile(r"^\s*(\d+)\s")
-                            # Read stdout line by line
-                            assert proc.stdout is not None
-                            for line in proc.stdout:
-                                lines.append(line)
-                                m = ply_line_re.match(line)
-                                if m:
-                                    # Count as one analyzed ply
-                                    analyzed += 1
-                                    left = max(0, (total_plies or 0) - analyzed) if total_plies else "?"
-                                    if total_plies:
-                                        pct = analyzed / total_plies * 100.0
-                                        logging.info(
-                                            f"Game {game_id}: analysis progress {analyzed}/{total_plies} ({pct:.0f}%), left {left}"
-                                        )
-                                    else:
-                                        logging.info(
-                                            f"Game {game_id}: analysis progress {analyzed} plies (total unknown)"
-                                        )
-
-                            # Capture any remaining stderr and ensure process ends
-                            assert proc.stderr is not None
-                            stderr_text = proc.stderr.read() or ""
-                            ret = proc.wait()
-                            analysis_text = "".join(lines)
-                            if ret != 0:
-                                logging.warning(
-                                    f"Game {game_id}: analysis script exited with code {ret}"
-                                )
-                                if stderr_text:
-                                    analysis_text += ("\n[stderr]\n" + stderr_text)
-                            logging.info(f"Game {game_id}: analysis complete")
+                if color is None:
+                    logging.info("Game %s: color unknown yet; waiting for gameFull", game_id)
+                    # Do not mark this position handled on gameFull; wait for authoritative gameState
+                    if et == "gameState":
+                        last_handled_len = new_len
+                    continue
+
+                is_white_turn = board.turn
+                my_turn = (is_white_turn and color == "white") or ((not is_white_turn) and color == "black")
+                logging.debug(
+                    "Game %s: turn=%s, my_turn=%s", game_id, "white" if is_white_turn else "black", my_turn
+                )
+                # Move policy:
+                # - Always move on 'gameState' (authoritative)
+                # - Also allow moving on the initial 'gameFull' when there are zero moves and it's our turn.
+                #   This avoids stalling at game start when Lichess doesn't immediately send a 'gameState' for 0 moves.
+                allow_move = (et == "gameState") or (et == "gameFull" and new_len == 0)
+                if my_turn and allow_move:
+                    # Compute a per-move time budget (seconds) based on remaining time
+                    # Heuristic: use min( max_time_sec, max(0.05, 0.6 * my_time_left/remaining_moves + inc) )
+                    # Estimate remaining moves as 30 - ply/2 bounded to [10, 60]
+                    est_moves_left = max(10, min(60, 30 - board.fullmove_number // 2))
+                    time_left_sec = (my_ms or 0) / 1000.0
+                    inc_sec = (inc_ms or 0) / 1000.0
+                    budget = 0.6 * (time_left_sec / max(1, est_moves_left)) + 0.5 * inc_sec
+                    # Spend more time per move (requested): double the budget
+                    budget *= 2.0
+                    # Keep within reasonable bounds
+                    budget = max(0.05, min(engine.max_time_sec, budget))
+                    move, reason = engine.choose_move_with_explanation(board, time_budget_sec=budget)
+                    if move is None:
+                        logging.info("Game %s: no legal moves (game likely over)", game_id)
+                        break
+                    try:
+                        # Double-check legality just before sending to avoid 400s when state changed.
+                        if move not in board.legal_moves:
+                            logging.info("Game %s: selected move no longer legal; skipping send", game_id)
                         else:
                             logging.info(
-                                f"Game {game_id}: analysis script not found at {analyze_script}; skipping analysis"
+                                "Game %s: playing %s (budget=%.2fs, my_time_left=%.1fs, inc=%.2fs)",
+                                game_id, move, budget, time_left_sec, inc_sec,
                             )
+                            if game_log_path:
+                                with open(game_log_path, "a") as lf:
+                                    lf.write(f"ply {last_handled_len+1}: {move.uci()}\n{reason}\n\n")
+                            api.make_move(game_id, move)
                     except Exception as e:
-                        logging.debug(f"Game {game_id}: analysis run failed: {e}")
+                        logging.warning("Game %s: move %s failed: %s", game_id, move, e)
+                # Mark this position as handled on authoritative gameState, or after we've
+                # actually attempted a move (including the first move on gameFull len=0).
+                if et == "gameState" or (my_turn and allow_move):
+                    last_handled_len = new_len
+                if status in {"mate", "resign", "stalemate", "timeout", "draw"}:
+                    logging.info("Game %s finished: %s", game_id, status)
+                    break
+            elif et == "chatLine":
+                continue
+            elif et == "opponentGone":
+                continue
+    except Exception as e:
+        logging.exception("Game %s thread error: %s", game_id, e)
+    finally:
+        # On game end, write full PGN to the log file
+        try:
+            if game_log_path:
+                game = chess.pgn.Game.from_board(board)
+                # Record the bot version in the PGN headers
+                try:
+                    game.headers["BotVersion"] = f"v{bot_version}"
+                    if site_url:
+                        game.headers["Site"] = site_url
+                    if game_date_iso:
+                        game.headers["Date"] = game_date_iso
+                    if white_name:
+                        game.headers["White"] = white_name
+                    if black_name:
+                        game.headers["Black"] = black_name
+                except Exception:
+                    pass
+                with open(game_log_path, "a") as lf:
+                    lf.write("\nPGN:\n")
+                    exporter = chess.pgn.StringExporter(headers=True, variations=False, comments=False)
+                    lf.write(game.accept(exporter))
+                    lf.write("\n")
+            # After PGN is written, run analysis and save it to the same file (inserted before PGN)
+            if game_log_path:
+                analysis_text: Optional[str] = None
+                metrics.ANALYSIS_QUEUE_DEPTH.inc()
+                try:
+                    analysis_text = _analyze_finished_game(game, game_id, affinity.analysis)
+                except Exception as e:
+                    logging.debug("Game %s: analysis run failed: %s", game_id, e)
+                finally:
+                    metrics.ANALYSIS_QUEUE_DEPTH.dec()
 
-                    # Insert analysis before the PGN section so future runs can still parse PGN cleanly
-                    if analysis_text:
-                        try:
-                            with open(game_log_path, "r", encoding="utf-8", errors="replace") as f:
-                                content = f.read()
+                # Insert analysis before the PGN section so future runs can still parse PGN cleanly
+                if analysis_text:
+                    try:
+                        with open(game_log_path, "r", encoding="utf-8", errors="replace") as f:
+                            content = f.read()
 
-                            # Find the start of the 'PGN:' line
+                        # Find the start of the 'PGN:' line
+                        insert_idx = 0
+                        p = content.find("\nPGN:\n")
+                        if p != -1:
+                            insert_idx = p + 1  # start of the line after the preceding newline
+                        elif content.startswith("PGN:\n"):
                             insert_idx = 0
-                            p = content.find("\nPGN:\n")
-                            if p != -1:
-                                insert_idx = p + 1  # start of the line after the preceding newline
-                            elif content.startswith("PGN:\n"):
-                                insert_idx = 0
-                            else:
-                                # If PGN marker not found (unexpected), append at end
-                                insert_idx = len(content)
-
-                            # Prepend meta information block for easier parsing later
-                            meta_lines = []
-                            if game_date_iso:
-                                meta_lines.append(f"Date: {game_date_iso}")
-                            if white_name or black_name:
-                                meta_lines.append(f"Players: {white_name or '?'} vs {black_name or '?'}")
-                            if meta_lines:
-                                meta_block = "\n".join(meta_lines) + "\n"
-                            else:
-                                meta_block = ""
-
-                            analysis_block = (
-                                (meta_block if meta_block else "") +
-                                "ANALYSIS:\n" + analysis_text.rstrip() + "\n\n"
-                            )
-                            new_content = content[:insert_idx] + analysis_block + content[insert_idx:]
-                            with open(game_log_path, "w", encoding="utf-8") as f:
-                                f.write(new_content)
-                        except Exception as e:
-                            logging.debug(f"Game {game_id}: could not write analysis to log: {e}")
-            except Exception as e:
-                logging.debug(f"Game {game_id}: could not write PGN: {e}")
-            logging.info(f"Ending game thread for {game_id}")
+                        else:
+                            # If PGN marker not found (unexpected), append at end
+                            insert_idx = len(content)
+
+                        # Prepend meta information block for easier parsing later
+                        meta_lines = []
+                        if game_date_iso:
+                            meta_lines.append(f"Date: {game_date_iso}")
+                        if white_name or black_name:
+                            meta_lines.append(f"Players: {white_name or '?'} vs {black_name or '?'}")
+                        if meta_lines:
+                            meta_block = "\n".join(meta_lines) + "\n"
+                        else:
+                            meta_block = ""
+
+                        analysis_block = (
+                            (meta_block if meta_block else "") +
+                            "ANALYSIS:\n" + analysis_text.rstrip() + "\n\n"
+                        )
+                        new_content = content[:insert_idx] + analysis_block + content[insert_idx:]
+                        with open(game_log_path, "w", encoding="utf-8") as f:
+                            f.write(new_content)
+                    except Exception as e:
+                        logging.debug("Game %s: could not write analysis to log: %s", game_id, e)
+        except Exception as e:
+            logging.debug("Game %s: could not write PGN: %s", game_id, e)
+        logging.info("Ending game thread for %s", game_id)
+
+
+def _analyze_finished_game(game, game_id: str, policy: CpuPolicy) -> Optional[str]:
+    """Analyze a finished game with Stockfish; return the analysis table for the game log.
+
+    If ``LICHESS_BOT_ANALYSIS_SOCKET`` names a running analysis daemon the game
+    is sent there, to its warm engines. Otherwise (or if the daemon cannot be
+    reached) it is analysed in-process with a Stockfish running under the
+    analysis CPU policy. Returns None if Stockfish is not installed.
+    Analysed plies are kept in a progress store next to the game logs, so an
+    analysis interrupted by a restart does not start over.
+    """
+    from ..stockfish_analysis import analysis
+
+    total_plies = sum(1 for _ in game.mainline_moves())
+    logging.info("Game %s: starting post-game analysis (%s plies)", game_id, total_plies)
+    lines = [
+        "Game:",
+        f"  {game.headers.get('White', 'White')} vs {game.headers.get('Black', 'Black')}  "
+        f"Result: {game.headers.get('Result', '*')}",
+        "",
+        analysis.TABLE_HEADER,
+    ]
+
+    def collect(results) -> None:
+        for r in results:
+            lines.append(analysis.format_row(r))
+            pct = r.ply / total_plies * 100.0 if total_plies else 100.0
+            logging.info(
+                "Game %s: analysis progress %s/%s (%.0f%%), left %s",
+                game_id, r.ply, total_plies, pct, max(0, total_plies - r.ply),
+            )
+
+    socket_path = os.getenv(ANALYSIS_SOCKET_ENV)
+    table_start = len(lines)
+    calls = _analyze_with_daemon(socket_path, game, game_id, collect) if socket_path else None
+    if calls is None:
+        del lines[table_start:]  # rows of a daemon job that failed part way
+        calls = _analyze_in_process(game, game_id, policy, collect)
+    if calls is None:
+        return None
+    lines += ["", f"Engine calls: {calls} for {total_plies} plies"]
+    logging.info("Game %s: analysis complete", game_id)
+    return "\n".join(lines) + "\n"
+
+
+def _analyze_with_daemon(socket_path: str, game, game_id: str, collect) -> Optional[int]:
+    """Send the game to the analysis daemon; return its engine calls, or None if it cannot be reached.
+
+    Also None if the job fails, the connection drops or the daemon goes quiet
+    for ANALYSIS_DAEMON_TIMEOUT_SEC, so that the caller analyses in-process.
+    """
+    import socket
+
+    import chess.engine
+
+    from ..stockfish_analysis.analysis_daemon import DaemonClient
+
+    client = DaemonClient(socket_path, timeout=ANALYSIS_DAEMON_TIMEOUT_SEC)
+    try:
+        # Results are streamed: job failures and timeouts are raised while they are consumed
+        collect(client.analyze_game(game, limit=chess.engine.Limit(time=0.5), reuse=True))
+    except (OSError, socket.timeout, RuntimeError, ValueError) as e:
+        logging.info("Game %s: analysis daemon at %s failed (%s); analysing in-process", game_id, socket_path, e)
+        return None
+    return client.calls
+
+
+def _analyze_in_process(game, game_id: str, policy: CpuPolicy, collect) -> Optional[int]:
+    """Analyze with a Stockfish started for this game; return its engine calls, or None if not installed."""
+    import chess.engine
+
+    from ..stockfish_analysis import analysis
+    from ..stockfish_analysis.progress import ProgressStore
+
+    threads = len(policy.cpus) if policy.cpus else None
+    try:
+        engines, threads, hash_mb, multipv = analysis.open_engines(analysis.DEFAULT_ENGINE, threads=threads)
+    except FileNotFoundError:
+        logging.info("Game %s: %s not found; skipping analysis", game_id, analysis.DEFAULT_ENGINE)
+        return None
+    engine = engines[0]
+    pid = engine.transport.get_pid()
+    # Search threads exist once Threads is configured, so pin all of them
+    policy.apply_to_process(pid)
+
+    pool = analysis.EnginePool(engines, chess.engine.Limit(time=0.5), multipv)
+    progress = ProgressStore(os.path.join(os.getcwd(), ANALYSIS_PROGRESS_FILE))
+    try:
+        collect(analysis.analyze_game(pool, game, reuse=True, progress=progress))
+    finally:
+        CPU_USAGE.add("analysis", process_cpu_seconds(pid))
+        engine.quit()
+        progress.close()
+    return pool.calls
+
+
+def handle_challenge(api: LichessAPI, challenge: dict, decline_correspondence: bool = False) -> None:
+    """Accept standard challenges at a supported speed, decline everything else."""
+    ch_id = challenge["id"]
+    variant = challenge.get("variant", {}).get("key", "standard")
+    speed = challenge.get("speed")
+    perf_ok = speed in {"bullet", "blitz", "rapid", "classical"}
+    not_corr = challenge.get("speed") != "correspondence" or not decline_correspondence
+    if variant == "standard" and perf_ok and not_corr:
+        logging.info("Accepting challenge %s (%s)", ch_id, speed)
+        api.accept_challenge(ch_id)
+    else:
+        logging.info("Declining challenge %s (variant=%s, speed=%s)", ch_id, variant, speed)
+        api.decline_challenge(ch_id)
+
+
+def run_bot(
+    log_level: str = "INFO",
+    decline_correspondence: bool = False,
+    workers: int = 0,
+    log_config: Optional[LogConfig] = None,
+    metrics_port: int = 0,
+    affinity: Optional[AffinityConfig] = None,
+) -> None:
+    """Run the bot until interrupted.
+
+    With ``workers=0`` every game runs as a thread in this process. With ``workers=N``
+    this process only reads the event stream and hands games out to N worker
+    processes (see ``supervisor.py``), each with its own engine and API session.
+
+    With ``metrics_port`` set, ``/metrics`` and ``/healthz`` are served on
+    localhost at that port; worker ``i`` serves its own at ``metrics_port + 1 + i``.
+
+    ``affinity`` pins live engines, analysis and network threads to their own
+    cores and nice levels; by default engines keep one reserved core.
+    """
+    log_config = log_config or LogConfig(level=log_level)
+    configure_logging(log_config)
+
+    token = os.getenv("LICHESS_TOKEN")
+    if not token:
+        raise RuntimeError("LICHESS_TOKEN environment variable is required")
+
+    logging.info("Token present. Initializing client and engine...")
+    # Self-incrementing bot version (persisted on disk)
+    bot_version = get_and_increment_version()
+    logging.info("Bot version: v%s", bot_version)
+    affinity = affinity or default_affinity()
+    logging.info("CPU policy: %s", affinity.describe())
+    affinity.network.apply_to_current_thread()
+    api = LichessAPI(token)
+    if metrics_port:
+        metrics.serve_metrics(metrics_port, require_stream=True)
+        logging.info("Serving metrics on http://127.0.0.1:%s/metrics", metrics_port)
+
+    supervisor = None  # Supervisor, only in worker mode
+    engine: Optional[RandomEngine] = None
+    game_threads = {}
+    if workers > 0:
+        from .supervisor import Supervisor
+
+        supervisor = Supervisor(
+            workers,
+            token=token,
+            bot_version=bot_version,
+            log_config=log_config,
+            metrics_port=metrics_port,
+            affinity=affinity,
+        )
+        supervisor.start()
+    else:
+        engine = RandomEngine(cpu_policy=affinity.engine)
+
+    def start_game(game_id: str) -> None:
+        if supervisor is not None:
+            supervisor.assign(game_id)
+            return
+        # Spin up a game thread
+        if game_id not in game_threads or not game_threads[game_id].is_alive():
+            t = threading.Thread(
+                target=handle_game,
+                args=(api, engine, game_id, bot_version),
+                kwargs={"affinity": affinity},
+                name=f"game-{game_id}",
+            )
+            t.daemon = True
+            game_threads[game_id] = t
+            t.start()
 
     # Main event stream: challenge and game start events
     logging.info("Connecting to Lichess event stream. Waiting for challenges...")
     backoff = 0
-    while True:
-        try:
-            for event in api.stream_events():
-                if event.get("type") == "challenge":
-                    challenge = event["challenge"]
-                    ch_id = challenge["id"]
-                    variant = challenge.get("variant", {}).get("key", "standard")
-                    speed = challenge.get("speed")
-                    perf_ok = speed in {"bullet", "blitz", "rapid", "classical"}
-                    not_corr = challenge.get("speed") != "correspondence" or not decline_correspondence
-                    if variant == "standard" and perf_ok and not_corr:
-                        logging.info(f"Accepting challenge {ch_id} ({speed})")
-                        api.accept_challenge(ch_id)
+    try:
+        while True:
+            try:
+                for event in api.stream_events():
+                    if event.get("type") == "challenge":
+                        handle_challenge(api, event["challenge"], decline_correspondence)
+
+                    elif event.get("type") == "gameStart":
+                        start_game(event["game"]["id"])
+
+                    elif event.get("type") == "gameFinish":
+                        game_id = event["game"]["id"]
+                        logging.info("Game finished event: %s", game_id)
                     else:
-                        logging.info(f"Declining challenge {ch_id} (variant={variant}, speed={speed})")
-                        api.decline_challenge(ch_id)
-
-                elif event.get("type") == "gameStart":
-                    game_id = event["game"]["id"]
-                    # Spin up a game thread
-                    if game_id not in game_threads or not game_threads[game_id].is_alive():
-                        t = threading.Thread(target=handle_game, args=(game_id,), name=f"game-{game_id}")
-                        t.daemon = True
-                        game_threads[game_id] = t
-                        t.start()
-
-                elif event.get("type") == "gameFinish":
-                    game_id = event["game"]["id"]
-                    logging.info(f"Game finished event: {game_id}")
-                else:
-                    logging.debug(f"Unhandled event: {json.dumps(event)}")
-            # If stream ends normally, reset backoff
-            backoff = 0
-        except Exception as e:
-            logging.warning(f"Event stream error: {e}")
-            backoff = backoff_sleep(backoff)
+                        logging.debug("Unhandled event: %s", event)
+                # If stream ends normally, reset backoff
+                backoff = 0
+            except Exception as e:
+                logging.warning("Event stream error: %s", e)
+                metrics.STREAM_RECONNECTS.inc()
+                backoff = backoff_sleep(backoff)
+    finally:
+        if supervisor is not None:
+            supervisor.stop()
+
+
+def _affinity_from_args(args: argparse.Namespace) -> AffinityConfig:
+    base = default_affinity(args.reserved_cores, analysis_nice=args.analysis_nice)
+    return AffinityConfig(
+        engine=CpuPolicy(cpus=args.engine_cpus or base.engine.cpus, nice=args.engine_nice),
+        analysis=CpuPolicy(cpus=args.analysis_cpus or base.analysis.cpus, nice=args.analysis_nice),
+        network=CpuPolicy(cpus=args.network_cpus, nice=args.network_nice),
+    )
 
 
 def main():
     parser = argparse.ArgumentParser(description="Run a minimal Lichess bot")
     parser.add_argument("--log-level", default="INFO", help="Logging level (default: INFO)")
     parser.add_argument("--decline-correspondence", action="store_true", help="Decline correspondence challenges")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Run games in N worker processes instead of threads in this process (default: 0)",
+    )
+    parser.add_argument(
+        "--debug-sample",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Keep 1 of every N DEBUG records per game (default: 1 = keep all)",
+    )
+    parser.add_argument(
+        "--debug-rate",
+        type=float,
+        default=0.0,
+        metavar="PER_SEC",
+        help="Keep at most this many DEBUG records per second per game (default: 0 = unlimited)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="Serve Prometheus-style /metrics and /healthz on 127.0.0.1:PORT (default: 0 = off)",
+    )
+    parser.add_argument(
+        "--reserved-cores",
+        type=int,
+        default=1,
+        help="Cores kept for live-game engines; analysis runs on the rest (default: 1, 0 = no pinning)",
+    )
+    for cls, nice in (("engine", 0), ("analysis", 10), ("network", 0)):
+        parser.add_argument(
+            f"--{cls}-cpus",
+            type=cpu_list_arg,
+            default=None,
+            metavar="LIST",
+            help=f"CPUs for {cls} work, e.g. 0-3,6 (overrides --reserved-cores)",
+        )
+        parser.add_argument(
+            f"--{cls}-nice",
+            type=int,
+            default=nice,
+            help=f"Nice increment for {cls} work (default: {nice})",
+        )
     args = parser.parse_args()
-    run_bot(args.log_level, args.decline_correspondence)
+    log_config = LogConfig(level=args.log_level, debug_every=args.debug_sample, debug_per_sec=args.debug_rate)
+    run_bot(
+        args.log_level,
+        args.decline_correspondence,
+        workers=max(0, args.workers),
+        log_config=log_config,
+        metrics_port=args.metrics_port,
+        affinity=_affinity_from_args(args),
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,261 @@
+"""In-process metrics registry and a localhost Prometheus-style endpoint.
+
+Counters, gauges and histograms are plain thread-safe objects registered in a
+``Registry``. ``serve_metrics`` exposes them on ``/metrics`` in the Prometheus
+text format and a lightweight ``/healthz`` check, from a daemon thread bound to
+localhost only.
+
+The bot's own metrics are defined at the bottom of this module so every part
+of the bot can import and update them directly.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+LabelKey = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    inner = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + inner + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{_fmt_labels(self.label_names, key)} {_fmt_value(v)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelKey, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, n = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, n + 1)
+
+    def time(self, **labels: str) -> "_Timer":
+        """Context manager observing the elapsed wall time of its block."""
+        return _Timer(self, labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._values.items())
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for upper, c in zip(self.buckets, counts):
+                cumulative += c
+                labels = _fmt_labels(self.label_names, key, ("le", _fmt_value(upper)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_fmt_labels(self.label_names, key)} {_fmt_value(total)}"
+            yield f"{self.name}_count{_fmt_labels(self.label_names, key)} {n}"
+
+
+class _Timer:
+    def __init__(self, hist: Histogram, labels: Dict[str, str]):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.t0 = time.monotonic()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.hist.observe(time.monotonic() - self.t0, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labels))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[k] for k in sorted(self._metrics)]
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+ACTIVE_GAMES = REGISTRY.gauge("lichess_bot_active_games", "Games currently being played by this process")
+ENGINE_LATENCY = REGISTRY.histogram("lichess_bot_engine_latency_seconds", "Wall time of one engine call")
+HTTP_LATENCY = REGISTRY.histogram(
+    "lichess_bot_http_latency_seconds", "Time until response headers per API endpoint", ("method", "endpoint")
+)
+HTTP_RESPONSES = REGISTRY.counter(
+    "lichess_bot_http_responses_total", "HTTP responses by endpoint and status code", ("method", "endpoint", "status")
+)
+HTTP_RATE_LIMITED = REGISTRY.counter(
+    "lichess_bot_http_rate_limited_total", "HTTP 429 responses by endpoint", ("method", "endpoint")
+)
+STREAM_RECONNECTS = REGISTRY.counter("lichess_bot_event_stream_reconnects_total", "Event stream reconnect attempts")
+STREAM_CONNECTED = REGISTRY.gauge("lichess_bot_event_stream_connected", "1 while the event stream is open")
+ANALYSIS_QUEUE_DEPTH = REGISTRY.gauge(
+    "lichess_bot_analysis_queue_depth", "Finished games waiting for or running post-game analysis"
+)
+WORKER_ACTIVE_GAMES = REGISTRY.gauge(
+    "lichess_bot_worker_active_games", "Active games per worker process (supervisor mode)", ("worker",)
+)
+
+
+def health_details(registry: Registry = REGISTRY) -> dict:
+    """Return a small JSON-able summary of the process state for ``/healthz``."""
+    return {
+        "status": "ok",
+        "uptime_sec": round(time.monotonic() - registry.started_at, 1),
+        "active_games": int(ACTIVE_GAMES.value()),
+        "analysis_queue_depth": int(ANALYSIS_QUEUE_DEPTH.value()),
+        "event_stream_connected": STREAM_CONNECTED.value() >= 1,
+    }
+
+
+def serve_metrics(port: int, *, host: str = "127.0.0.1", require_stream: bool = False) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` and ``/healthz`` on ``host:port`` from a daemon thread.
+
+    With ``require_stream`` the health check fails (503) while the event stream
+    is disconnected; use it for the process that owns the stream.
+    """
+    # http.server is only imported when the endpoint is actually enabled
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        registry: Registry = REGISTRY
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                body = self.registry.render().encode("utf-8")
+                self._send(200, body, "text/plain; version=0.0.4; charset=utf-8")
+            elif path in ("/healthz", "/health"):
+                details = health_details(self.registry)
+                # Worker processes never open the event stream, so only the stream owner checks it
+                ok = not (require_stream and not details["event_stream_connected"])
+                if not ok:
+                    details["status"] = "event stream disconnected"
+                self._send(200 if ok else 503, json.dumps(details).encode("utf-8"), "application/json")
+            else:
+                self._send(404, b"not found\n", "text/plain")
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:  # noqa: A002 - keep scrapes out of the bot log
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    t = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    t.start()
+    return server
@@ -0,0 +1,315 @@
+"""Lichess puzzle database: loading, filtering and checking the engine's answers.
+
+The CSV is the lichess export (https://database.lichess.org/#puzzles), with
+the columns PuzzleId,FEN,Moves,Rating,RatingDeviation,Popularity,NbPlays,
+Themes,GameUrl,OpeningTags. FEN is the position before the opponent's move;
+Moves starts with that move, then alternates the solver's moves and the
+opponent's replies. The file has millions of rows, so it is streamed and a
+sample is drawn with reservoir sampling instead of loading it.
+
+``PuzzleIndex`` keeps a binary side file next to the CSV (``<csv>.idx``)
+with the byte offset, rating and themes of every row. It is built once in a
+single streaming pass and rebuilt when the CSV changes; after that, counting,
+filtering and sampling read only the index, and each selected puzzle is one
+seek into the CSV.
+
+Used by tools/bench_puzzles.py and tests/test_puzzles.py.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import mmap
+import os
+import random
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from .engine import RandomEngine
+
+DEFAULT_CSV = os.path.join(os.path.dirname(__file__), "tests", "lichess_db_puzzle.csv")
+
+
+@dataclass(frozen=True)
+class Puzzle:
+    id: str
+    fen: str
+    moves: List[str]  # UCI; moves[0] is the opponent's move that sets up the puzzle
+    rating: int
+    themes: frozenset = frozenset()
+
+
+@dataclass(frozen=True)
+class PuzzleFilter:
+    min_rating: Optional[int] = None
+    max_rating: Optional[int] = None
+    themes: frozenset = frozenset()  # a puzzle matches if it has any of them
+
+    def matches(self, puzzle: Puzzle) -> bool:
+        if self.min_rating is not None and puzzle.rating < self.min_rating:
+            return False
+        if self.max_rating is not None and puzzle.rating > self.max_rating:
+            return False
+        return not self.themes or not self.themes.isdisjoint(puzzle.themes)
+
+
+def _puzzle_from_row(row: Dict[str, str]) -> Optional[Puzzle]:
+    """The puzzle of a CSV row, or None without a FEN, moves or a numeric rating."""
+    fen = (row.get("FEN") or "").strip()
+    moves = (row.get("Moves") or "").split()
+    try:
+        rating = int(row.get("Rating") or "")
+    except ValueError:
+        return None
+    if not fen or len(moves) < 2:
+        return None
+    return Puzzle(
+        id=(row.get("PuzzleId") or "").strip(),
+        fen=fen,
+        moves=moves,
+        rating=rating,
+        themes=frozenset((row.get("Themes") or "").split()),
+    )
+
+
+def iter_puzzles(csv_path: str = DEFAULT_CSV) -> Iterator[Puzzle]:
+    """Stream the puzzles of a CSV, skipping rows without a FEN, moves or a numeric rating."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            puzzle = _puzzle_from_row(row)
+            if puzzle is not None:
+                yield puzzle
+
+
+def select_puzzles(puzzles: Iterable[Puzzle], puzzle_filter: PuzzleFilter = PuzzleFilter(),
+                   sample: Optional[int] = None, seed: int = 0) -> List[Puzzle]:
+    """Puzzles that pass the filter; with ``sample``, a uniform random sample of that many.
+
+    The sample is drawn in one pass (reservoir sampling) and returned in file
+    order, so the same file, filter and seed give the same puzzles.
+    """
+    matching = (p for p in puzzles if puzzle_filter.matches(p))
+    if sample is None:
+        return list(matching)
+    rng = random.Random(seed)
+    reservoir: List[tuple] = []
+    for i, puzzle in enumerate(matching):
+        if i < sample:
+            reservoir.append((i, puzzle))
+        else:
+            j = rng.randrange(i + 1)
+            if j < sample:
+                reservoir[j] = (i, puzzle)
+    return [puzzle for _, puzzle in sorted(reservoir, key=lambda item: item[0])]
+
+
+class PuzzleIndex:
+    """Random access to the puzzles of a CSV through its ``.idx`` side file.
+
+    The index is a header (magic, CSV size and mtime, row count, offset of
+    the theme table), then one fixed-size record per puzzle (byte offset of
+    the row in the CSV, rating, bit set of themes), then the theme names.
+    Records are read straight from a memory map. Use as a context manager
+    or call ``close``.
+    """
+
+    MAGIC = b"LPZIDX1\0"
+    HEADER = struct.Struct("<8sQqQQ")  # magic, csv size, csv mtime_ns, records, theme table offset
+    RECORD = struct.Struct("<QH16s")  # row offset, rating, theme bits
+    MAX_THEMES = 128
+
+    def __init__(self, csv_path: str = DEFAULT_CSV, index_path: Optional[str] = None, build: bool = True):
+        self.csv_path = csv_path
+        self.index_path = index_path or csv_path + ".idx"
+        if not self._is_current():
+            if not build:
+                raise FileNotFoundError(f"No up-to-date puzzle index at {self.index_path}")
+            self.build(csv_path, self.index_path)
+        with open(self.index_path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, _, self._count, theme_offset = self.HEADER.unpack_from(self._map)
+        names = self._map[theme_offset:].decode("utf-8")
+        self.themes = names.split("\n") if names else []
+        self._theme_bits = {name: 1 << i for i, name in enumerate(self.themes)}
+        self._csv = open(csv_path, "rb")
+        self._columns = next(csv.reader([self._csv.readline().decode("utf-8-sig")]))
+
+    def _is_current(self) -> bool:
+        try:
+            with open(self.index_path, "rb") as f:
+                header = f.read(self.HEADER.size)
+            st = os.stat(self.csv_path)
+        except FileNotFoundError:
+            return False
+        if len(header) < self.HEADER.size:
+            return False
+        magic, size, mtime_ns, _, _ = self.HEADER.unpack(header)
+        return magic == self.MAGIC and size == st.st_size and mtime_ns == st.st_mtime_ns
+
+    @classmethod
+    def build(cls, csv_path: str, index_path: str) -> int:
+        """Write the index of ``csv_path`` in one pass over the file; returns the number of puzzles.
+
+        Memory use does not depend on the size of the CSV: records are
+        written as rows are read, and only the theme names are kept.
+        """
+        st = os.stat(csv_path)
+        bits: Dict[str, int] = {}
+        count = 0
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"  # pytest-xdist workers may build it at once
+        with open(csv_path, "rb") as src, open(tmp_path, "wb") as out:
+            out.write(b"\0" * cls.HEADER.size)
+            header = src.readline()
+            columns = next(csv.reader([header.decode("utf-8-sig")]))
+            offset = len(header)
+            for line in src:
+                row_offset, offset = offset, offset + len(line)
+                puzzle = _puzzle_from_row(dict(zip(columns, next(csv.reader([line.decode("utf-8")]), []))))
+                if puzzle is None:
+                    continue
+                mask = 0
+                for theme in puzzle.themes:
+                    if theme not in bits:
+                        if len(bits) == cls.MAX_THEMES:
+                            raise ValueError(f"More than {cls.MAX_THEMES} themes in {csv_path}")
+                        bits[theme] = 1 << len(bits)
+                    mask |= bits[theme]
+                out.write(cls.RECORD.pack(row_offset, min(max(puzzle.rating, 0), 0xFFFF), mask.to_bytes(16, "little")))
+                count += 1
+            theme_offset = out.tell()
+            out.write("\n".join(bits).encode("utf-8"))
+            out.seek(0)
+            out.write(cls.HEADER.pack(cls.MAGIC, st.st_size, st.st_mtime_ns, count, theme_offset))
+        os.replace(tmp_path, index_path)
+        return count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, i: int):
+        offset, rating, mask = self.RECORD.unpack_from(self._map, self.HEADER.size + i * self.RECORD.size)
+        return offset, rating, int.from_bytes(mask, "little")
+
+    def rating(self, i: int) -> int:
+        return self._record(i)[1]
+
+    def _matcher(self, puzzle_filter: PuzzleFilter):
+        wanted = 0
+        for theme in puzzle_filter.themes:
+            wanted |= self._theme_bits.get(theme, 0)
+        if puzzle_filter.themes and not wanted:
+            return lambda rating, mask: False
+        low = puzzle_filter.min_rating if puzzle_filter.min_rating is not None else 0
+        high = puzzle_filter.max_rating if puzzle_filter.max_rating is not None else 0xFFFF
+        return lambda rating, mask: low <= rating <= high and (not wanted or bool(mask & wanted))
+
+    def select(self, puzzle_filter: PuzzleFilter = PuzzleFilter()) -> List[int]:
+        """Indices of the puzzles that pass the filter, from the index alone."""
+        matches = self._matcher(puzzle_filter)
+        records = self._map[self.HEADER.size:self.HEADER.size + self._count * self.RECORD.size]
+        return [i for i, (_, rating, mask) in enumerate(self.RECORD.iter_unpack(records))
+                if matches(rating, int.from_bytes(mask, "little"))]
+
+    def sample(self, k: int, puzzle_filter: PuzzleFilter = PuzzleFilter(), seed: int = 0) -> List[int]:
+        """Indices of ``k`` random puzzles that pass the filter (fewer if not enough do), in file order.
+
+        Draws random records and keeps the matching ones, so the cost depends
+        on ``k`` and on how selective the filter is, not on the number of
+        puzzles; a filter that rejects most draws falls back to ``select``.
+        """
+        rng = random.Random(seed)
+        if not puzzle_filter.themes and puzzle_filter.min_rating is None and puzzle_filter.max_rating is None:
+            return sorted(rng.sample(range(self._count), min(k, self._count)))
+        matches = self._matcher(puzzle_filter)
+        chosen = set()
+        for _ in range(20 * k):
+            if len(chosen) == k:
+                return sorted(chosen)
+            i = rng.randrange(self._count)
+            _, rating, mask = self._record(i)
+            if matches(rating, mask):
+                chosen.add(i)
+        candidates = self.select(puzzle_filter)
+        return sorted(rng.sample(candidates, min(k, len(candidates))))
+
+    def load(self, i: int) -> Puzzle:
+        """The puzzle of record ``i``, read with one seek into the CSV."""
+        self._csv.seek(self._record(i)[0])
+        row = next(csv.reader(io.StringIO(self._csv.readline().decode("utf-8"))))
+        puzzle = _puzzle_from_row(dict(zip(self._columns, row)))
+        if puzzle is None:
+            raise ValueError(f"Puzzle index {self.index_path} does not match {self.csv_path}")
+        return puzzle
+
+    def puzzles(self, indices: Iterable[int]) -> List[Puzzle]:
+        return [self.load(i) for i in indices]
+
+    def close(self) -> None:
+        self._map.close()
+        self._csv.close()
+
+    def __enter__(self) -> "PuzzleIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@dataclass
+class PuzzleResult:
+    puzzle: Puzzle
+    solved: bool
+    latencies: List[float] = field(default_factory=list)  # seconds per engine move
+    failed_at: Optional[int] = None  # index in puzzle.moves of the first wrong move
+    played: Optional[str] = None  # the engine's wrong move (UCI)
+    error: Optional[str] = None  # engine failure or invalid puzzle data
+
+
+def solve(engine: "RandomEngine", puzzle: Puzzle, time_budget_sec: float) -> PuzzleResult:
+    """Play the solver's side of a puzzle with ``engine``.
+
+    Each solver move must match the solution, except that any mating move is
+    accepted, as on lichess. The opponent's replies are taken from the
+    solution.
+    """
+    import chess
+
+    result = PuzzleResult(puzzle=puzzle, solved=False)
+    try:
+        board = chess.Board(puzzle.fen)
+        board.push_uci(puzzle.moves[0])
+        for index in range(1, len(puzzle.moves), 2):
+            expected = chess.Move.from_uci(puzzle.moves[index])
+            started = time.perf_counter()
+            move, _ = engine.choose_move_with_explanation(board, time_budget_sec=time_budget_sec)
+            result.latencies.append(time.perf_counter() - started)
+            if move != expected:
+                mates = False
+                if move is not None:
+                    board.push(move)
+                    mates = board.is_checkmate()
+                    board.pop()
+                if not mates:
+                    result.failed_at = index
+                    result.played = move.uci() if move is not None else None
+                    return result
+            board.push(expected)
+            if index + 1 < len(puzzle.moves):
+                board.push_uci(puzzle.moves[index + 1])
+    except (ValueError, RuntimeError, TimeoutError) as e:
+        result.error = f"{type(e).__name__}: {e}"
+        return result
+    result.solved = True
+    return result
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile (0 < q <= 100) of already sorted values; 0.0 if there are none."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
@@ -46,10 +46,10 @@ else
   echo "[run_tests] No requirements.txt found; proceeding without dependency install"
 fi
 
-# Ensure pytest is available in venv
-if ! "$VENV_PY" -c "import pytest" >/dev/null 2>&1; then
-  echo "[run_tests] Installing pytest"
-  "$VENV_PY" -m pip install pytest
+# Ensure pytest and pytest-xdist (for -n auto) are available in venv
+if ! "$VENV_PY" -c "import pytest, xdist" >/dev/null 2>&1; then
+  echo "[run_tests] Installing pytest and pytest-xdist"
+  "$VENV_PY" -m pip install pytest pytest-xdist
 fi
 
 # Make project importable (module root and repo root)
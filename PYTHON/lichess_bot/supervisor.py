@@ -0,0 +1,240 @@
+"""Multi-process sharding of games across worker processes.
+
+The parent process reads the Lichess event stream once and hands each new game
+to the worker with the fewest active games. Every worker owns its own
+``LichessAPI`` session and ``RandomEngine`` and runs games as threads, so move
+generation, JSON parsing and logging are spread over several interpreters
+instead of sharing one GIL.
+
+Workers report back over a single status queue:
+- ``("heartbeat", index, active_games)`` every ``HEARTBEAT_INTERVAL`` seconds
+- ``("finished", index, game_id)`` when a game thread ends
+
+A monitor thread in the parent drains that queue, restarts workers that died or
+stopped sending heartbeats, and re-assigns their games to healthy workers.
+Re-assigning is safe because ``handle_game`` rebuilds the position from the
+``gameFull`` event of the game stream.
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from . import metrics
+from .affinity import AffinityConfig
+from .logging_setup import LogConfig, configure_logging
+
+HEARTBEAT_INTERVAL = 2.0
+HEARTBEAT_TIMEOUT = 15.0
+
+
+@dataclass
+class WorkerHandle:
+    index: int
+    process: multiprocessing.process.BaseProcess
+    jobs: "multiprocessing.Queue"
+    games: Set[str] = field(default_factory=set)
+    last_heartbeat: float = field(default_factory=time.monotonic)
+
+    @property
+    def load(self) -> int:
+        return len(self.games)
+
+    def is_healthy(self, now: float) -> bool:
+        return self.process.is_alive() and (now - self.last_heartbeat) < HEARTBEAT_TIMEOUT
+
+
+def _worker_main(
+    index: int,
+    token: str,
+    bot_version: int,
+    log_config: LogConfig,
+    metrics_port: int,
+    affinity: AffinityConfig,
+    jobs,
+    status,
+) -> None:
+    """Entry point of a worker process: play every game id received on ``jobs``."""
+    configure_logging(log_config)
+    if metrics_port:
+        metrics.serve_metrics(metrics_port)
+    # Imported here so the spawned interpreter only loads the game machinery it needs
+    from .engine import RandomEngine
+    from .lichess_api import LichessAPI
+    from .main import handle_game
+
+    affinity.network.apply_to_current_thread()
+    api = LichessAPI(token)
+    engine = RandomEngine(cpu_policy=affinity.engine)
+    threads: Dict[str, threading.Thread] = {}
+    lock = threading.Lock()
+
+    def run_game(game_id: str) -> None:
+        try:
+            handle_game(api, engine, game_id, bot_version, affinity=affinity)
+        finally:
+            with lock:
+                threads.pop(game_id, None)
+            status.put(("finished", index, game_id))
+
+    logging.info("Worker %s ready", index)
+    next_heartbeat = 0.0
+    while True:
+        now = time.monotonic()
+        if now >= next_heartbeat:
+            with lock:
+                active = len(threads)
+            status.put(("heartbeat", index, active))
+            next_heartbeat = now + HEARTBEAT_INTERVAL
+        try:
+            game_id = jobs.get(timeout=HEARTBEAT_INTERVAL)
+        except queue.Empty:
+            continue
+        if game_id is None:
+            logging.info("Worker %s stopping", index)
+            return
+        with lock:
+            if game_id in threads and threads[game_id].is_alive():
+                continue
+            t = threading.Thread(target=run_game, args=(game_id,), name=f"game-{game_id}", daemon=True)
+            threads[game_id] = t
+        t.start()
+
+
+class Supervisor:
+    """Start N worker processes and balance games across them by active game count."""
+
+    def __init__(
+        self,
+        workers: int,
+        *,
+        token: str,
+        bot_version: int,
+        log_config: Optional[LogConfig] = None,
+        metrics_port: int = 0,
+        affinity: Optional[AffinityConfig] = None,
+    ):
+        if workers < 1:
+            raise ValueError("Supervisor needs at least one worker")
+        self.num_workers = workers
+        self.token = token
+        self.bot_version = bot_version
+        self.log_config = log_config or LogConfig()
+        # Worker i serves its own metrics on metrics_port + 1 + i (0 = off)
+        self.metrics_port = metrics_port
+        self.affinity = affinity or AffinityConfig()
+        # 'spawn' avoids forking a process that already runs network threads
+        self._ctx = multiprocessing.get_context("spawn")
+        self._status = self._ctx.Queue()
+        self._workers: List[WorkerHandle] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+
+    def _spawn(self, index: int) -> WorkerHandle:
+        jobs = self._ctx.Queue()
+        port = self.metrics_port + 1 + index if self.metrics_port else 0
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.token, self.bot_version, self.log_config, port, self.affinity, jobs, self._status),
+            name=f"worker-{index}",
+            daemon=True,
+        )
+        proc.start()
+        return WorkerHandle(index=index, process=proc, jobs=jobs)
+
+    def start(self) -> None:
+        with self._lock:
+            self._workers = [self._spawn(i) for i in range(self.num_workers)]
+        logging.info("Supervisor started %s worker processes", self.num_workers)
+        self._monitor = threading.Thread(target=self._monitor_loop, name="supervisor", daemon=True)
+        self._monitor.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._lock:
+            workers = list(self._workers)
+        for w in workers:
+            try:
+                w.jobs.put(None)
+            except Exception:
+                pass
+        for w in workers:
+            w.process.join(timeout=5)
+            if w.process.is_alive():
+                w.process.terminate()
+
+    def loads(self) -> Dict[int, int]:
+        """Return active game count per worker index."""
+        with self._lock:
+            return {w.index: w.load for w in self._workers}
+
+    def assign(self, game_id: str) -> int:
+        """Send ``game_id`` to the least loaded healthy worker and return its index."""
+        with self._lock:
+            for w in self._workers:
+                if game_id in w.games:
+                    if w.process.is_alive():
+                        return w.index
+                    w.games.discard(game_id)
+            return self._assign_locked(game_id)
+
+    def _assign_locked(self, game_id: str) -> int:
+        now = time.monotonic()
+        candidates = [w for w in self._workers if w.is_healthy(now)] or self._workers
+        target = min(candidates, key=lambda w: (w.load, w.index))
+        target.games.add(game_id)
+        target.jobs.put(game_id)
+        logging.info("Assigned game %s to worker %s (load=%s)", game_id, target.index, target.load)
+        return target.index
+
+    def poll(self, timeout: float = 0.0) -> None:
+        """Apply pending worker status messages, then restart unhealthy workers."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                remaining = max(0.0, deadline - time.monotonic())
+                kind, index, payload = self._status.get(timeout=remaining) if remaining else self._status.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                if index >= len(self._workers):
+                    continue
+                w = self._workers[index]
+                if kind == "heartbeat":
+                    w.last_heartbeat = time.monotonic()
+                    metrics.WORKER_ACTIVE_GAMES.set(payload, worker=str(index))
+                elif kind == "finished":
+                    w.games.discard(payload)
+        self.check_health()
+
+    def check_health(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for i, w in enumerate(self._workers):
+                if w.is_healthy(now):
+                    continue
+                orphaned = sorted(w.games)
+                logging.warning(
+                    "Worker %s unhealthy (alive=%s); restarting, re-assigning %s games",
+                    w.index,
+                    w.process.is_alive(),
+                    len(orphaned),
+                )
+                if w.process.is_alive():
+                    w.process.terminate()
+                w.process.join(timeout=1)
+                self._workers[i] = self._spawn(w.index)
+                for game_id in orphaned:
+                    self._assign_locked(game_id)
+
+    def _monitor_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll(timeout=HEARTBEAT_INTERVAL)
+            except Exception as e:
+                logging.warning("Supervisor monitor error: %s", e)
@@ -2,6 +2,8 @@ import os
 import sys
 from pathlib import Path
 
+import pytest
+
 # Add repository root to sys.path so 'import PYTHON.*' works when running
 # pytest with a subdirectory as rootdir.
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
@@ -18,3 +20,59 @@ def pytest_ignore_collect(collection_path: Path, config):
     if basename.startswith("test_blunders_") and basename != "test_blunders_all.py":
         return True
     return False
+
+
+# Engine time budget for tests that don't pass their own
+ENGINE_TIME_SEC = 1.2
+
+
+@pytest.fixture(scope="session")
+def engine_pool():
+    """Engines shared by every test in the session.
+
+    Under pytest-xdist (``-n auto``) each worker process runs its own session
+    and so gets its own engines.
+    """
+    from PYTHON.lichess_bot.engine import EnginePool
+
+    return EnginePool(1, max_time_sec=ENGINE_TIME_SEC)
+
+
+@pytest.fixture
+def engine(engine_pool, record_property):
+    """An engine from the session pool; the test's engine calls and their time are recorded as properties."""
+    with engine_pool.acquire() as eng:
+        calls, seconds = eng.calls, eng.call_seconds
+        yield eng
+        record_property("engine_calls", eng.calls - calls)
+        record_property("engine_seconds", round(eng.call_seconds - seconds, 4))
+
+
+_engine_timings = {}
+
+
+def pytest_runtest_logreport(report):
+    # Runs in the controller under pytest-xdist too, with the workers' reports
+    if report.when == "call":
+        _engine_timings.setdefault(report.nodeid, {})["duration"] = report.duration
+    elif report.when == "teardown":
+        props = dict(report.user_properties)
+        if "engine_calls" in props:
+            _engine_timings.setdefault(report.nodeid, {}).update(props)
+        else:
+            _engine_timings.pop(report.nodeid, None)
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Per-test timing of the engine tests, slowest first (LICHESS_ENGINE_TIMINGS=N rows, 0 for all)."""
+    rows = [(nodeid, t) for nodeid, t in _engine_timings.items() if "engine_calls" in t]
+    if not rows:
+        return
+    rows.sort(key=lambda row: row[1].get("duration", 0.0), reverse=True)
+    limit = int(os.environ.get("LICHESS_ENGINE_TIMINGS", "10"))
+    total = sum(t.get("duration", 0.0) for _, t in rows)
+    engine_total = sum(t["engine_seconds"] for _, t in rows)
+    tr = terminalreporter
+    tr.write_sep("=", f"engine test timings ({len(rows)} tests, {total:.2f}s, {engine_total:.2f}s in the engine)")
+    for nodeid, t in rows[:limit] if limit > 0 else rows:
+        tr.write_line(f"{t.get('duration', 0.0):8.3f}s {t['engine_calls']:4d} calls {t['engine_seconds']:8.3f}s engine  {nodeid}")
@@ -0,0 +1,67 @@
+import argparse
+import subprocess
+import sys
+import time
+
+import pytest
+
+from PYTHON.lichess_bot import affinity
+from PYTHON.lichess_bot.affinity import CpuPolicy, cpu_list_arg, format_cpu_list, launch, parse_cpu_list
+
+
+def test_cpu_list_round_trip():
+    cpus = parse_cpu_list("0-3, 6,8-9")
+    assert cpus == frozenset({0, 1, 2, 3, 6, 8, 9})
+    assert format_cpu_list(cpus) == "0-3,6,8-9"
+    with pytest.raises(ValueError):
+        parse_cpu_list(" , ")
+
+
+def test_cpu_list_options_explain_the_format():
+    assert cpu_list_arg("0-1") == frozenset({0, 1})
+    with pytest.raises(argparse.ArgumentTypeError, match="CPU list such as 0-3,6: invalid literal"):
+        cpu_list_arg("0-x")
+
+
+def test_default_affinity_reserves_cores_for_engines(monkeypatch):
+    monkeypatch.setattr(affinity, "available_cpus", lambda: [0, 1, 2, 3])
+    cfg = affinity.default_affinity(reserved=1)
+    assert cfg.engine.cpus == {0}
+    assert cfg.analysis.cpus == {1, 2, 3}
+    assert cfg.analysis.nice > 0
+    assert cfg.network.cpus is None
+
+    # Too few cores to split: nothing pinned, analysis only deprioritized
+    monkeypatch.setattr(affinity, "available_cpus", lambda: [0])
+    cfg = affinity.default_affinity(reserved=1)
+    assert cfg.engine.cpus is None and cfg.analysis.cpus is None
+    assert cfg.analysis.nice > 0
+
+
+def test_launch_records_child_cpu_time():
+    burn = "s = 0\nfor i in range(2_000_000):\n    s += i"
+    with launch([sys.executable, "-c", burn], policy=CpuPolicy(nice=1), stdout=subprocess.PIPE) as proc:
+        proc.communicate(timeout=60)
+    assert proc.returncode == 0
+    assert proc.cpu_seconds > 0
+
+
+def test_cpu_time_is_kept_when_poll_reaps_the_child():
+    burn = "s = 0\nfor i in range(2_000_000):\n    s += i\nraise SystemExit(3)"
+    proc = launch([sys.executable, "-c", burn])
+    while proc.poll() is None:
+        time.sleep(0.01)
+    assert proc.returncode == 3
+    assert proc.cpu_seconds > 0
+    assert proc.wait() == 3
+
+
+def test_wait_with_timeout_still_raises_while_the_child_runs():
+    proc = launch([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        with pytest.raises(subprocess.TimeoutExpired):
+            proc.wait(timeout=0.05)
+    finally:
+        proc.kill()
+        proc.wait()
+    assert proc.returncode == -9
@@ -0,0 +1,34 @@
+from PYTHON.lichess_bot.puzzle_db import Puzzle, PuzzleResult
+from PYTHON.lichess_bot.tools.bench_puzzles import previous_run, summarize
+
+FEN = "6k1/5ppp/8/8/8/8/5PPP/R3R1K1 b - - 0 1"
+
+
+def _result(rating, solved, latencies=(0.01,)):
+    puzzle = Puzzle(id=f"p{rating}", fen=FEN, moves=["g8h8", "e1e8"], rating=rating)
+    return PuzzleResult(puzzle=puzzle, solved=solved, latencies=list(latencies))
+
+
+def test_summary_counts_solved_puzzles_per_rating_band():
+    results = [_result(1450, True), _result(1200, False), _result(1600, True), _result(1999, False),
+               _result(2000, True, latencies=(0.02, 0.03))]
+    summary = summarize(results, elapsed=2.0, band_width=400)
+    assert summary["bands"] == {"1200-1599": [1, 2], "1600-1999": [1, 2], "2000-2399": [1, 1]}
+    assert list(summary["bands"]) == ["1200-1599", "1600-1999", "2000-2399"]
+    assert (summary["puzzles"], summary["solved"], summary["positions"]) == (5, 3, 6)
+    assert summary["solve_rate"] == 0.6
+    assert summary["positions_per_sec"] == 3.0
+
+
+def test_previous_run_is_the_latest_of_another_version_on_the_same_selection():
+    selection = {"csv": "puzzles.csv", "sample": 1000, "seed": 0}
+    runs = [
+        {"bot_version": "v1", "selection": selection, "date": "first"},
+        {"bot_version": "v2", "selection": selection, "date": "second"},
+        {"bot_version": "v2", "selection": {**selection, "seed": 1}, "date": "other seed"},
+        {"bot_version": "v3", "selection": selection, "date": "this version"},
+    ]
+    assert previous_run(runs, selection, "v3")["date"] == "second"
+    assert previous_run(runs, selection, "v2")["date"] == "this version"
+    assert previous_run(runs, {**selection, "seed": 1}, "v2") is None
+    assert previous_run([], selection, "v3") is None
@@ -0,0 +1,72 @@
+from PYTHON.lichess_bot.blunder_cases import BlunderCase, BlunderCaseStore, case_key, load_cases
+
+FEN = "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"
+
+
+def _case(**overrides):
+    fields = dict(fen=FEN, blunder="d8h4", best="b8c6", ply=4, side="B", games=["abcd1234"])
+    fields.update(overrides)
+    return BlunderCase(**fields)
+
+
+def test_cases_are_keyed_by_position_without_move_counters_and_move():
+    assert case_key(FEN, "d8h4") == case_key(FEN.replace(" 1 2", " 7 30"), "d8h4")
+    assert case_key(FEN, "d8h4") != case_key(FEN, "d8g5")
+    assert _case().label == "ply4_B_d8h4_best_b8c6"
+
+
+def test_add_dedups_and_updates_by_appending(tmp_path):
+    path = str(tmp_path / "cases.jsonl")
+    with BlunderCaseStore(path) as store:
+        assert store.add(_case()) == "added"
+        assert store.add(_case(fen=FEN.replace(" 1 2", " 3 9"))) == "unchanged"
+        assert store.add(_case(best=None)) == "unchanged"
+        assert store.add(_case(best="g8f6")) == "updated"
+        assert store.add(_case(blunder="f8c5", best=None)) == "added"
+        assert len(store) == 2
+    with open(path) as f:
+        assert len(f.readlines()) == 3  # the update superseded a line instead of rewriting the file
+
+    cases = load_cases(path)
+    assert [(c.blunder, c.best) for c in cases] == [("d8h4", "g8f6"), ("f8c5", None)]
+    assert BlunderCaseStore(path).get(FEN, "d8h4").best == "g8f6"
+
+
+def test_same_blunder_from_other_games_is_one_weighted_case(tmp_path):
+    # Reached by transposition (1.Nf3 e5 2.e4) at another move number: same position
+    transposed = "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq e3 0 2"
+    path = str(tmp_path / "cases.jsonl")
+    with BlunderCaseStore(path) as store:
+        assert store.add(_case()) == "added"
+        assert store.add(_case(fen=transposed, games=["efgh5678"])) == "updated"
+        assert store.add(_case(games=["efgh5678"])) == "unchanged"
+        assert len(store) == 1
+    [case] = load_cases(path)
+    assert case.games == ["abcd1234", "efgh5678"]
+    assert case.weight == 2
+
+
+def test_store_is_compacted_once_superseded_lines_dominate(tmp_path):
+    path = str(tmp_path / "cases.jsonl")
+    with BlunderCaseStore(path) as store:
+        store.add(_case())
+        for best in ("a7a6", "b7b6", "c7c6"):
+            store.add(_case(best=best))
+    with open(path) as f:
+        assert len(f.readlines()) == 1
+    assert load_cases(path)[0].best == "c7c6"
+
+
+def test_missing_file_and_truncated_lines_are_tolerated(tmp_path):
+    path = tmp_path / "cases.jsonl"
+    assert load_cases(str(path)) == []
+    path.write_text('{"fen": "%s", "blunder": "d8h4", "game": "abcd1234"}\n{"fen": "x", "blund' % FEN)
+    assert [(c.blunder, c.games, c.weight) for c in load_cases(str(path))] == [("d8h4", ["abcd1234"], 1)]
+
+
+def test_cases_added_after_a_truncated_line_are_kept(tmp_path):
+    path = tmp_path / "cases.jsonl"
+    path.write_text('{"fen": "%s", "blunder": "d8h4", "games": ["abcd1234"]}\n{"fen": "x", "blund' % FEN)
+    with BlunderCaseStore(str(path)) as store:
+        assert store.add(_case(blunder="f8c5")) == "added"
+    assert [c.blunder for c in load_cases(str(path))] == ["d8h4", "f8c5"]
@@ -0,0 +1,32 @@
+import sys
+import threading
+
+from PYTHON.lichess_bot.engine import EnginePool
+
+
+def test_pool_lends_each_engine_to_one_thread_at_a_time():
+    # Any executable will do: the engines are only lent, never called
+    pool = EnginePool(2, engine_path=sys.executable)
+    assert len(pool) == 2 and pool.engines[0] is not pool.engines[1]
+
+    in_use = set()
+    clashes = []
+    lock = threading.Lock()
+
+    def borrow():
+        for _ in range(200):
+            with pool.acquire() as engine:
+                with lock:
+                    clashes.append(id(engine) in in_use)
+                    in_use.add(id(engine))
+                with lock:
+                    in_use.discard(id(engine))
+
+    threads = [threading.Thread(target=borrow) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(clashes) == 800 and not any(clashes)
+    with pool.acquire() as a, pool.acquire() as b:
+        assert {id(a), id(b)} == {id(e) for e in pool.engines}
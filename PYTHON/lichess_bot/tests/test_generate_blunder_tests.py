@@ -0,0 +1,124 @@
+import json
+import os
+
+import pytest
+
+from PYTHON.lichess_bot.blunder_cases import load_cases
+from PYTHON.lichess_bot.tools import generate_blunder_tests as gbt
+from PYTHON.lichess_bot.tools.generate_blunder_tests import Blunder, fen_and_uci_for_blunders
+
+PGN = '[Event "Casual"]\n[Result "1-0"]\n\n1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7# 1-0'
+BEFORE_QH5 = "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2"
+BEFORE_NF6 = "r1bqkbnr/pppp1ppp/2n5/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR b KQkq - 3 3"
+
+
+def test_blunders_get_the_position_before_them_and_their_moves_in_uci():
+    nf6 = Blunder(ply=6, side="B", san="Nf6", best_suggestion_san="g6")
+    qh5 = Blunder(ply=3, side="W", san="Qh5", best_suggestion_san="Nf3")
+    past_the_end = Blunder(ply=20, side="W", san="Qd1", best_suggestion_san="Qe2")
+    assert fen_and_uci_for_blunders(PGN, [nf6, past_the_end, qh5]) == [
+        (BEFORE_NF6, "g8f6", "g7g6", nf6),
+        (BEFORE_QH5, "d1h5", "g1f3", qh5),
+    ]
+
+
+@pytest.mark.parametrize("best", ["Qxf7", "zz9"])
+def test_an_illegal_or_unparsable_best_suggestion_is_an_error(best):
+    with pytest.raises(ValueError, match=f"best_suggestion SAN '{best}' at ply 3 side W"):
+        fen_and_uci_for_blunders(PGN, [Blunder(ply=3, side="W", san="Qh5", best_suggestion_san=best)])
+
+
+def test_a_blunder_row_that_does_not_match_the_game_is_skipped(capsys):
+    off_by_one = Blunder(ply=5, side="W", san="Qh5", best_suggestion_san="Nf3")
+    mate = Blunder(ply=7, side="W", san="Qxf7", best_suggestion_san="Qxf7#")
+    assert [uci for _, uci, _, _ in fen_and_uci_for_blunders(PGN, [off_by_one, mate])] == ["h5f7"]
+    assert "ply 5 side W: the log says Qh5 but the game played Bc4" in capsys.readouterr().err
+
+
+def test_an_illegal_move_in_the_pgn_ends_the_game():
+    pgn = "1. e4 e5 2. Ke3 Nc6 *"
+    blunders = [Blunder(ply=2, side="B", san="e5", best_suggestion_san="c5"),
+                Blunder(ply=4, side="B", san="Nc6", best_suggestion_san="Nf6")]
+    assert [uci for _, uci, _, _ in fen_and_uci_for_blunders(pgn, blunders)] == ["e7e5"]
+
+
+# One Blunder row per game, at a different ply: (ply, side, move, best suggestion)
+ROWS = {"AAAA": (3, "W", "Qh5", "Nf3"), "BBBB": (4, "B", "Nc6", "Nf6"), "CCCC": (6, "B", "Nf6", "g6")}
+
+
+def _write_log(directory, game_id, rows=True):
+    lines = ["Columns: ply  side  move  played_eval  best_eval  loss  class  best_suggestion"]
+    if rows:
+        ply, side, san, best = ROWS[game_id]
+        lines.append(f"  {ply}  {side}   {san}            +0.00      -3.00    300  Blunder       {best}")
+    lines += ["", "PGN:", PGN, ""]
+    path = directory / f"lichess_bot_game_{game_id}.log"
+    path.write_text("\n".join(lines))
+    return str(path)
+
+
+@pytest.fixture(params=[1, 2], ids=["jobs1", "jobs2"])
+def generate(request, tmp_path, monkeypatch):
+    """``run_incremental`` with its manifest, case store and test file under tmp_path."""
+    monkeypatch.setattr(gbt, "MANIFEST", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(gbt, "DEFAULT_PATH", str(tmp_path / "cases.jsonl"))
+    monkeypatch.setattr(gbt, "UNIFIED_TEST", str(tmp_path / "test_blunders_all.py"))
+    hashed = []
+    content_hash = gbt._content_hash
+    monkeypatch.setattr(gbt, "_content_hash", lambda path: hashed.append(os.path.basename(path)) or content_hash(path))
+
+    def run(log_paths, force=False):
+        hashed.clear()
+        return gbt.run_incremental(log_paths, jobs=request.param, force=force)
+
+    run.hashed = hashed
+    return run
+
+
+@pytest.fixture
+def logs(tmp_path):
+    directory = tmp_path / "past_games"
+    directory.mkdir()
+    return [_write_log(directory, game_id) for game_id in ("CCCC", "AAAA", "BBBB")]
+
+
+def test_cases_are_merged_in_log_order(generate, logs, tmp_path):
+    assert generate(logs) == (3, 0, 3)
+    assert [(c.blunder, c.games) for c in load_cases(str(tmp_path / "cases.jsonl"))] == [
+        ("g8f6", ["CCCC"]), ("d1h5", ["AAAA"]), ("b8c6", ["BBBB"]),
+    ]
+    assert os.path.exists(tmp_path / "test_blunders_all.py")
+
+
+def test_logs_with_the_same_size_and_mtime_are_skipped_without_hashing(generate, logs):
+    generate(logs)
+    assert generate(logs) == (0, 3, 0)
+    assert generate.hashed == []
+
+
+def test_a_touched_but_unchanged_log_is_hashed_once_and_skipped(generate, logs):
+    generate(logs)
+    st = os.stat(logs[1])
+    os.utime(logs[1], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert generate(logs) == (0, 3, 0)
+    assert generate.hashed == ["lichess_bot_game_AAAA.log"]
+    assert generate(logs) == (0, 3, 0)  # the manifest kept the new mtime
+    assert generate.hashed == []
+
+
+def test_force_or_a_missing_case_store_reads_every_log(generate, logs, tmp_path):
+    generate(logs)
+    assert generate(logs, force=True) == (3, 0, 3)
+    os.remove(tmp_path / "cases.jsonl")
+    assert generate(logs) == (3, 0, 3)
+    assert len(load_cases(str(tmp_path / "cases.jsonl"))) == 3
+
+
+def test_failed_and_deleted_logs_are_read_again(generate, logs, tmp_path):
+    no_blunders = _write_log(tmp_path / "past_games", "DDDD", rows=False)
+    generate(logs + [no_blunders])
+    os.remove(logs[0])
+    assert generate(logs + [no_blunders]) == (2, 2, 0)
+    with open(tmp_path / "manifest.json") as f:
+        assert sorted(json.load(f)["logs"]) == [os.path.join("past_games", "lichess_bot_game_AAAA.log"),
+                                                 os.path.join("past_games", "lichess_bot_game_BBBB.log")]
@@ -0,0 +1,67 @@
+import io
+import logging
+import threading
+
+from PYTHON.lichess_bot.logging_setup import (
+    GameDebugSampler,
+    LogConfig,
+    configure_logging,
+    end_game_logging,
+    stop_logging,
+)
+
+
+def _record(level, thread="game-abc"):
+    rec = logging.LogRecord("x", level, __file__, 1, "msg %s", ("a",), None)
+    rec.threadName = thread
+    return rec
+
+
+def test_sampler_keeps_one_in_n_debug_per_thread():
+    sampler = GameDebugSampler(every=3)
+    kept_a = [sampler.filter(_record(logging.DEBUG, "game-a")) for _ in range(6)]
+    kept_b = [sampler.filter(_record(logging.DEBUG, "game-b")) for _ in range(2)]
+    assert kept_a == [True, False, False, True, False, False]
+    assert kept_b == [True, False]
+    # INFO and above are never sampled
+    assert all(sampler.filter(_record(logging.INFO, "game-a")) for _ in range(5))
+
+
+def test_sampler_rate_limits_debug_per_second(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    sampler = GameDebugSampler(per_sec=2)
+    assert [sampler.filter(_record(logging.DEBUG)) for _ in range(4)] == [True, True, False, False]
+    now[0] += 1.0
+    assert sampler.filter(_record(logging.DEBUG))
+
+
+def test_finished_game_threads_are_evicted_from_the_sampler():
+    configure_logging(LogConfig(level="DEBUG", debug_every=2), stream=io.StringIO())
+    try:
+        [sampler] = [f for h in logging.getLogger().handlers for f in h.filters if isinstance(f, GameDebugSampler)]
+
+        def game():
+            logging.debug("move %s", "e2e4")
+            assert "game-xyz" in sampler._seen
+            end_game_logging()
+
+        t = threading.Thread(target=game, name="game-xyz")
+        t.start()
+        t.join()
+        assert "game-xyz" not in sampler._seen and "game-xyz" not in sampler._windows
+    finally:
+        stop_logging()
+
+
+def test_configure_logging_writes_through_background_listener():
+    out = io.StringIO()
+    configure_logging(LogConfig(level="INFO"), stream=out)
+    try:
+        logging.info("Game %s: playing %s", "abc", "e2e4")
+        logging.debug("hidden %s", "x")
+    finally:
+        stop_logging()
+    text = out.getvalue()
+    assert "Game abc: playing e2e4" in text
+    assert "hidden" not in text
@@ -0,0 +1,60 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from PYTHON.lichess_bot import metrics
+from PYTHON.lichess_bot.metrics import Registry
+
+
+def test_registry_renders_prometheus_text():
+    reg = Registry()
+    c = reg.counter("t_requests_total", "Requests", ("endpoint", "status"))
+    g = reg.gauge("t_active", "Active")
+    h = reg.histogram("t_latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    c.inc(endpoint="/api/x", status="200")
+    c.inc(2, endpoint="/api/x", status="429")
+    g.inc()
+    g.inc()
+    g.dec()
+    h.observe(0.05)
+    h.observe(0.5)
+    h.observe(3.0)
+
+    text = reg.render()
+    assert "# TYPE t_requests_total counter" in text
+    assert 't_requests_total{endpoint="/api/x",status="429"} 2' in text
+    assert "t_active 1" in text
+    assert 't_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 't_latency_seconds_bucket{le="1"} 2' in text
+    assert 't_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "t_latency_seconds_count 3" in text
+
+
+def test_label_mismatch_is_rejected():
+    reg = Registry()
+    c = reg.counter("t_total", "x", ("endpoint",))
+    with pytest.raises(ValueError):
+        c.inc(status="200")
+
+
+def test_metrics_endpoint_and_health_check():
+    server = metrics.serve_metrics(0, require_stream=True)
+    port = server.server_address[1]
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        assert "lichess_bot_active_games" in body
+
+        # Stream not connected yet -> unhealthy for the stream owner
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=5)
+        assert exc.value.code == 503
+
+        metrics.STREAM_CONNECTED.set(1)
+        health = json.loads(urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=5).read())
+        assert health["status"] == "ok" and health["event_stream_connected"] is True
+    finally:
+        metrics.STREAM_CONNECTED.set(0)
+        server.shutdown()
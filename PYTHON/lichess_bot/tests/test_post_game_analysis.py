@@ -0,0 +1,67 @@
+import io
+import json
+import socket
+import threading
+from dataclasses import asdict
+
+import chess.pgn
+import pytest
+
+from PYTHON.lichess_bot import main
+from PYTHON.lichess_bot.affinity import CpuPolicy
+from PYTHON.stockfish_analysis.analysis import PlyResult
+
+GAME = "1. e4 e5 2. Nf3 *"
+
+
+def _ply(n: int, san: str) -> PlyResult:
+    return PlyResult(ply=n, side="W" if n % 2 else "B", san=san, played_cp=20, played_mate=None, best_cp=25,
+                     best_mate=None, cp_loss=5, classification="Best", best_san=san)
+
+
+def _fake_daemon(path: str, replies) -> threading.Thread:
+    """Accept one job, send ``replies`` (lines) and hang up; None instead of a list never answers."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+
+    def serve():
+        conn, _ = server.accept()
+        with conn, server:
+            conn.makefile("rb").readline()
+            if replies is None:
+                conn.recv(1)  # until the client gives up
+                return
+            for line in replies:
+                conn.sendall(line.encode("utf-8") + b"\n")
+
+    t = threading.Thread(target=serve, daemon=True)
+    t.start()
+    return t
+
+
+@pytest.mark.parametrize("replies", [
+    [json.dumps(asdict(_ply(1, "e4")))],  # connection dropped after one ply
+    [json.dumps(asdict(_ply(1, "e4"))), json.dumps({"error": "engine died"})],
+    None,  # daemon accepts the job and goes quiet
+    [json.dumps({**asdict(_ply(1, "e4")), "new_field": 1})],  # daemon of another version
+    ["[]"],
+])
+def test_failed_daemon_job_falls_back_to_in_process_analysis(tmp_path, monkeypatch, replies):
+    path = str(tmp_path / "daemon.sock")
+    daemon = _fake_daemon(path, replies)
+    monkeypatch.setenv(main.ANALYSIS_SOCKET_ENV, path)
+    monkeypatch.setattr(main, "ANALYSIS_DAEMON_TIMEOUT_SEC", 0.2)
+
+    def in_process(game, game_id, policy, collect):
+        collect([_ply(1, "e4"), _ply(2, "e5"), _ply(3, "Nf3")])
+        return 3
+
+    monkeypatch.setattr(main, "_analyze_in_process", in_process)
+    game = chess.pgn.read_game(io.StringIO(GAME))
+    table = main._analyze_finished_game(game, "abcd1234", CpuPolicy())
+    daemon.join(timeout=5)
+
+    rows = [line for line in table.splitlines() if line.lstrip()[:1].isdigit()]
+    assert [row.split()[0] for row in rows] == ["1", "2", "3"]  # the daemon's partial row was dropped
+    assert "Engine calls: 3 for 3 plies" in table
@@ -0,0 +1,73 @@
+import chess
+
+from PYTHON.lichess_bot.puzzle_db import Puzzle, PuzzleFilter, PuzzleIndex, iter_puzzles, percentile, select_puzzles, solve
+
+# Back-rank mate: after 1...Kh8?? (setup move), 2.Re8# or 2.Ra8# solve it
+FEN = "6k1/5ppp/8/8/8/8/5PPP/R3R1K1 b - - 0 1"
+HEADER = "PuzzleId,FEN,Moves,Rating,RatingDeviation,Popularity,NbPlays,Themes,GameUrl,OpeningTags\n"
+
+
+class ScriptedEngine:
+    def __init__(self, *ucis):
+        self.ucis = list(ucis)
+
+    def choose_move_with_explanation(self, board, *, time_budget_sec):
+        return chess.Move.from_uci(self.ucis.pop(0)), "scripted"
+
+
+def _csv(tmp_path, rows):
+    path = tmp_path / "puzzles.csv"
+    path.write_text(HEADER + "".join(f"{r},{FEN},g8h8 e1e8,{1000 + 100 * i},80,90,100,{t},,\n"
+                                     for i, (r, t) in enumerate(rows)))
+    return str(path)
+
+
+def test_filters_and_sample_are_deterministic(tmp_path):
+    path = _csv(tmp_path, [(f"p{i}", "mate mateIn1" if i % 2 else "endgame") for i in range(10)])
+    puzzles = list(iter_puzzles(path))
+    assert [p.rating for p in puzzles][:2] == [1000, 1100]
+
+    band = select_puzzles(puzzles, PuzzleFilter(min_rating=1200, max_rating=1500, themes=frozenset({"mateIn1"})))
+    assert [p.id for p in band] == ["p3", "p5"]
+
+    sample = select_puzzles(puzzles, sample=4, seed=7)
+    assert len(sample) == 4
+    assert sample == select_puzzles(iter_puzzles(path), sample=4, seed=7)
+    assert [p.id for p in sample] == sorted((p.id for p in sample), key=lambda i: int(i[1:]))
+
+
+def test_index_gives_the_same_puzzles_as_streaming(tmp_path):
+    path = _csv(tmp_path, [(f"p{i}", "mate mateIn1" if i % 2 else "endgame") for i in range(10)])
+    band = PuzzleFilter(min_rating=1200, max_rating=1500, themes=frozenset({"mateIn1"}))
+    with PuzzleIndex(path) as index:
+        assert len(index) == 10 and index.rating(3) == 1300
+        assert index.puzzles(index.select(band)) == select_puzzles(iter_puzzles(path), band)
+        assert index.puzzles(range(len(index))) == list(iter_puzzles(path))
+        assert index.puzzles(index.sample(2, band)) == select_puzzles(iter_puzzles(path), band)
+        assert index.sample(3, seed=1) == index.sample(3, seed=1)
+        assert index.select(PuzzleFilter(themes=frozenset({"unknown"}))) == []
+
+
+def test_index_is_rebuilt_when_the_csv_changes(tmp_path):
+    path = _csv(tmp_path, [("a", "endgame")])
+    with PuzzleIndex(path) as index:
+        assert len(index) == 1
+    path = _csv(tmp_path, [("a", "endgame"), ("b", "fork")])
+    with PuzzleIndex(path) as index:
+        assert [p.id for p in index.puzzles(index.select(PuzzleFilter(themes=frozenset({"fork"}))))] == ["b"]
+
+
+def test_solve_accepts_the_solution_or_any_other_mate():
+    puzzle = Puzzle(id="mate", fen=FEN, moves=["g8h8", "e1e8"], rating=900)
+    assert solve(ScriptedEngine("e1e8"), puzzle, 0.1).solved
+    assert solve(ScriptedEngine("a1a8"), puzzle, 0.1).solved
+    result = solve(ScriptedEngine("e1e2"), puzzle, 0.1)
+    assert not result.solved and (result.failed_at, result.played) == (1, "e1e2")
+    assert len(result.latencies) == 1
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert (percentile(values, 50), percentile(values, 99), percentile(values, 100)) == (50.0, 99.0, 100.0)
+    assert percentile([], 90) == 0.0
+
@@ -5,34 +5,60 @@ from typing import List, Tuple
 import chess
 import pytest
 
-from PYTHON.lichess_bot.engine import RandomEngine
+from PYTHON.lichess_bot.puzzle_db import PuzzleIndex
+from PYTHON.stockfish_analysis.positions import count_duplicates, position_key
 
 
-def _load_top_puzzles(csv_path: str, limit: int = 8) -> List[Tuple[str, str]]:
+def _puzzle_key(row: Tuple[str, str]) -> str:
+    fen, moves = row
+    return f"{position_key(fen)} {moves}"
+
+
+def _load_top_puzzles(csv_path: str, limit: int = 8) -> List[Tuple[str, str, int]]:
     """
-    Return a list of (FEN, solution_moves_str) for the first `limit` rows in the CSV.
+    Return a list of (FEN, solution_moves_str, weight) for the first `limit` distinct puzzles in the CSV.
+    Rows with the same position (ignoring move counters) and solution are one puzzle; weight counts them.
     CSV columns: PuzzleId,FEN,Moves,...
     """
-    puzzles: List[Tuple[str, str]] = []
+    rows: List[Tuple[str, str]] = []
+    distinct = set()
     with open(csv_path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             fen = row["FEN"].strip()
             moves = row["Moves"].strip()
             if fen and moves:
-                puzzles.append((fen, moves))
-            if len(puzzles) >= limit:
-                break
-    return puzzles
+                distinct.add(_puzzle_key((fen, moves)))
+                if len(distinct) > limit:
+                    break
+                rows.append((fen, moves))
+    return [(fen, moves, weight) for (fen, moves), weight in count_duplicates(rows, _puzzle_key)]
+
+
+def _sample_puzzles(csv_path: str, sample: int, seed: int) -> List[Tuple[str, str, int]]:
+    """
+    Like _load_top_puzzles, for a random sample of `sample` rows drawn through the CSV's .idx side file
+    (built on first use), so any part of the database can be reached without reading it all.
+    """
+    with PuzzleIndex(csv_path) as index:
+        rows = [(p.fen, " ".join(p.moves)) for p in index.puzzles(index.sample(sample, seed=seed))]
+    return [(fen, moves, weight) for (fen, moves), weight in count_duplicates(rows, _puzzle_key)]
+
+
+def _puzzles() -> List[Tuple[str, str, int]]:
+    # LICHESS_PUZZLE_SAMPLE=N runs N random puzzles (LICHESS_PUZZLE_SEED, default 0) instead of the first 8
+    csv_path = os.path.join(os.path.dirname(__file__), "lichess_db_puzzle.csv")
+    sample = int(os.environ.get("LICHESS_PUZZLE_SAMPLE", "0"))
+    if sample > 0:
+        return _sample_puzzles(csv_path, sample, int(os.environ.get("LICHESS_PUZZLE_SEED", "0")))
+    return _load_top_puzzles(csv_path, limit=8)
 
 
-@pytest.mark.parametrize(
-    "fen,moves_str",
-    _load_top_puzzles(os.path.join(os.path.dirname(__file__), "lichess_db_puzzle.csv"), limit=8),
-)
-def test_puzzle_engine_follow_solution(fen: str, moves_str: str):
+@pytest.mark.parametrize("fen,moves_str,weight", _puzzles())
+def test_puzzle_engine_follow_solution(fen: str, moves_str: str, weight: int, engine, record_property):
+    record_property("weight", weight)
     board = chess.Board(fen)
-    eng = RandomEngine(max_time_sec=1.0)
+    eng = engine
 
     # Moves are space-separated UCIs alternating sides starting from side-to-move in the FEN
     solution_moves = moves_str.split()
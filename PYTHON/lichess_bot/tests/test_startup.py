@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+
+# Modules the event loop does not need before it connects; they must be imported on first use.
+DEFERRED_MODULES = ("chess", "chess.pgn", "chess.engine", "subprocess", "multiprocessing", "http.server")
+
+# Cumulative import time of PYTHON.lichess_bot.main. Most of it is `requests`; importing
+# python-chess eagerly alone adds ~100 ms. Override on slow CI machines.
+IMPORT_BUDGET_MS = float(os.getenv("LICHESS_BOT_IMPORT_BUDGET_MS", "400"))
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def test_startup_defers_heavy_imports():
+    code = (
+        "import sys, PYTHON.lichess_bot.main\n"
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    loaded = _run("-c", code).stdout.strip()
+    assert loaded == "", f"Imported at startup but only needed later: {loaded}"
+
+
+def test_import_time_within_budget():
+    stderr = _run("-X", "importtime", "-c", "import PYTHON.lichess_bot.main").stderr
+    cumulative_us = None
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == "PYTHON.lichess_bot.main":
+            cumulative_us = int(parts[1])
+    assert cumulative_us is not None, stderr[-2000:]
+    assert cumulative_us / 1000.0 <= IMPORT_BUDGET_MS, (
+        f"Importing the bot took {cumulative_us / 1000.0:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms); "
+        "run tools/bench_startup.py to see which modules grew"
+    )
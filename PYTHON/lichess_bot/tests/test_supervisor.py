@@ -0,0 +1,69 @@
+import queue
+
+from PYTHON.lichess_bot.supervisor import Supervisor, WorkerHandle
+
+
+class FakeProcess:
+    def __init__(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.alive = False
+
+    def join(self, timeout=None):
+        pass
+
+
+def _fake_supervisor(monkeypatch, workers=3):
+    sup = Supervisor(workers, token="t", bot_version=1)
+    spawned = []
+
+    def fake_spawn(index):
+        handle = WorkerHandle(index=index, process=FakeProcess(), jobs=queue.Queue())
+        spawned.append(handle)
+        return handle
+
+    monkeypatch.setattr(sup, "_spawn", fake_spawn)
+    monkeypatch.setattr(sup, "_status", queue.Queue())
+    with sup._lock:
+        sup._workers = [sup._spawn(i) for i in range(workers)]
+    return sup, spawned
+
+
+def test_assign_balances_by_active_games(monkeypatch):
+    sup, _ = _fake_supervisor(monkeypatch, workers=3)
+
+    assigned = [sup.assign(f"g{i}") for i in range(6)]
+    assert sorted(assigned) == [0, 0, 1, 1, 2, 2]
+
+    # A finished game frees capacity on its worker, which gets the next game
+    sup._status.put(("finished", 1, "g1"))
+    sup.poll()
+    assert sup.loads() == {0: 2, 1: 1, 2: 2}
+    assert sup.assign("g6") == 1
+
+
+def test_assign_is_idempotent_for_running_game(monkeypatch):
+    sup, _ = _fake_supervisor(monkeypatch, workers=2)
+    first = sup.assign("abc")
+    assert sup.assign("abc") == first
+    assert sum(sup.loads().values()) == 1
+
+
+def test_dead_worker_is_restarted_and_games_reassigned(monkeypatch):
+    sup, spawned = _fake_supervisor(monkeypatch, workers=2)
+    sup.assign("g0")
+    sup.assign("g1")
+    victim = sup._workers[0]
+    victim.process.alive = False
+
+    sup.check_health()
+
+    assert len(spawned) == 3
+    assert sup._workers[0] is not victim
+    assert sum(sup.loads().values()) == 2
+    # Re-assigned game was sent to the fresh worker's queue
+    assert sup._workers[0].jobs.get_nowait() == "g0"
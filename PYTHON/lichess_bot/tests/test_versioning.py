@@ -1,7 +1,7 @@
 import os
 import tempfile
 
-from PYTHON.lichess_bot.utils import get_and_increment_version
+from PYTHON.lichess_bot.utils import get_and_increment_version, read_version
 
 
 def test_version_file_increments_and_persists(tmp_path, monkeypatch):
@@ -17,3 +17,16 @@ def test_version_file_increments_and_persists(tmp_path, monkeypatch):
     # Ensure it persisted
     with open(version_file, "r") as f:
         assert f.read().strip() == "2"
+
+
+def test_read_version_does_not_increment(tmp_path, monkeypatch):
+    version_file = tmp_path / "version.txt"
+    monkeypatch.setenv("LICHESS_BOT_VERSION_FILE", str(version_file))
+
+    assert read_version() == 0
+    assert not version_file.exists()
+
+    v = get_and_increment_version()
+    assert read_version() == v
+    assert read_version() == v
+    assert get_and_increment_version() == v + 1
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Measure blunder position extraction in generate_blunder_tests.py over game logs.
+
+Compares, on the same logs and Blunder rows:
+  - before: the board is rebuilt from the initial position for every blunder,
+            re-parsing each earlier move from SAN (O(blunders x plies) per game)
+  - after:  generate_blunder_tests.fen_and_uci_for_blunders, one forward
+            replay of the game's moves per game
+
+Locating the PGN and parsing the Columns table are the same for both and are
+not timed. The two must agree on every (FEN, blunder UCI, best UCI); any
+difference is reported. A row whose SAN is not the game's move at its ply
+is skipped by the single replay (with a warning), so it shows up as one.
+
+Usage:
+    python PYTHON/lichess_bot/tools/bench_blunder_extraction.py [logs or dirs ...] [--repeat 3]
+
+Without arguments, every log in tools/past_games is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import re
+import sys
+import time
+from typing import Callable, List, Tuple
+
+import chess
+import chess.pgn
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_blunder_tests as gbt  # noqa: E402
+
+PAST_GAMES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "past_games")
+LOG_NAME = re.compile(r"lichess_bot_game_[A-Za-z0-9]+\.log$")
+
+
+def _replay_per_blunder(pgn_text: str, blunders: List[gbt.Blunder]) -> List[Tuple[str, str, str, gbt.Blunder]]:
+    """The extraction before the single-pass replay."""
+    game = chess.pgn.read_game(io.StringIO(pgn_text))
+    if game is None:
+        raise RuntimeError("Failed to parse PGN from log")
+    main_sans = []
+    node = game
+    while node.variations:
+        node = node.variation(0)
+        main_sans.append(node.san())
+    results = []
+    for bl in blunders:
+        board = game.board()
+        for san in main_sans[:max(0, bl.ply - 1)]:
+            board.push_san(san)
+        try:
+            move = board.parse_san(bl.san)
+        except ValueError:
+            if bl.ply - 1 >= len(main_sans):
+                continue
+            move = board.parse_san(main_sans[bl.ply - 1])
+        results.append((board.fen(), move.uci(), board.parse_san(bl.best_suggestion_san).uci(), bl))
+    return results
+
+
+def _log_paths(inputs: List[str]) -> List[str]:
+    paths: List[str] = []
+    for item in inputs or [PAST_GAMES]:
+        if os.path.isdir(item):
+            paths.extend(os.path.join(item, name) for name in sorted(os.listdir(item)) if LOG_NAME.search(name))
+        elif os.path.isfile(item):
+            paths.append(item)
+    return paths
+
+
+def load_cases(paths: List[str]) -> List[Tuple[str, List[gbt.Blunder]]]:
+    """(PGN text, Blunder rows) of every log that has both."""
+    cases = []
+    for path in paths:
+        with gbt.open_mapped(path) as buf:
+            start = gbt.pgn_start(buf)
+            if start is None:
+                continue
+            text = gbt.decode(buf, 0, start)
+            pgn_text = gbt.decode(buf, start).strip()
+        try:
+            blunders = gbt.parse_columns_for_blunders(text)
+        except ValueError:
+            continue
+        if blunders and pgn_text:
+            cases.append((pgn_text, blunders))
+    return cases
+
+
+def _run(extract: Callable, cases, repeat: int) -> Tuple[float, list]:
+    """Best wall time over ``repeat`` runs and the extracted positions."""
+    best = float("inf")
+    out: list = []
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        out = []
+        for pgn_text, blunders in cases:
+            try:
+                out.append([c[:3] for c in extract(pgn_text, blunders)])
+            except Exception as e:
+                out.append(f"{type(e).__name__}: {e}")
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("inputs", nargs="*", help="Log files or directories (default: tools/past_games)")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the fastest counts (default: 3)")
+    args = ap.parse_args(argv[1:])
+
+    paths = _log_paths(args.inputs)
+    cases = load_cases(paths)
+    if not cases:
+        print(f"No logs with Blunder rows and a PGN among {len(paths)} files")
+        return 1
+    n_blunders = sum(len(blunders) for _, blunders in cases)
+    print(f"{len(paths)} logs, {len(cases)} with blunders, {n_blunders} blunder rows")
+
+    results = [
+        ("before (replay per blunder, SAN)", *_run(_replay_per_blunder, cases, args.repeat)),
+        ("after (one replay per game)", *_run(gbt.fen_and_uci_for_blunders, cases, args.repeat)),
+    ]
+    base = results[0][1]
+    print(f"{'scenario':<34} {'total ms':>9} {'blunders/s':>11} {'speedup':>8}")
+    for name, seconds, _ in results:
+        print(f"{name:<34} {seconds * 1e3:>9.1f} {n_blunders / seconds:>11.0f} {base / seconds:>7.1f}x")
+
+    differ = sum(1 for a, b in zip(results[0][2], results[1][2]) if a != b)
+    if differ:
+        print(f"Results differ for {differ} of {len(cases)} logs")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Measure logging overhead per game event on the calling (game) thread.
+
+Compares:
+  - before: logging.basicConfig-style StreamHandler writing synchronously,
+            eager f-strings, every per-event line at INFO
+  - after:  queue-based handler from logging_setup, lazy %-args, per-event
+            chatter at DEBUG (filtered at INFO, or sampled when DEBUG is on)
+
+Each simulated event issues the same log calls handle_game and
+LichessAPI._request make for one gameState + one move POST.
+
+Two times are reported per event:
+  - game thread: what the event loop pays (for the queue, enqueueing only)
+  - total: until every record is formatted and written; for the queue this
+    includes stopping the listener, which drains the queue first
+
+Usage:
+    python PYTHON/lichess_bot/tools/bench_logging.py [--events 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Tuple
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from PYTHON.lichess_bot.logging_setup import LOG_FORMAT, LogConfig, configure_logging, stop_logging  # noqa: E402
+
+URL = "https://lichess.org/api/board/game/abcdefgh/move/e2e4"
+
+
+def _event_before(game_id: str, i: int) -> None:
+    logging.info(f"Game {game_id}: event=gameState, moves={i}, color=white")
+    logging.info(f"Game {game_id}: turn=white, my_turn=True")
+    logging.info(f"Game {game_id}: playing e2e4 (budget={0.5:.2f}s, my_time_left={60.0:.1f}s, inc={0.0:.2f}s)")
+    logging.info(f"HTTP POST {URL} -> sending")
+    logging.info(f"HTTP POST {URL} -> 200 in {0.05:.2f}s")
+
+
+def _event_after(game_id: str, i: int) -> None:
+    logging.debug("Game %s: event=%s, moves=%s, color=%s", game_id, "gameState", i, "white")
+    logging.debug("Game %s: turn=%s, my_turn=%s", game_id, "white", True)
+    logging.info(
+        "Game %s: playing %s (budget=%.2fs, my_time_left=%.1fs, inc=%.2fs)", game_id, "e2e4", 0.5, 60.0, 0.0
+    )
+    logging.debug("HTTP %s %s -> sending", "POST", URL)
+    logging.info("HTTP %s %s -> %s in %.2fs", "POST", URL, 200, 0.05)
+
+
+def _run(event, events: int, drain=None) -> Tuple[float, float]:
+    """(game thread, total) seconds per event; ``drain`` waits for queued records to be written."""
+    t0 = time.perf_counter()
+    for i in range(events):
+        event("abcdefgh", i)
+    t1 = time.perf_counter()
+    if drain is not None:
+        drain()
+    return (t1 - t0) / events, (time.perf_counter() - t0) / events
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--events", type=int, default=20000, help="Simulated events per scenario (default: 20000)")
+    args = ap.parse_args(argv[1:])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, "bench.log")
+        root = logging.getLogger()
+        results = []
+
+        with open(out_path, "w") as out:
+            handler = logging.StreamHandler(out)
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            root.handlers = [handler]
+            root.setLevel(logging.INFO)
+            results.append(("before (sync, f-strings, INFO)", *_run(_event_before, args.events)))
+
+            configure_logging(LogConfig(level="INFO"), stream=out)
+            results.append(("after (queue, lazy, INFO)", *_run(_event_after, args.events, drain=stop_logging)))
+
+            configure_logging(LogConfig(level="DEBUG", debug_every=10), stream=out)
+            results.append(("after (queue, lazy, DEBUG 1/10)", *_run(_event_after, args.events, drain=stop_logging)))
+
+    base_thread, base_total = results[0][1:]
+    print(f"{'scenario':<34} {'game thread us/event':>21} {'speedup':>8} {'total us/event':>15} {'speedup':>8}")
+    for name, thread, total in results:
+        print(f"{name:<34} {thread * 1e6:>21.1f} {base_thread / thread:>7.1f}x "
+              f"{total * 1e6:>15.1f} {base_total / total:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
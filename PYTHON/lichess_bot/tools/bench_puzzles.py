@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Benchmark the engine on lichess puzzles.
+
+Runs a selection of puzzles from the lichess puzzle CSV (see
+PYTHON/lichess_bot/puzzle_db.py) on a pool of engines, one per worker thread,
+and reports:
+  - solve rate, overall and per rating band
+  - positions/s (engine moves over wall time)
+  - per-move engine latency percentiles
+
+Each run is appended to tools/puzzle_results.jsonl with the bot version (the
+one in .bot_version, or --bot-version), and compared with the latest earlier
+run of another version on the same selection of puzzles.
+
+Usage:
+    python PYTHON/lichess_bot/tools/bench_puzzles.py [csv] [--min-rating 1500] [--max-rating 2000]
+        [--themes mateIn2,fork] [--sample 5000] [--seed 0] [--jobs N] [--time 0.5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from PYTHON.lichess_bot.engine import EnginePool  # noqa: E402
+from PYTHON.lichess_bot.puzzle_db import (  # noqa: E402
+    DEFAULT_CSV,
+    Puzzle,
+    PuzzleFilter,
+    PuzzleIndex,
+    PuzzleResult,
+    iter_puzzles,
+    percentile,
+    select_puzzles,
+    solve,
+)
+from PYTHON.lichess_bot.utils import read_version  # noqa: E402
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puzzle_results.jsonl")
+PERCENTILES = (50, 90, 99)
+
+
+def run_puzzles(puzzles: List[Puzzle], pool: EnginePool, time_budget_sec: float,
+                progress_every: int = 500) -> List[PuzzleResult]:
+    """Solve ``puzzles`` with one thread per engine of the pool; results are in puzzle order."""
+
+    def _solve(puzzle: Puzzle) -> PuzzleResult:
+        with pool.acquire() as engine:
+            return solve(engine, puzzle, time_budget_sec)
+
+    results: List[PuzzleResult] = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(pool)) as executor:
+        for done, result in enumerate(executor.map(_solve, puzzles), 1):
+            results.append(result)
+            if progress_every and done % progress_every == 0:
+                print(f"  {done}/{len(puzzles)} puzzles", file=sys.stderr, flush=True)
+    return results
+
+
+def summarize(results: List[PuzzleResult], elapsed: float, band_width: int) -> Dict:
+    """Solve rate, throughput, latency percentiles (ms) and per-band solve counts of a run."""
+    latencies = sorted(t for r in results for t in r.latencies)
+    solved = sum(r.solved for r in results)
+    bands: Dict[str, List[int]] = {}
+    for r in results:
+        low = r.puzzle.rating // band_width * band_width
+        band = bands.setdefault(f"{low}-{low + band_width - 1}", [0, 0])
+        band[0] += r.solved
+        band[1] += 1
+    return {
+        "puzzles": len(results),
+        "solved": solved,
+        "solve_rate": solved / len(results) if results else 0.0,
+        "errors": sum(r.error is not None for r in results),
+        "positions": len(latencies),
+        "seconds": round(elapsed, 3),
+        "positions_per_sec": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            **{f"p{q}": round(percentile(latencies, q) * 1e3, 3) for q in PERCENTILES},
+            "max": round(latencies[-1] * 1e3, 3) if latencies else 0.0,
+        },
+        "bands": dict(sorted(bands.items(), key=lambda item: int(item[0].split("-")[0]))),
+    }
+
+
+def load_runs(path: str) -> List[Dict]:
+    runs: List[Dict] = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    runs.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return runs
+
+
+def previous_run(runs: List[Dict], selection: Dict, bot_version: str) -> Optional[Dict]:
+    """The latest run of another bot version on the same selection of puzzles."""
+    for run in reversed(runs):
+        if run.get("selection") == selection and run.get("bot_version") != bot_version:
+            return run
+    return None
+
+
+def print_report(summary: Dict, bot_version: str, previous: Optional[Dict]) -> None:
+    lat = summary["latency_ms"]
+    print(f"Bot version {bot_version}: solved {summary['solved']}/{summary['puzzles']} "
+          f"({summary['solve_rate']:.1%}), {summary['errors']} errors")
+    print(f"{summary['positions']} positions in {summary['seconds']:.2f}s "
+          f"({summary['positions_per_sec']:.1f} positions/s)")
+    print("Latency per move: " + ", ".join(f"{name} {ms:.1f} ms" for name, ms in lat.items()))
+    print(f"{'rating':<11} {'solved':>7} {'puzzles':>8} {'rate':>7}")
+    for band, (solved, total) in summary["bands"].items():
+        print(f"{band:<11} {solved:>7} {total:>8} {solved / total:>7.1%}")
+    if previous is not None:
+        delta = (summary["solve_rate"] - previous["solve_rate"]) * 100
+        p90 = previous["latency_ms"]["p90"]
+        print(f"Compared with {previous['bot_version']} ({previous['date']}): solve rate {delta:+.1f} points, "
+              f"p90 latency {lat['p90'] - p90:+.1f} ms, "
+              f"{summary['positions_per_sec'] - previous['positions_per_sec']:+.1f} positions/s")
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("csv", nargs="?", default=DEFAULT_CSV, help="Lichess puzzle CSV (default: tests/lichess_db_puzzle.csv)")
+    ap.add_argument("--min-rating", type=int, default=None)
+    ap.add_argument("--max-rating", type=int, default=None)
+    ap.add_argument("--themes", default="", help="Comma-separated themes; a puzzle needs any of them")
+    ap.add_argument("--sample", type=int, default=1000, metavar="N",
+                    help="Random sample of matching puzzles (default: 1000; 0 runs all)")
+    ap.add_argument("--seed", type=int, default=0, help="Sampling seed (default: 0)")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, metavar="N",
+                    help="Engines in the pool (default: one per CPU)")
+    ap.add_argument("--time", type=float, default=0.5, help="Time budget per engine move in seconds (default: 0.5)")
+    ap.add_argument("--engine-path", default=None, help="Engine binary (default: C/lichess_random_engine/random_engine)")
+    ap.add_argument("--no-index", action="store_true",
+                    help="Stream the whole CSV instead of sampling through its .idx side file")
+    ap.add_argument("--band-width", type=int, default=400, help="Rating band width in the report (default: 400)")
+    ap.add_argument("--bot-version", default=None, help="Label for this run (default: v<.bot_version>)")
+    ap.add_argument("--results", default=RESULTS, help="Run history (default: tools/puzzle_results.jsonl)")
+    ap.add_argument("--no-save", action="store_true", help="Do not append this run to the history")
+    args = ap.parse_args(argv[1:])
+
+    if not os.path.isfile(args.csv):
+        print(f"Puzzle CSV not found: {args.csv} (download it from https://database.lichess.org/#puzzles)")
+        return 2
+    try:
+        pool = EnginePool(args.jobs, engine_path=args.engine_path, max_time_sec=args.time)
+    except FileNotFoundError as e:
+        print(e)
+        return 2
+
+    puzzle_filter = PuzzleFilter(
+        min_rating=args.min_rating,
+        max_rating=args.max_rating,
+        themes=frozenset(t for t in args.themes.split(",") if t),
+    )
+    started = time.monotonic()
+    if args.no_index:
+        puzzles = select_puzzles(iter_puzzles(args.csv), puzzle_filter, sample=args.sample or None, seed=args.seed)
+    else:
+        # Built on first use (one pass over the CSV), then reused until the CSV changes
+        with PuzzleIndex(args.csv) as index:
+            if args.sample:
+                chosen = index.sample(args.sample, puzzle_filter, seed=args.seed)
+            else:
+                chosen = index.select(puzzle_filter)
+            puzzles = index.puzzles(chosen)
+    print(f"Selected {len(puzzles)} puzzles from {os.path.basename(args.csv)} in {time.monotonic() - started:.2f}s")
+    if not puzzles:
+        return 1
+
+    started = time.monotonic()
+    results = run_puzzles(puzzles, pool, args.time)
+    summary = summarize(results, time.monotonic() - started, args.band_width)
+
+    bot_version = args.bot_version or f"v{read_version()}"
+    selection = {
+        "csv": os.path.basename(args.csv),
+        "min_rating": args.min_rating,
+        "max_rating": args.max_rating,
+        "themes": sorted(puzzle_filter.themes),
+        "sample": args.sample or None,
+        "seed": args.seed,
+        "index": not args.no_index,  # the two samplers draw different puzzles for a seed
+        "time": args.time,
+    }
+    print_report(summary, bot_version, previous_run(load_runs(args.results), selection, bot_version))
+
+    if not args.no_save:
+        run = {
+            "bot_version": bot_version,
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "selection": selection,
+            "jobs": len(pool),
+            **summary,
+            "failed": [r.puzzle.id for r in results if not r.solved][:100],
+        }
+        with open(args.results, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run) + "\n")
+        print(f"Saved to {os.path.relpath(args.results)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
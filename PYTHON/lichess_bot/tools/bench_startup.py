@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Measure bot startup: import time per module and time-to-connected.
+
+- Import time: runs `python -X importtime -c "import PYTHON.lichess_bot.main"`
+  and lists the modules with the largest cumulative import time.
+- Time-to-connected: starts a fresh interpreter that runs `run_bot` with the
+  event stream replaced by a stub, and measures wall time from process launch
+  until the bot opens the event stream. No network access or real token is
+  needed; the bot version is written to a temporary file.
+
+The budget enforced in CI lives in tests/test_startup.py.
+
+Usage:
+    python PYTHON/lichess_bot/tools/bench_startup.py [--runs 5] [--top 15]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+CONNECT_HARNESS = """
+import os, sys, time
+from PYTHON.lichess_bot import lichess_api, main
+
+def _connected(self):
+    print("CONNECTED", time.time(), flush=True)
+    os._exit(0)
+    yield
+
+lichess_api.LichessAPI.stream_events = _connected
+main.run_bot("WARNING")
+"""
+
+
+def measure_import_times() -> Tuple[float, List[Tuple[str, float, float]]]:
+    """Return (total_ms, [(module, self_ms, cumulative_ms), ...]) for importing the bot."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import PYTHON.lichess_bot.main"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows: List[Tuple[str, float, float]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cum_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        rows.append((parts[2].strip(), self_us / 1000.0, cum_us / 1000.0))
+    total = next((cum for name, _, cum in rows if name == "PYTHON.lichess_bot.main"), 0.0)
+    return total, rows
+
+
+def measure_time_to_connected(runs: int) -> List[float]:
+    """Return wall-clock milliseconds from interpreter launch to opening the event stream."""
+    results: List[float] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.setdefault("LICHESS_TOKEN", "bench-token")
+        env["LICHESS_BOT_VERSION_FILE"] = os.path.join(tmp, "version")
+        for _ in range(runs):
+            t0 = time.time()
+            proc = subprocess.run(
+                [sys.executable, "-c", CONNECT_HARNESS],
+                cwd=tmp,
+                env={**env, "PYTHONPATH": REPO_ROOT},
+                capture_output=True,
+                text=True,
+                timeout=60,
+            )
+            stamp = next((ln.split()[1] for ln in proc.stdout.splitlines() if ln.startswith("CONNECTED")), None)
+            if stamp is None:
+                raise RuntimeError(f"Harness did not connect:\n{proc.stdout}\n{proc.stderr}")
+            results.append((float(stamp) - t0) * 1000.0)
+    return results
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5, help="Time-to-connected samples (default: 5)")
+    ap.add_argument("--top", type=int, default=15, help="Modules to list by cumulative import time (default: 15)")
+    args = ap.parse_args(argv[1:])
+
+    total, rows = measure_import_times()
+    print(f"Import PYTHON.lichess_bot.main: {total:.1f} ms")
+    print(f"{'module':<45} {'self ms':>8} {'cum ms':>8}")
+    for name, self_ms, cum_ms in sorted(rows, key=lambda r: -r[2])[: args.top]:
+        print(f"{name:<45} {self_ms:>8.1f} {cum_ms:>8.1f}")
+
+    loaded: Dict[str, bool] = {name: True for name, _, _ in rows}
+    deferred = [m for m in ("chess", "chess.pgn", "subprocess", "multiprocessing", "http.server") if m not in loaded]
+    print(f"Deferred until first use: {', '.join(deferred) or '(none)'}")
+
+    samples = measure_time_to_connected(max(1, args.runs))
+    print(
+        f"Time to connected: median {statistics.median(samples):.1f} ms "
+        f"(min {min(samples):.1f}, max {max(samples):.1f}, n={len(samples)})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
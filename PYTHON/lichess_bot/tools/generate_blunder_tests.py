@@ -4,13 +4,19 @@ Generate pytest cases from one or more lichess analysis logs.
 
 Input: log files that contain a "Columns:" section and a "PGN:" section.
 We'll extract each row where class==Blunder, reconstruct the FEN of the
-position before the blunder, and the blunder move in UCI. Then we'll write
-parametrized pytest files that assert the engine does not pick that same
-blunder move from those positions.
+position before the blunder, and the blunder move in UCI. The cases are
+added to the case store tests/blunder_cases.jsonl (see
+PYTHON/lichess_bot/blunder_cases.py), from which tests/test_blunders_all.py
+asserts that the engine does not pick that same blunder move from those
+positions.
 
 Where logs are loaded from:
     - By default (no arguments), all logs in the "past_games" folder located
         next to this script will be processed (files matching lichess_bot_game_*.log).
+        Logs unchanged since the last run (same size and mtime, or same content
+        hash) are skipped, see tests/blunder_cases.manifest.json; the rest are
+        read in a process pool (--jobs N) and merged into the case store at the
+        end. --force re-reads all of them.
     - If a single argument is provided and it's a file path, that file is used.
     - If a single argument looks like a game id (e.g. OVmR29MI), the script will
         look for past_games/lichess_bot_game_<gameid>.log next to this script.
@@ -25,24 +31,39 @@ Usage examples:
     # Process an explicit file path
     python PYTHON/lichess_bot/tools/generate_blunder_tests.py /path/to/lichess_bot_game_xxxxx.log
 
-It will create files like:
-    PYTHON/lichess_bot/tests/test_blunders_<gameid>.py
+It adds to (or creates):
+    PYTHON/lichess_bot/tests/blunder_cases.jsonl
+    PYTHON/lichess_bot/tests/test_blunders_all.py (if missing; an older one that
+        lists its cases as Python source has them moved to the store)
 
 Dependencies: python-chess, pytest (already in requirements.txt)
 """
 
 from __future__ import annotations
 
+import argparse
+import ast
+import concurrent.futures
+import hashlib
 import io
+import json
 import os
 import re
 import sys
+import time
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import chess
 import chess.pgn
 
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from PYTHON.lichess_bot.blunder_cases import DEFAULT_PATH, BlunderCase, BlunderCaseStore  # noqa: E402
+from PYTHON.stockfish_analysis.pgn_extract import decode, open_mapped, pgn_start  # noqa: E402
+
 
 @dataclass
 class Blunder:
@@ -94,92 +115,92 @@ def parse_columns_for_blunders(text: str) -> List[Blunder]:
     return blunders
 
 
-def extract_pgn(text: str) -> str | None:
-    # Extract the PGN block after a line that is exactly 'PGN:' or starts with it
-    m = re.search(r"^PGN:\s*$", text, flags=re.M)
-    if not m:
-        return None
-    start = m.end()
-    pgn = text[start:].strip()
-    return pgn if pgn else None
+class _MainLineBuilder(chess.pgn.BoardBuilder):
+    """Parses a game straight to its final board (main line moves in ``move_stack``), no game tree.
+
+    Like the default game builder, an illegal move ends the main line instead of raising.
+    """
+
+    def handle_error(self, error: Exception) -> None:
+        pass
 
 
-def san_list_from_game(game: chess.pgn.Game) -> List[str]:
-    san_moves: List[str] = []
-    node = game
-    while node.variations:
-        node = node.variation(0)
-        san_moves.append(node.san())
-    return san_moves
+def _bare_san(san: str) -> str:
+    """SAN without check, mate and annotation marks."""
+    return san.rstrip("+#!?")
 
 
 def fen_and_uci_for_blunders(pgn_text: str, blunders: List[Blunder]) -> List[Tuple[str, str, str, Blunder]]:
-    game = chess.pgn.read_game(io.StringIO(pgn_text))
-    if game is None:
+    final = chess.pgn.read_game(io.StringIO(pgn_text), Visitor=_MainLineBuilder)
+    if final is None:
         raise RuntimeError("Failed to parse PGN from log")
+    return blunder_positions(final.root(), final.move_stack, blunders)
 
-    main_sans = san_list_from_game(game)
-    results: List[Tuple[str, str, str, Blunder]] = []
-    for bl in blunders:
-        # Reconstruct the board before this ply
-        board = game.board()
-        # plies are 1-based; apply moves up to ply-1
-        upto = max(0, bl.ply - 1)
-        for i in range(min(upto, len(main_sans))):
-            board.push_san(main_sans[i])
-        fen_before = board.fen()
-        # Parse the SAN blunder at this position to get UCI. If parse fails, skip.
-        try:
-            move = board.parse_san(bl.san)
-        except ValueError:
-            # Try to fall back to using the game's move at that ply if available
-            if bl.ply - 1 < len(main_sans):
-                try:
-                    move = board.parse_san(main_sans[bl.ply - 1])
-                except Exception:
-                    continue
-            else:
+
+def blunder_positions(board: chess.Board, moves, blunders: List[Blunder]) -> List[Tuple[str, str, str, Blunder]]:
+    """(FEN before, blunder UCI, best UCI, blunder) for each blunder, in one forward replay of ``moves``.
+
+    The board is snapshotted only at the plies of the Blunder rows. The played
+    move is the game's own move at that ply; a row whose SAN names another
+    move (the log's table and PGN do not line up) is skipped with a warning,
+    and so are blunders past the end of the game. ``board`` is modified.
+    """
+    wanted: Dict[int, List[int]] = {}
+    for i, bl in enumerate(blunders):
+        wanted.setdefault(bl.ply, []).append(i)
+    found: Dict[int, Tuple[str, str, str, Blunder]] = {}
+    last = max(wanted, default=0)
+    for ply, move in enumerate(moves, 1):
+        if ply > last:
+            break
+        for i in wanted.get(ply, ()):
+            bl = blunders[i]
+            played_san = board.san(move)
+            if _bare_san(played_san) != _bare_san(bl.san):
+                print(f"Warning: skipping the blunder at ply {bl.ply} side {bl.side}: the log says {bl.san} "
+                      f"but the game played {played_san}", file=sys.stderr)
                 continue
-        # Parse best suggestion SAN to UCI in the same position; if it fails, skip this blunder
-        try:
-            best_move = board.parse_san(bl.best_suggestion_san)
-            best_uci = best_move.uci()
-        except Exception as e:
-            raise ValueError(
-                f"Failed to parse best_suggestion SAN '{bl.best_suggestion_san}' at ply {bl.ply} side {bl.side} "
-                f"in position FEN: {fen_before}. Error: {e}"
-            )
-        results.append((fen_before, move.uci(), best_uci, bl))
-    return results
-
-
-def ensure_unified_test_file(target_path: str) -> None:
-    os.makedirs(os.path.dirname(target_path), exist_ok=True)
-    if os.path.exists(target_path):
-        return
-    # Create skeleton unified test file
-    with open(target_path, "w", encoding="utf-8") as f:
-        f.write(
-            """import os
+            fen_before = board.fen()
+            try:
+                best_uci = board.parse_san(bl.best_suggestion_san).uci()
+            except ValueError as e:
+                raise ValueError(
+                    f"Failed to parse best_suggestion SAN '{bl.best_suggestion_san}' at ply {bl.ply} side {bl.side} "
+                    f"in position FEN: {fen_before}. Error: {e}"
+                )
+            found[i] = (fen_before, move.uci(), best_uci, bl)
+        board.push(move)
+    return [found[i] for i in range(len(blunders)) if i in found]
+
+
+UNIFIED_TEST = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "tests", "test_blunders_all.py"))
+
+UNIFIED_TEST_SOURCE = '''import os
 import sys
+
 import chess
-import pytest
 
 # Ensure repo root is importable when running pytest directly
 REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 if REPO_ROOT not in sys.path:
     sys.path.insert(0, REPO_ROOT)
 
-from PYTHON.lichess_bot.engine import RandomEngine  # noqa: E402
+from PYTHON.lichess_bot.blunder_cases import DEFAULT_PATH, load_cases  # noqa: E402
+
 
-BLUNDER_CASES = [
-]
+def pytest_generate_tests(metafunc):
+    # The cases are read from the store when pytest collects this file, not on import
+    if "case" in metafunc.fixturenames:
+        cases = load_cases(DEFAULT_PATH)
+        metafunc.parametrize("case", cases, ids=[c.label for c in cases])
 
 
-@pytest.mark.parametrize('fen,blunder_uci,label', BLUNDER_CASES, ids=[c[2] for c in BLUNDER_CASES])
-def test_engine_avoids_logged_blunder(fen, blunder_uci, label):
-    board = chess.Board(fen)
-    eng = RandomEngine(depth=4, max_time_sec=1.2)
+def test_engine_avoids_logged_blunder(case, engine, record_property):
+    # A blunder logged in several games is one case; its weight is the number of games
+    record_property("weight", case.weight)
+    board = chess.Board(case.fen)
+    # `engine` is shared by the whole session (one per pytest-xdist worker), see conftest.py
+    eng = engine
     # Prefer explanation variant if available for better failure messages
     move = None
     explanation = ''
@@ -193,127 +214,230 @@ def test_engine_avoids_logged_blunder(fen, blunder_uci, label):
         move = eng.choose_move(board)
     assert move is not None, 'Engine returned no move'
     assert move in board.legal_moves, 'Engine move is illegal'
-    assert move.uci() != blunder_uci, f'Engine repeated blunder {blunder_uci} at {label}. Explanation: {explanation}'
-"""
-        )
+    assert move.uci() != case.blunder, (
+        f'Engine repeated blunder {case.blunder} at {case.label} (logged in {case.weight} games). '
+        f'Explanation: {explanation}'
+    )
+'''
 
+_LEGACY_CASES = re.compile(r"^BLUNDER_CASES\s*=\s*(\[.*?^\])", re.S | re.M)
+_LEGACY_LABEL = re.compile(r"ply(\d+)_([WB])_[a-h1-8qrbn]+(?:_best_(\S+))?$")
 
-def append_cases_to_unified_test(unified_path: str, cases: List[Tuple[str, str, str, Blunder]]) -> int:
-    """Append new cases to BLUNDER_CASES in the unified test file, skipping duplicates.
 
-    Returns the number of cases actually appended.
+def ensure_unified_test_file(target_path: str, store: BlunderCaseStore) -> None:
+    """Write the test file that loads the store's cases, unless it is up to date.
+
+    An older generated file that lists its cases as Python source has them
+    moved into ``store`` first.
     """
-    ensure_unified_test_file(unified_path)
-    with open(unified_path, "r", encoding="utf-8") as f:
-        content = f.read()
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    if os.path.exists(target_path):
+        with open(target_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        if content == UNIFIED_TEST_SOURCE:
+            return
+        m = _LEGACY_CASES.search(content)
+    else:
+        m = None
+    if m is not None:
+        moved = 0
+        for fen, uci, label in ast.literal_eval(m.group(1)):
+            parsed = _LEGACY_LABEL.match(label)
+            ply, side, best = (int(parsed.group(1)), parsed.group(2), parsed.group(3)) if parsed else (0, "", None)
+            moved += store.add(BlunderCase(fen=fen, blunder=uci, best=best, ply=ply, side=side)) == "added"
+        print(f"Moved {moved} cases from {os.path.relpath(target_path)} to {os.path.relpath(store.path)}.")
+    with open(target_path, "w", encoding="utf-8") as f:
+        f.write(UNIFIED_TEST_SOURCE)
 
-    # Extract current cases as a set of (fen, uci) to de-duplicate
-    existing = set(re.findall(r"\(\"(.*?)\",\s*\"(.*?)\",\s*\"ply\d+_[WB]_[^\"]+\"\)\,?", content, flags=re.S))
 
-    lines = []
-    updated_existing = 0
+def add_cases_to_store(store: BlunderCaseStore, cases: List[Tuple[str, str, str, Blunder]],
+                       game_id: str = "") -> Tuple[int, int]:
+    """Add new cases to ``store`` and update the best move of known ones; returns (added, updated)."""
+    added = updated = 0
     for fen, uci, best_uci, bl in cases:
-        key = (fen, uci)
-        if key in existing:
-            # If a best move UCI is available, try to backfill or update it into the label
-            if best_uci:
-                side = 'W' if bl.side == 'W' else 'B'
-                fen_re = re.escape(fen)
-                uci_re = re.escape(uci)
-                base_label = f"ply{bl.ply}_{side}_{uci}"
-                # Pattern A: no best suffix yet
-                pattern_no_best = rf"\(\"{fen_re}\",\s*\"{uci_re}\",\s*\"({re.escape(base_label)})\"\)"
-                # Pattern B: existing best suffix (whatever it is) - replace it with the new best_uci
-                pattern_with_best = rf"\(\"{fen_re}\",\s*\"{uci_re}\",\s*\"({re.escape(base_label)}_best_[^\"]+)\"\)"
-                if re.search(pattern_no_best, content):
-                    content = re.sub(
-                        pattern_no_best,
-                        lambda m: m.group(0).replace(m.group(1), f"{base_label}_best_{best_uci}"),
-                        content,
-                        count=1,
-                    )
-                    updated_existing += 1
-                elif re.search(pattern_with_best, content):
-                    content = re.sub(
-                        pattern_with_best,
-                        lambda m: m.group(0).replace(m.group(1), f"{base_label}_best_{best_uci}"),
-                        content,
-                        count=1,
-                    )
-                    updated_existing += 1
-            continue
-        label = f"ply{bl.ply}_{'W' if bl.side=='W' else 'B'}_{uci}"
-        # Encode the best move UCI in the label so tests can extract it without changing tuple shape
-        label += f"_best_{best_uci}"
-        lines.append(f"    (\"{fen}\", \"{uci}\", \"{label}\"),\n")
-
-    if not lines:
-        return 0
-
-    # Insert before closing bracket of BLUNDER_CASES into the possibly updated 'content'
-    new_content = re.sub(
-        r"BLUNDER_CASES\s*=\s*\[\n",
-        lambda m: m.group(0) + "".join(lines),
-        content,
-        count=1,
-    )
+        status = store.add(BlunderCase(fen=fen, blunder=uci, best=best_uci or None, ply=bl.ply,
+                                       side="W" if bl.side == "W" else "B", games=[game_id] if game_id else []))
+        added += status == "added"
+        updated += status == "updated"
+    return added, updated
 
-    # Apply the changes (either updates to existing labels and/or appended lines)
-    with open(unified_path, "w", encoding="utf-8") as f:
-        f.write(new_content)
-    return len(lines) + updated_existing
 
+def extract_log(log_path: str) -> Tuple[int, str, List[Tuple[str, str, str, Blunder]], str]:
+    """Read one log: (return code, message, cases, game id); 0 means it yielded cases.
 
-def _process_single_log(log_path: str) -> int:
-    """Process a single log file. Returns 0 on success, non-zero otherwise."""
+    Touches no shared state, so logs can be read in worker processes.
+    """
+    base = os.path.basename(log_path)
+    m = re.search(r"game_([A-Za-z0-9]+)\.log$", base)
+    game_id = m.group(1) if m else os.path.splitext(base)[0]
     try:
-        with open(log_path, "r", encoding="utf-8") as fh:
-            text = fh.read()
+        with open_mapped(log_path) as buf:
+            # One forward scan finds the PGN; the Columns table is only looked for before it
+            start = pgn_start(buf)
+            text = decode(buf, 0, start)
+            pgn_text = decode(buf, start).strip() if start is not None else None
     except FileNotFoundError:
-        print(f"Log file not found: {log_path}")
-        return 2
+        return 2, f"Log file not found: {log_path}", [], game_id
 
     try:
         blunders = parse_columns_for_blunders(text)
     except Exception as e:
-        print(f"Error parsing Columns in {os.path.basename(log_path)}: {e}")
-        return 2
+        return 2, f"Error parsing Columns in {base}: {e}", [], game_id
     if not blunders:
-        print(f"No blunders found in Columns section: {os.path.basename(log_path)}")
-        return 1
+        return 1, f"No blunders found in Columns section: {base}", [], game_id
 
-    pgn_text = extract_pgn(text)
     if not pgn_text:
-        print(f"No PGN section found: {os.path.basename(log_path)}")
-        return 1
+        return 1, f"No PGN section found: {base}", [], game_id
 
     try:
         cases = fen_and_uci_for_blunders(pgn_text, blunders)
     except Exception as e:
-        print(f"Error converting SAN to UCI in {os.path.basename(log_path)}: {e}")
-        return 2
+        return 2, f"Error converting SAN to UCI in {base}: {e}", [], game_id
     if not cases:
-        print(f"Failed to reconstruct any blunder positions from PGN: {os.path.basename(log_path)}")
-        return 1
+        return 1, f"Failed to reconstruct any blunder positions from PGN: {base}", [], game_id
+    return 0, "", cases, game_id
 
-    base = os.path.basename(log_path)
-    m = re.search(r"game_([A-Za-z0-9]+)\.log$", base)
-    game_id = m.group(1) if m else os.path.splitext(base)[0]
 
-    # Always append to the unified test file
-    unified = os.path.join(os.path.dirname(__file__), "..", "tests", "test_blunders_all.py")
-    unified = os.path.abspath(unified)
-    added = append_cases_to_unified_test(unified, cases)
-    print(f"Appended {added} new blunder checks to {os.path.relpath(unified)} (game {game_id}).")
+def _merge(store: BlunderCaseStore, result) -> int:
+    rc, message, cases, game_id = result
+    if rc:
+        print(message)
+        return rc
+    added, updated = add_cases_to_store(store, cases, game_id)
+    print(f"Added {added} new blunder checks ({updated} updated) to {os.path.relpath(store.path)} (game {game_id}).")
     return 0
 
 
+def _process_single_log(log_path: str, store: BlunderCaseStore) -> int:
+    """Process a single log file. Returns 0 on success, non-zero otherwise."""
+    return _merge(store, extract_log(log_path))
+
+
+def _run(log_paths: List[str]) -> List[int]:
+    """Process logs into the case store, opened once for all of them; return codes per log."""
+    with BlunderCaseStore(DEFAULT_PATH) as store:
+        ensure_unified_test_file(UNIFIED_TEST, store)
+        return [_process_single_log(path, store) for path in log_paths]
+
+
+MANIFEST = os.path.join(os.path.dirname(UNIFIED_TEST), "blunder_cases.manifest.json")
+
+
+def _content_hash(path: str) -> str:
+    with open_mapped(path) as buf:
+        return hashlib.sha1(buf).hexdigest()
+
+
+class LogManifest:
+    """Logs already merged into the case store, by path (relative to the manifest), size, mtime and SHA-1.
+
+    A log whose size and mtime are unchanged is not read again; one whose
+    mtime changed is hashed and only re-read if its content changed. Only logs
+    that yielded cases are recorded, so a failed one is retried on every run.
+    """
+
+    def __init__(self, path: str = MANIFEST):
+        self.path = path
+        self._base = os.path.dirname(os.path.abspath(path))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.logs: Dict[str, dict] = json.load(f).get("logs", {})
+        except (OSError, ValueError):
+            self.logs = {}
+
+    def _key(self, log_path: str) -> str:
+        return os.path.relpath(os.path.abspath(log_path), self._base)
+
+    def unchanged(self, log_path: str) -> bool:
+        entry = self.logs.get(self._key(log_path))
+        if entry is None:
+            return False
+        try:
+            st = os.stat(log_path)
+            if st.st_size != entry["size"]:
+                return False
+            if st.st_mtime_ns == entry["mtime_ns"]:
+                return True
+            if _content_hash(log_path) != entry["sha1"]:
+                return False
+        except FileNotFoundError:
+            return False  # deleted since it was listed; reading it reports that
+        entry["mtime_ns"] = st.st_mtime_ns  # touched but not changed
+        return True
+
+    def record(self, log_path: str, fingerprint: Optional[Tuple[int, int, str]], rc: int) -> None:
+        if rc != 0 or fingerprint is None:
+            self.logs.pop(self._key(log_path), None)
+            return
+        size, mtime_ns, sha1 = fingerprint
+        self.logs[self._key(log_path)] = {"size": size, "mtime_ns": mtime_ns, "sha1": sha1}
+
+    def save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"logs": self.logs}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def _fingerprint_and_extract(log_path: str):
+    """(size, mtime, SHA-1) of a log, taken before it is read, and ``extract_log``'s result.
+
+    The fingerprint is None for a log that no longer exists.
+    """
+    try:
+        st = os.stat(log_path)
+        fingerprint = (st.st_size, st.st_mtime_ns, _content_hash(log_path))
+    except FileNotFoundError:
+        fingerprint = None
+    return fingerprint, extract_log(log_path)
+
+
+def run_incremental(log_paths: List[str], jobs: Optional[int] = None, force: bool = False) -> Tuple[int, int, int]:
+    """Process the logs that changed since the last run in a process pool; returns (processed, skipped, ok).
+
+    Results are merged into the case store in ``log_paths`` order once all
+    logs are read, then the manifest is saved.
+    """
+    manifest = LogManifest(MANIFEST)
+    # Without the store the manifest says nothing about what is in it
+    known = not force and os.path.exists(DEFAULT_PATH)
+    todo = [p for p in log_paths if not (known and manifest.unchanged(p))]
+    skipped = len(log_paths) - len(todo)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(todo)))
+    if jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_fingerprint_and_extract, todo, chunksize=max(1, len(todo) // (4 * jobs))))
+    else:
+        results = [_fingerprint_and_extract(p) for p in todo]
+    with BlunderCaseStore(DEFAULT_PATH) as store:
+        ensure_unified_test_file(UNIFIED_TEST, store)
+        codes = [_merge(store, result) for _, result in results]
+    for path, (fingerprint, _), rc in zip(todo, results, codes):
+        manifest.record(path, fingerprint, rc)
+    manifest.save()
+    return len(todo), skipped, codes.count(0)
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return 0.0  # deleted since it was listed; reading it reports that
+
+
 def main(argv: List[str]) -> int:
     script_dir = os.path.dirname(__file__)
     past_dir = os.path.abspath(os.path.join(script_dir, "past_games"))
 
+    ap = argparse.ArgumentParser(description="Generate blunder regression cases from lichess analysis logs.")
+    ap.add_argument("target", nargs="?", help="Game id or log path (default: every log in tools/past_games)")
+    ap.add_argument("--jobs", type=int, default=None, metavar="N",
+                    help="Worker processes for past_games (default: one per CPU)")
+    ap.add_argument("--force", action="store_true", help="Re-read past_games logs even if they have not changed")
+    args = ap.parse_args(argv[1:])
+
     # No argument: process all logs in past_games
-    if len(argv) == 1:
+    if args.target is None:
         if not os.path.isdir(past_dir):
             print(f"No past_games directory found at {past_dir}")
             return 2
@@ -326,17 +450,17 @@ def main(argv: List[str]) -> int:
             print(f"No logs found in {past_dir}")
             return 1
         # Sort by mtime ascending for determinism
-        logs.sort(key=lambda p: os.path.getmtime(p))
-        ok = 0
-        for lp in logs:
-            rc = _process_single_log(lp)
-            if rc == 0:
-                ok += 1
-        print(f"Processed {len(logs)} logs from {past_dir}, succeeded: {ok}, failed: {len(logs)-ok}")
-        return 0 if ok > 0 else 1
+        logs.sort(key=_mtime)
+        started = time.monotonic()
+        processed, skipped, ok = run_incremental(logs, args.jobs, args.force)
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        print(f"Processed {processed} logs from {past_dir}, succeeded: {ok}, failed: {processed - ok}; "
+              f"skipped {skipped} unchanged ({skipped / len(logs):.0%}) in {elapsed:.2f}s ({rate:.1f} logs/s)")
+        return 0 if ok > 0 or processed == 0 else 1
 
     # One argument: game id or file path
-    arg = argv[1]
+    arg = args.target
     candidate_path = None
     if os.path.isfile(arg):
         candidate_path = arg
@@ -354,7 +478,7 @@ def main(argv: List[str]) -> int:
         print("Usage: generate_blunder_tests.py [<game_id>|</path/to/log>]")
         return 2
 
-    return _process_single_log(candidate_path)
+    return _run([candidate_path])[0]
 
 
 if __name__ == "__main__":
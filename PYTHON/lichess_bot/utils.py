@@ -14,23 +14,24 @@ def _version_file_path() -> str:
     return os.path.join(os.path.dirname(__file__), ".bot_version")
 
 
+def read_version() -> int:
+    """Return the current bot version without changing it (0 if none is recorded)."""
+    try:
+        with open(_version_file_path(), "r") as f:
+            raw = f.read().strip()
+            return int(raw) if raw else 0
+    except Exception:
+        # Missing or unreadable file -> treat as version 0
+        return 0
+
+
 def get_and_increment_version() -> int:
     """Read the current bot version, increment it, persist, and return the new version.
 
     If the version file doesn't exist or is invalid, starts from 0, then sets to 1.
     """
     path = _version_file_path()
-    current = 0
-    try:
-        with open(path, "r") as f:
-            raw = f.read().strip()
-            if raw:
-                current = int(raw)
-    except Exception:
-        # Missing or unreadable file -> treat as version 0
-        current = 0
-
-    new_version = current + 1
+    new_version = read_version() + 1
     try:
         tmp_path = path + ".tmp"
         with open(tmp_path, "w") as f:
@@ -55,6 +56,6 @@ def backoff_sleep(current_backoff: int, base: float = 0.5, cap: float = 8.0) ->
     - cap: maximum delay in seconds
     """
     delay = min(cap, base * (2 ** current_backoff))
-    logging.info(f"Backing off for {delay:.1f}s")
+    logging.info("Backing off for %.1fs", delay)
     time.sleep(delay)
     return min(current_backoff + 1, 10)
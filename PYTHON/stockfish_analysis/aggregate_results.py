@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Summarize batch analysis results per player: ACPL, accuracy and class counts.
+
+Reads the JSON lines written by ``analyze_chess_game.py --batch`` and
+aggregates every ply with NumPy (see stats.py), so tens of thousands of games
+summarize in seconds; the JSON parsing is the only per-ply Python work.
+
+Usage:
+    python3 PYTHON/stockfish_analysis/aggregate_results.py results.jsonl [more.jsonl]
+        [--by player|side] [--min-games N] [--format text|json|csv]
+
+``--by player`` (default) groups by the White/Black header names, ``--by side``
+by colour. Games recorded several times (e.g. reruns appended to the same
+file) are counted once, using their last record.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+try:
+    from .stats import CLASSES, PlayerStats, aggregate, class_indices, move_scores
+except ImportError:  # run as a script from its folder
+    from stats import CLASSES, PlayerStats, aggregate, class_indices, move_scores
+
+
+def iter_records(paths: List[str]) -> Iterator[dict]:
+    """Batch records with plies, last record per game key."""
+    latest: Dict[str, dict] = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by an interrupted run
+                if record.get("plies"):
+                    latest[record.get("game", str(len(latest)))] = record
+    return iter(latest.values())
+
+
+def player_stats(records, by: str = "player") -> List[Tuple[str, PlayerStats]]:
+    """(name, stats) per player (or per side with ``by="side"``), most games first."""
+    names: Dict[str, int] = {}
+    keys: List[int] = []
+    games: List[int] = []
+    best_cp: List = []
+    best_mate: List = []
+    played_cp: List = []
+    played_mate: List = []
+    classes: List[str] = []
+    for game_index, record in enumerate(records):
+        headers = record.get("headers", {})
+        if by == "side":
+            label = {"W": "White", "B": "Black"}
+        else:
+            label = {"W": headers.get("White") or "?", "B": headers.get("Black") or "?"}
+        side_keys = {side: names.setdefault(name, len(names)) for side, name in label.items()}
+        for ply in record["plies"]:
+            keys.append(side_keys["W" if ply["side"] == "W" else "B"])
+            games.append(game_index)
+            best_cp.append(ply["best_cp"])
+            best_mate.append(ply["best_mate"])
+            played_cp.append(ply["played_cp"])
+            played_mate.append(ply["played_mate"])
+            classes.append(ply["classification"])
+    if not keys:
+        return []
+    loss, accuracy = move_scores(best_cp, best_mate, played_cp, played_mate)
+    stats = aggregate(np.array(keys), len(names), np.array(games), loss, accuracy, class_indices(classes))
+    by_name = list(zip(names, stats))
+    by_name.sort(key=lambda item: (-item[1].games, item[0]))
+    return by_name
+
+
+def _fmt(value, spec: str) -> str:
+    return format(value, spec) if value is not None else "?"
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="Summarize batch analysis results (JSON lines) per player.")
+    ap.add_argument("files", nargs="+", help="Results files written by analyze_chess_game.py --batch")
+    ap.add_argument("--by", choices=("player", "side"), default="player",
+                    help="Group by player name or by colour (default: player)")
+    ap.add_argument("--min-games", type=int, default=1, metavar="N", help="Only list players with N+ games")
+    ap.add_argument("--format", choices=("text", "json", "csv"), default="text", help="Output format (default: text)")
+    args = ap.parse_args(argv[1:])
+
+    started = time.monotonic()
+    try:
+        records = list(iter_records(args.files))
+    except OSError as e:
+        print(f"Cannot read results: {e}", file=sys.stderr)
+        return 1
+    rows = [(name, st) for name, st in player_stats(records, args.by) if st.games >= args.min_games]
+    elapsed = time.monotonic() - started
+
+    if args.format == "json":
+        json.dump({name: st.to_dict() for name, st in rows}, sys.stdout, indent=2)
+        print()
+    elif args.format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["player", "games", "moves", "acpl", "accuracy", *CLASSES])
+        for name, st in rows:
+            d = st.to_dict()
+            writer.writerow([name, st.games, st.moves, d["acpl"], d["accuracy"], *(st.classes[c] for c in CLASSES)])
+    else:
+        width = max([len("player"), *(len(name) for name, _ in rows)])
+        print(f"{'player':<{width}} {'games':>6} {'moves':>7} {'ACPL':>6} {'acc%':>6} "
+              + " ".join(f"{c[:5]:>5}" for c in CLASSES))
+        for name, st in rows:
+            print(f"{name:<{width}} {st.games:>6} {st.moves:>7} "
+                  f"{_fmt(st.acpl, '.1f'):>6} {_fmt(st.accuracy, '.1f'):>6} "
+                  + " ".join(f"{st.classes[c]:>5}" for c in CLASSES))
+    print(f"Summarized {len(records)} games in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,794 @@
+"""
+Move-by-move game analysis with a UCI engine, as an importable library.
+
+The analyzer CLI (analyze_chess_game.py) and the bot use this module. Results
+are yielded per ply as ``PlyResult`` records, in ply order, while the analysis
+runs:
+
+    import chess.engine
+    from PYTHON.stockfish_analysis import analysis
+
+    with chess.engine.SimpleEngine.popen_uci("stockfish") as engine:
+        for r in analysis.analyze_pgn(pgn_text, engine, chess.engine.Limit(time=0.2), reuse=True):
+            print(analysis.format_row(r))
+
+The caller owns the engines: they are passed in (a ``SimpleEngine``, a list
+of them, or an ``EnginePool``) and are not closed here.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import copy
+import io
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Iterator, List, Optional, Tuple
+
+import chess
+import chess.engine
+import chess.pgn
+
+try:
+    import psutil  # type: ignore
+except Exception:  # pragma: no cover - optional dependency; we fall back if unavailable
+    psutil = None  # type: ignore
+
+try:
+    from . import pgn_extract
+    from .progress import game_key, matching_prefix, settings_key
+    from .shortcuts import BOOK, TB_LOSS_CP, TB_WIN_CP
+except ImportError:  # run as a script from this directory
+    import pgn_extract
+    from progress import game_key, matching_prefix, settings_key
+    from shortcuts import BOOK, TB_LOSS_CP, TB_WIN_CP
+
+DEFAULT_ENGINE = "stockfish"
+
+TABLE_HEADER = "Columns: ply  side  move  played_eval  best_eval  loss  class  best_suggestion"
+
+
+def extract_pgn_text(raw: str) -> Optional[str]:
+    """Try to extract a PGN block from a possibly noisy file's text.
+
+    Strategies tried in order (see ``pgn_extract``, which does the same on
+    memory-mapped files):
+      1) Everything after a line that equals or starts with 'PGN:'
+      2) From the first PGN tag line '[' to the end
+      3) From the first line starting with an integer and a dot (e.g., '1.') to the end
+    """
+    return pgn_extract.extract_pgn_text(raw.encode("utf-8", errors="replace"))
+
+
+def score_to_cp(score: chess.engine.PovScore, pov_white: bool) -> Tuple[Optional[int], Optional[int]]:
+    """Return tuple (cp, mate_in) from a PovScore for the given POV color.
+
+    If it's a mate score, cp will be None and mate_in will be +/-N (positive means mate for POV side).
+    If it's a cp score, mate_in will be None.
+    """
+    pov = chess.WHITE if pov_white else chess.BLACK
+    s = score.pov(pov)
+    if s.is_mate():
+        mi = s.mate()
+        return None, mi
+    return s.score(mate_score=None), None
+
+
+def classify_cp_loss(cp_loss: Optional[int]) -> str:
+    """Classify move quality using Lichess-like centipawn loss bands.
+
+    Loss is best_eval(cp) - played_eval(cp), from the mover's POV (positive is worse).
+    Bands (approx, widely cited):
+      - Best:    0..10 cp
+      - Excellent: 11..20 cp
+      - Good:    21..50 cp
+      - Inaccuracy: 51..99 cp
+      - Mistake: 100..299 cp
+      - Blunder: >=300 cp
+    """
+    if cp_loss is None:
+        return "Unknown"
+    if cp_loss <= 10:
+        return "Best"
+    if cp_loss <= 20:
+        return "Excellent"
+    if cp_loss <= 50:
+        return "Good"
+    if cp_loss <= 99:
+        return "Inaccuracy"
+    if cp_loss <= 299:
+        return "Mistake"
+    return "Blunder"
+
+
+def fmt_eval(cp: Optional[int], mate_in: Optional[int]) -> str:
+    if mate_in is not None:
+        sign = "+" if mate_in > 0 else ""
+        return f"M{sign}{mate_in}"
+    if cp is None:
+        return "?"
+    # Convert cp to pawns with sign and 2 decimals
+    return f"{cp/100.0:+.2f}"
+
+
+def _usable_cpu_count() -> int:
+    """Number of CPUs this process may run on (respects taskset/--cpus), falling back to all cores."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return multiprocessing.cpu_count() or 1
+
+
+def _detect_total_mem_mb() -> Optional[int]:
+    # Prefer psutil if available
+    if psutil is not None:
+        try:
+            return int(psutil.virtual_memory().total // (1024 * 1024))
+        except Exception:
+            pass
+    # Fallback: Linux /proc/meminfo
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    parts = line.split()
+                    if len(parts) >= 2 and parts[1].isdigit():
+                        # Value is in kB
+                        kb = int(parts[1])
+                        return kb // 1024
+    except Exception:
+        pass
+    return None
+
+
+def _auto_hash_mb(threads_wanted: int, engine_options) -> int:
+    total_mb = _detect_total_mem_mb() or 2048
+    # Heuristic: cap at 4 GiB by default; keep at most half of RAM; ensure >= 64MB
+    half_ram = max(64, total_mb // 2)
+    target = half_ram
+    # Respect engine "Hash" max if exposed
+    opt = engine_options.get("Hash")
+    max_allowed = None
+    try:
+        max_allowed = getattr(opt, "max") if opt is not None else None
+    except Exception:
+        max_allowed = None
+    if isinstance(max_allowed, int):
+        target = min(target, max_allowed)
+    # Some rough scaling: if very many threads, give a bit more (but not huge)
+    if threads_wanted >= 16:
+        target = min(target + 1024, (total_mb * 3) // 4)
+    return max(64, int(target))
+
+
+def classify_move(
+    best_cp: Optional[int], best_mate: Optional[int], played_cp: Optional[int], played_mate: Optional[int]
+) -> Tuple[Optional[int], str]:
+    """Return (cp_loss, classification) for a played move given both evals from the mover's POV."""
+    cp_loss: Optional[int] = None
+    classification = "Unknown"
+    # Handle mate cases first
+    if played_mate == 0:
+        # The played move delivered mate (engines report the finished game as mate 0)
+        classification = "Best"
+    elif best_mate is not None or played_mate is not None:
+        if best_mate is not None and played_mate is not None:
+            # Same sign -> compare speed
+            if (best_mate > 0) and (played_mate > 0):
+                # Keeping a mate: equal speed Best; slower -> Inaccuracy; faster -> Best
+                if abs(played_mate) == abs(best_mate):
+                    classification = "Best"
+                elif abs(played_mate) > abs(best_mate):
+                    classification = "Inaccuracy"
+                else:
+                    classification = "Best"
+            elif (best_mate < 0) and (played_mate < 0):
+                # Defending: equal delay Best; if played is sooner mate -> Blunder; if played delays more -> Good
+                if abs(played_mate) == abs(best_mate):
+                    classification = "Best"
+                elif abs(played_mate) < abs(best_mate):
+                    classification = "Blunder"
+                else:
+                    classification = "Good"
+            else:
+                # Sign flip across who mates -> Blunder
+                classification = "Blunder"
+        else:
+            # Losing a forced mate or missing one
+            classification = "Blunder"
+    else:
+        if best_cp is not None and played_cp is not None:
+            cp_loss = max(0, best_cp - played_cp)
+            classification = classify_cp_loss(cp_loss)
+    return cp_loss, classification
+
+
+@dataclass
+class PlyResult:
+    """One analysed ply; evals are (cp, mate_in) from the mover's POV."""
+
+    ply: int
+    side: str  # "W" or "B"
+    san: str
+    played_cp: Optional[int]
+    played_mate: Optional[int]
+    best_cp: Optional[int]
+    best_mate: Optional[int]
+    cp_loss: Optional[int]
+    classification: str
+    best_san: str
+    best_uci: Optional[str] = None
+    pv: List[str] = field(default_factory=list)  # engine's best line from the position before the move, in UCI
+    uci: str = ""  # played move
+    fen: str = ""  # position before the move
+
+
+def _ply_result(ply: int, before: chess.Board, move: chess.Move, played, best, best_move, pv_info) -> PlyResult:
+    cp_loss, classification = classify_move(best[0], best[1], played[0], played[1])
+    pv = [m.uci() for m in pv_info.get("pv", [])] if pv_info else []
+    return PlyResult(
+        ply=ply,
+        side="W" if before.turn else "B",
+        san=before.san(move),
+        played_cp=played[0],
+        played_mate=played[1],
+        best_cp=best[0],
+        best_mate=best[1],
+        cp_loss=cp_loss,
+        classification=classification,
+        best_san=before.san(best_move) if best_move is not None else "?",
+        best_uci=best_move.uci() if best_move is not None else None,
+        pv=pv,
+        uci=move.uci(),
+        fen=before.fen(),
+    )
+
+
+def format_row(r: PlyResult) -> str:
+    """Format a result as a row of the fixed-width table (see the Columns: header)."""
+    return (
+        f"{r.ply:>3}  {r.side}   {r.san:<8}  {fmt_eval(r.played_cp, r.played_mate):>10}  "
+        f"{fmt_eval(r.best_cp, r.best_mate):>9}  "
+        f"{(str(r.cp_loss) if r.cp_loss is not None else '—'):>5}  {r.classification:<12}  {r.best_san}"
+    )
+
+
+def _eval_of(info, pov_white: bool) -> Tuple[Optional[int], Optional[int]]:
+    if info is None or "score" not in info:
+        return None, None
+    return score_to_cp(info["score"], pov_white=pov_white)
+
+
+def _terminal_score(board: chess.Board) -> chess.engine.PovScore:
+    """Score of a finished game as an engine would report it for the side to move."""
+    if board.is_checkmate():
+        return chess.engine.PovScore(chess.engine.Mate(0), board.turn)
+    return chess.engine.PovScore(chess.engine.Cp(0), board.turn)
+
+
+def _analyse_with_history(engine, board, limit, multipv, root_moves, history: list) -> list:
+    """Like ``engine.analyse`` but also records the best line's score at each depth."""
+    by_depth = {}
+    with engine.analysis(board, limit, multipv=multipv, root_moves=root_moves) as result:
+        for info in result:
+            if info.get("multipv", 1) == 1 and "score" in info and "depth" in info:
+                by_depth[info["depth"]] = info["score"].relative
+        lines = result.multipv
+    history.extend(by_depth[d] for d in sorted(by_depth))
+    return lines
+
+
+class EnginePool:
+    """Configured engines shared by worker threads, with the search limit and MultiPV to use.
+
+    ``analyse`` calls are counted in ``calls``; results served from ``cache`` are not.
+    """
+
+    def __init__(self, engines, limit: chess.engine.Limit, multipv: int, cache=None):
+        if not isinstance(engines, (list, tuple)):
+            engines = [engines]
+        self.size = len(engines)
+        self.limit = limit
+        self.multipv = multipv
+        self.cache = cache  # optional EvalCache; searches restricted with root_moves are not cached
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._idle: "queue.Queue" = queue.Queue()
+        for engine in engines:
+            self._idle.put(engine)
+
+    def sharing(self, limit: Optional[chess.engine.Limit] = None) -> "EnginePool":
+        """A pool over the same engines and cache with its own limit and call count.
+
+        Several of them can be used at once (e.g. one per daemon job); searches
+        wait for an idle engine.
+        """
+        view = copy.copy(self)
+        view.limit = limit or self.limit
+        view.calls = 0
+        view._lock = threading.Lock()
+        return view
+
+    def _checkout(self):
+        return self._idle.get()
+
+    def lines(self, board: chess.Board, root_moves=None, limit: Optional[chess.engine.Limit] = None,
+              history: Optional[list] = None) -> list:
+        """Analyse ``board`` on an idle engine (or take it from the cache) and return its PV lines, best first.
+
+        ``limit`` overrides the pool's limit for this search. If ``history`` is
+        given, the best line's score (relative) after each completed depth is
+        appended to it; the cache keeps it with the lines.
+        """
+        limit = limit or self.limit
+        if self.cache is not None and not root_moves:
+            cached = self.cache.get(board, limit, self.multipv, history)
+            if cached:
+                return cached
+        with self._lock:
+            self.calls += 1
+        multipv = 1 if root_moves else self.multipv
+        engine = self._checkout()
+        try:
+            if history is not None and hasattr(engine, "analysis"):
+                raw = _analyse_with_history(engine, board, limit, multipv, root_moves, history)
+            else:
+                raw = engine.analyse(board, limit=limit, multipv=multipv, root_moves=root_moves)
+        finally:
+            self._idle.put(engine)
+        lines = raw if isinstance(raw, list) else [raw]
+        if self.cache is not None and not root_moves:
+            self.cache.put(board, limit, self.multipv, lines, history)
+        return lines
+
+    def best_move(self, board: chess.Board, lines: list) -> Optional[chess.Move]:
+        if lines and lines[0] is not None and lines[0].get("pv"):
+            return lines[0]["pv"][0]
+        # Fallback to engine.play if PV missing
+        engine = self._checkout()
+        try:
+            return engine.play(board, self.limit).move
+        finally:
+            self._idle.put(engine)
+
+    def in_order(self, fn, jobs) -> Iterator:
+        """Run ``fn(*job)`` for each job on up to ``size`` threads; yield results in job order."""
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.size)
+        try:
+            futures = [pool.submit(fn, *job) for job in jobs]
+            for future in futures:
+                yield future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _positions(board: chess.Board, moves, start: int) -> List[Tuple[int, chess.Board, chess.Move]]:
+    """Return (ply, board before the move, move) from ``moves[start]`` on; leaves ``board`` after the last move."""
+    out = []
+    for ply, move in enumerate(moves, 1):
+        if ply > start:
+            out.append((ply, board.copy(), move))
+        board.push(move)
+    return out
+
+
+def _full_ply(analyser: EnginePool, board: chess.Board, move: chess.Move):
+    mover_white = board.turn
+    root = analyser.lines(board)
+    best_move = analyser.best_move(board, root)
+
+    board_played = board.copy()
+    board_played.push(move)
+    played = _eval_of(analyser.lines(board_played)[0], mover_white)
+
+    best: Tuple[Optional[int], Optional[int]] = (None, None)
+    if best_move is not None:
+        board_best = board.copy()
+        board_best.push(best_move)
+        best = _eval_of(analyser.lines(board_best)[0], mover_white)
+    return played, best, best_move, root[0]
+
+
+def analyze_full(
+    analyser: EnginePool, board: chess.Board, moves, start: int = 0
+) -> Iterator[PlyResult]:
+    """Three searches per ply: the root, the position after the played move and after the best move.
+
+    Plies are independent, so with several engines they are analysed concurrently.
+    Plies before ``moves[start]`` are skipped.
+    """
+    positions = _positions(board, moves, start)
+    results = analyser.in_order(_full_ply, [(analyser, b, m) for _, b, m in positions])
+    for (ply, before, move), (played, best, best_move, root) in zip(positions, results):
+        yield _ply_result(ply, before, move, played, best, best_move, root)
+
+
+def analyze_reusing(
+    analyser: EnginePool, board: chess.Board, moves, start: int = 0
+) -> Iterator[PlyResult]:
+    """About one search per ply by reusing results.
+
+    The best eval comes from the root MultiPV search. The played eval comes from
+    the same search when the played move is among its lines; otherwise from the
+    root search of the next ply, which is the position after the played move and
+    is needed anyway. Only when there is no next search (the last ply) is the
+    played move searched on its own, restricted with ``root_moves``.
+
+    Root searches do not depend on each other and run concurrently with several engines.
+    """
+    positions = _positions(board, moves, start)
+    return _reusing_pass(analyser, positions, board)
+
+
+def _reusing_pass(analyser: EnginePool, positions, final: chess.Board, limit=None,
+                  histories: Optional[List[list]] = None) -> Iterator[PlyResult]:
+    """The ``analyze_reusing`` loop; ``final`` is the position after the last move."""
+    if not positions:
+        return
+    jobs = [(b, None, limit, histories[i] if histories is not None else None) for i, (_, b, _) in enumerate(positions)]
+    roots = analyser.in_order(analyser.lines, jobs)
+    root = next(roots)
+    for i, (ply, before, move) in enumerate(positions):
+        mover_white = before.turn
+        best_move = analyser.best_move(before, root)
+        best = _eval_of(root[0], mover_white)
+        same_line = next((info for info in root if info and info.get("pv") and info["pv"][0] == move), None)
+
+        next_root = next(roots) if i + 1 < len(positions) else None
+        if same_line is not None:
+            played = _eval_of(same_line, mover_white)
+        elif next_root is not None:
+            played = _eval_of(next_root[0], mover_white)
+        elif final.is_game_over():
+            played = score_to_cp(_terminal_score(final), pov_white=mover_white)
+        else:
+            played = _eval_of(analyser.lines(before, root_moves=[move], limit=limit)[0], mover_white)
+
+        yield _ply_result(ply, before, move, played, best, best_move, root[0])
+        root = next_root
+
+
+# Adaptive mode: plies whose shallow result is in one of these classes get a second, deeper look
+CRITICAL_CLASSES = ("Inaccuracy", "Mistake", "Blunder")
+# Score change between the last two depths of the shallow search that marks it as unstable
+UNSTABLE_CP = 50
+# Shortest search worth sending to the engine
+MIN_SEARCH_SECONDS = 0.02
+
+
+@dataclass
+class AdaptiveReport:
+    """How ``analyze_adaptive`` spent its budget (seconds are wall clock)."""
+
+    budget: float = 0.0
+    shallow_seconds: float = 0.0
+    shallow_searches: int = 0
+    shallow_time_per_search: float = 0.0
+    critical_by_loss: int = 0
+    critical_by_instability: int = 0
+    deep_seconds: float = 0.0
+    deep_searches: int = 0
+    deep_time_per_search: float = 0.0
+
+    def summary(self) -> str:
+        critical = self.critical_by_loss + self.critical_by_instability
+        return (
+            f"Budget: {self.budget:.1f}s; shallow pass {self.shallow_seconds:.1f}s "
+            f"({self.shallow_searches} searches x {self.shallow_time_per_search:.2f}s); "
+            f"deep pass {self.deep_seconds:.1f}s on {critical} plies "
+            f"({self.critical_by_loss} by loss, {self.critical_by_instability} unstable; "
+            f"{self.deep_searches} searches x {self.deep_time_per_search:.2f}s)"
+        )
+
+
+def _is_unstable(history: list) -> bool:
+    if len(history) < 2:
+        return False
+    a, b = history[-2], history[-1]
+    if a.is_mate() != b.is_mate():
+        return True
+    return abs(a.score(mate_score=100_000) - b.score(mate_score=100_000)) > UNSTABLE_CP
+
+
+def _deep_ply(analyser: EnginePool, ply: int, before: chess.Board, move: chess.Move, limit) -> PlyResult:
+    mover_white = before.turn
+    root = analyser.lines(before, limit=limit)
+    best_move = analyser.best_move(before, root)
+    best = _eval_of(root[0], mover_white)
+    same_line = next((info for info in root if info and info.get("pv") and info["pv"][0] == move), None)
+    if same_line is not None:
+        played = _eval_of(same_line, mover_white)
+    else:
+        after = before.copy()
+        after.push(move)
+        if after.is_game_over():
+            played = score_to_cp(_terminal_score(after), pov_white=mover_white)
+        else:
+            played = _eval_of(analyser.lines(after, limit=limit)[0], mover_white)
+    return _ply_result(ply, before, move, played, best, best_move, root[0])
+
+
+def analyze_adaptive(
+    analyser: EnginePool,
+    board: chess.Board,
+    moves,
+    budget: float,
+    *,
+    shallow_share: float = 0.3,
+    start: int = 0,
+    report: Optional[AdaptiveReport] = None,
+) -> Iterator[PlyResult]:
+    """Spend a total time ``budget`` (seconds) where the game needs it, in two passes.
+
+    A shallow reusing pass over every ply takes ``shallow_share`` of the budget.
+    Plies whose shallow loss is an Inaccuracy or worse, or whose root search
+    changed by more than ``UNSTABLE_CP`` between its last two depths, are then
+    searched again with the rest of the budget split evenly between them (two
+    searches each). Results are yielded in ply order after both passes;
+    ``report`` (if given) is filled in with how the budget was spent.
+    """
+    report = report if report is not None else AdaptiveReport()
+    report.budget = budget
+    positions = _positions(board, moves, start)
+    if not positions:
+        return
+
+    started = time.monotonic()
+    calls0 = analyser.calls
+    per_search = max(MIN_SEARCH_SECONDS, budget * shallow_share * analyser.size / len(positions))
+    histories: List[list] = [[] for _ in positions]
+    shallow = list(_reusing_pass(analyser, positions, board, chess.engine.Limit(time=per_search), histories))
+    report.shallow_seconds = time.monotonic() - started
+    report.shallow_searches = analyser.calls - calls0
+    report.shallow_time_per_search = per_search
+
+    critical = []
+    for i, r in enumerate(shallow):
+        if r.classification in CRITICAL_CLASSES:
+            report.critical_by_loss += 1
+            critical.append(i)
+        elif _is_unstable(histories[i]):
+            report.critical_by_instability += 1
+            critical.append(i)
+
+    deep = {}
+    remaining = budget - report.shallow_seconds
+    if critical and remaining > 0:
+        per_search = max(MIN_SEARCH_SECONDS, remaining * analyser.size / (2 * len(critical)))
+        limit = chess.engine.Limit(time=per_search)
+        t0 = time.monotonic()
+        calls0 = analyser.calls
+        jobs = [(analyser, *positions[i], limit) for i in critical]
+        deep = dict(zip(critical, analyser.in_order(_deep_ply, jobs)))
+        report.deep_seconds = time.monotonic() - t0
+        report.deep_searches = analyser.calls - calls0
+        report.deep_time_per_search = per_search
+
+    for i, r in enumerate(shallow):
+        yield deep.get(i, r)
+
+
+def configure_engine(engine, threads: int, hash_mb: Optional[int], multipv: int, share: int = 1):
+    """Set Threads, Hash, MultiPV and NNUE where the engine exposes them.
+
+    ``threads`` and ``hash_mb`` (None = auto) are totals split evenly across
+    ``share`` engines. Returns (threads, hash_mb or None, multipv) applied to this engine.
+    """
+    try:
+        options = engine.options  # type: ignore[attr-defined]
+    except Exception:
+        options = {}
+
+    # Threads
+    wanted_threads = max(1, threads // max(1, share))
+    # Respect engine bounds if present
+    if "Threads" in options:
+        try:
+            max_thr = getattr(options["Threads"], "max", None)
+            min_thr = getattr(options["Threads"], "min", 1)
+            if isinstance(max_thr, int):
+                wanted_threads = min(wanted_threads, max_thr)
+            if isinstance(min_thr, int):
+                wanted_threads = max(wanted_threads, min_thr)
+            engine.configure({"Threads": int(wanted_threads)})
+        except Exception:
+            pass
+
+    # Hash (MB)
+    applied_hash: Optional[int] = None
+    if "Hash" in options:
+        try:
+            if hash_mb is not None:
+                target_hash = int(hash_mb)
+            else:
+                target_hash = _auto_hash_mb(int(threads), options)
+            target_hash //= max(1, share)
+            # Respect bounds
+            max_hash = getattr(options["Hash"], "max", None)
+            min_hash = getattr(options["Hash"], "min", 16)
+            if isinstance(max_hash, int):
+                target_hash = min(target_hash, max_hash)
+            if isinstance(min_hash, int):
+                target_hash = max(target_hash, min_hash)
+            engine.configure({"Hash": int(target_hash)})
+            applied_hash = int(target_hash)
+        except Exception:
+            pass
+
+    # MultiPV
+    effective_mpv = max(1, int(multipv))
+    if "MultiPV" in options:
+        try:
+            max_mpv = getattr(options["MultiPV"], "max", None)
+            if isinstance(max_mpv, int):
+                effective_mpv = min(effective_mpv, max_mpv)
+            engine.configure({"MultiPV": int(effective_mpv)})
+        except Exception:
+            pass
+
+    # Enable NNUE if the option exists
+    for nnue_key in ("Use NNUE", "UseNNUE"):
+        if nnue_key in options:
+            try:
+                engine.configure({nnue_key: True})
+            except Exception:
+                pass
+    return int(wanted_threads), applied_hash, effective_mpv
+
+
+def open_engines(
+    path: str = DEFAULT_ENGINE,
+    count: int = 1,
+    threads: Optional[int] = None,
+    hash_mb: Optional[int] = None,
+    multipv: int = 2,
+) -> Tuple[List[chess.engine.SimpleEngine], int, Optional[int], int]:
+    """Start ``count`` engines and split ``threads`` (None = usable cores) and hash between them.
+
+    Returns (engines, threads, hash_mb or None, multipv) with per-engine values.
+    Raises FileNotFoundError if the engine cannot be launched.
+    """
+    count = max(1, int(count))
+    total_threads = threads if threads is not None else _usable_cpu_count()
+    engines: List[chess.engine.SimpleEngine] = []
+    try:
+        for _ in range(count):
+            engines.append(chess.engine.SimpleEngine.popen_uci([path]))
+    except Exception:
+        for engine in engines:
+            engine.quit()
+        raise
+    applied = (1, None, max(1, int(multipv)))
+    for engine in engines:
+        applied = configure_engine(engine, total_threads, hash_mb, multipv, share=count)
+    return (engines, *applied)
+
+
+def analyze_game(
+    engine,
+    game: chess.pgn.Game,
+    limit: Optional[chess.engine.Limit] = None,
+    *,
+    multipv: int = 2,
+    reuse: bool = False,
+    last_move_only: bool = False,
+    cache=None,
+    budget: Optional[float] = None,
+    report: Optional[AdaptiveReport] = None,
+    progress=None,
+    game_id: Optional[str] = None,
+    shortcuts=None,
+) -> Iterator[PlyResult]:
+    """Yield results for the main line of ``game``, in ply order.
+
+    ``engine`` is a ``SimpleEngine``, a list of them, or an ``EnginePool`` (whose
+    limit, MultiPV and cache then apply). ``limit`` defaults to 0.5 s per search.
+    With a ``budget`` (seconds for the whole game) the adaptive two-pass mode is
+    used instead and ``limit`` is ignored.
+
+    With a ``progress`` store (``progress.ProgressStore``) plies already stored
+    for this game (``game_id``, by default ``progress.game_key(game)``) and these
+    settings are yielded from the store and only the plies after them are
+    analysed; each new ply is stored as soon as it is yielded. With
+    ``last_move_only`` only the last ply is yielded, analysed if it is not stored.
+    With a ``budget``, the budget is spent on the plies that are not stored.
+
+    With ``shortcuts`` (``shortcuts.Shortcuts``) book plies at the start and
+    tablebase plies at the end are classified without searching; only the
+    plies in between are analysed (and the budget spent on them).
+    """
+    if isinstance(engine, EnginePool):
+        pool = engine
+    else:
+        pool = EnginePool(engine, limit or chess.engine.Limit(time=0.5), multipv, cache)
+    moves = list(game.mainline_moves())
+    if not moves:
+        return iter(())
+    first = len(moves) - 1 if last_move_only else 0
+    if progress is None:
+        return _analyze_from(pool, game.board(), moves, first, reuse, budget, report, shortcuts)
+    mode = f"budget={budget:g}" if budget is not None else ("reuse" if reuse else "full")
+    if shortcuts is not None:
+        mode += shortcuts.key
+    return _analyze_with_progress(
+        pool, game.board(), moves, first, reuse, budget, report, shortcuts,
+        progress, game_id or game_key(game), settings_key(mode, pool.limit, pool.multipv),
+    )
+
+
+def _analyze_from(pool: EnginePool, board: chess.Board, moves, start: int, reuse: bool,
+                  budget: Optional[float], report: Optional[AdaptiveReport], shortcuts=None) -> Iterator[PlyResult]:
+    if shortcuts is not None:
+        return _analyze_with_shortcuts(pool, board, moves, start, reuse, budget, report, shortcuts)
+    return _search_from(pool, board, moves, start, reuse, budget, report)
+
+
+def _search_from(pool: EnginePool, board: chess.Board, moves, start: int, reuse: bool,
+                 budget: Optional[float], report: Optional[AdaptiveReport]) -> Iterator[PlyResult]:
+    if budget is not None:
+        return analyze_adaptive(pool, board, moves, budget, start=start, report=report)
+    analyze = analyze_reusing if reuse else analyze_full
+    return analyze(pool, board, moves, start=start)
+
+
+def _analyze_with_shortcuts(pool: EnginePool, board: chess.Board, moves, start: int, reuse: bool,
+                            budget: Optional[float], report: Optional[AdaptiveReport],
+                            shortcuts) -> Iterator[PlyResult]:
+    """Book plies, then engine plies, then tablebase plies, from ``moves[start]`` on."""
+    book = shortcuts.book_line(board, moves)
+    endgame = shortcuts.tablebase_line(board, moves, stop=len(book))
+    engine_end = len(moves) - len(endgame)
+    # What each skipped ply would have cost: one root search, or three in full mode
+    calls_per_ply = 1 if reuse or budget is not None else 3
+    positions = _positions(board.copy(), moves, start)
+    for ply, before, move in positions:
+        if ply > len(book):
+            break
+        shortcuts.count(book=1, calls_per_ply=calls_per_ply)
+        yield _book_result(ply, before, move, book[ply - 1])
+    if max(start, len(book)) < engine_end:
+        yield from _search_from(pool, board.copy(), moves[:engine_end], max(start, len(book)), reuse, budget, report)
+    for ply, before, move in positions:
+        if ply > engine_end:
+            shortcuts.count(tablebase=1, calls_per_ply=calls_per_ply)
+            yield _tablebase_result(ply, before, move, *endgame[ply - engine_end - 1])
+
+
+def _book_result(ply: int, before: chess.Board, move: chess.Move, book_move: chess.Move) -> PlyResult:
+    r = _ply_result(ply, before, move, (None, None), (None, None), book_move, None)
+    return replace(r, classification=BOOK)
+
+
+def _tablebase_result(ply: int, before: chess.Board, move: chess.Move,
+                      played: int, best: int, best_move: chess.Move) -> PlyResult:
+    r = _ply_result(ply, before, move, (played * TB_WIN_CP, None), (best * TB_WIN_CP, None), best_move,
+                    {"pv": [best_move]})
+    return replace(r, cp_loss=TB_LOSS_CP if played < best else 0, classification="Best" if played == best else "Blunder")
+
+
+def _analyze_with_progress(pool: EnginePool, board: chess.Board, moves, first: int, reuse: bool,
+                           budget: Optional[float], report: Optional[AdaptiveReport], shortcuts,
+                           progress, game: str, settings: str) -> Iterator[PlyResult]:
+    stored = progress.load(game, settings)
+    done = matching_prefix(stored, board, moves)
+    if done < len(stored):
+        progress.discard(game, settings, done + 1)
+    for item in stored[first:done]:
+        progress.reused += 1
+        yield PlyResult(**item)
+    for r in _analyze_from(pool, board, moves, max(first, done), reuse, budget, report, shortcuts):
+        progress.save(game, settings, asdict(r))
+        yield r
+
+
+def analyze_pgn(pgn_text: str, engine, limit: Optional[chess.engine.Limit] = None, **kwargs) -> Iterator[PlyResult]:
+    """Like ``analyze_game`` for the first game of a PGN string (or a log containing one)."""
+    text = extract_pgn_text(pgn_text) or ""
+    game = chess.pgn.read_game(io.StringIO(text))
+    if game is None:
+        raise ValueError("No PGN game found")
+    return analyze_game(engine, game, limit, **kwargs)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Analysis daemon: warm Stockfish engines serving analysis jobs over a Unix socket.
+
+Starting an analysis costs an interpreter, the python-chess import and a cold
+engine with an empty hash. The daemon pays that once and keeps its engines
+(and their hash tables) between jobs:
+
+    python3 PYTHON/stockfish_analysis/analysis_daemon.py --socket /tmp/stockfish_analysis.sock \\
+        --engines 2 --cache evals.sqlite --progress progress.sqlite [--book book.bin --syzygy DIR]
+
+Protocol: one JSON line per connection with the job, e.g.
+``{"pgn": "...", "reuse": true, "time": 0.2}`` (also ``depth``,
+``last_move_only``, ``budget`` and ``game_id``), answered by one JSON line
+per ply (the ``PlyResult`` fields) as soon as it is analysed, and a last line
+``{"done": true, "engine_calls": N, "seconds": S}`` or ``{"error": "..."}``.
+Jobs run concurrently and share the engines; a search waits for an idle one.
+
+``DaemonClient`` submits jobs from Python and yields ``PlyResult`` records.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from dataclasses import asdict
+from typing import Iterator, Optional
+
+import chess
+import chess.engine
+import chess.pgn
+
+try:
+    from .analysis import EnginePool, PlyResult, analyze_pgn
+except ImportError:  # run as a script from its folder
+    from analysis import EnginePool, PlyResult, analyze_pgn
+
+DEFAULT_SOCKET = "/tmp/stockfish_analysis.sock"
+
+
+def _job_limit(job: dict) -> Optional[chess.engine.Limit]:
+    if job.get("depth") is not None:
+        return chess.engine.Limit(depth=int(job["depth"]))
+    if job.get("time") is not None:
+        return chess.engine.Limit(time=float(job["time"]))
+    return None
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        server: AnalysisServer = self.server  # type: ignore[assignment]
+        try:
+            job = json.loads(self.rfile.readline())
+            pool = server.pool.sharing(_job_limit(job))
+            started = time.monotonic()
+            results = analyze_pgn(
+                job["pgn"], pool,
+                reuse=bool(job.get("reuse")),
+                last_move_only=bool(job.get("last_move_only")),
+                budget=job.get("budget"),
+                progress=server.progress,
+                shortcuts=server.shortcuts,
+                game_id=job.get("game_id"),
+            )
+            for r in results:
+                self._send(asdict(r))
+            server.job_done(pool.calls)
+            self._send({"done": True, "engine_calls": pool.calls, "seconds": round(time.monotonic() - started, 3)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client went away; the engines are released as the search returns
+        except Exception as e:
+            try:
+                self._send({"error": f"{type(e).__name__}: {e}"})
+            except OSError:
+                pass
+
+    def _send(self, message: dict) -> None:
+        self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class AnalysisServer(socketserver.ThreadingUnixStreamServer):
+    """Serves jobs on ``path`` with ``pool``; ``progress`` and ``shortcuts`` (optional) are shared by all jobs."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, pool: EnginePool, progress=None, shortcuts=None):
+        _remove_stale_socket(path)
+        self.pool = pool
+        self.progress = progress
+        self.shortcuts = shortcuts
+        self.jobs_done = 0
+        self.engine_calls = 0
+        self._lock = threading.Lock()
+        super().__init__(path, _JobHandler)
+
+    def job_done(self, engine_calls: int) -> None:
+        with self._lock:
+            self.jobs_done += 1
+            self.engine_calls += engine_calls
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Remove a socket left by a daemon that died; refuse to replace a live one."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"An analysis daemon is already listening on {path}")
+
+
+class DaemonClient:
+    """Submits jobs to a running daemon; ``calls`` adds up the engine calls of finished jobs."""
+
+    def __init__(self, path: str = DEFAULT_SOCKET, timeout: Optional[float] = None):
+        self.path = path
+        self.timeout = timeout
+        self.calls = 0
+
+    def analyze_pgn(
+        self,
+        pgn_text: str,
+        *,
+        limit: Optional[chess.engine.Limit] = None,
+        reuse: bool = False,
+        last_move_only: bool = False,
+        budget: Optional[float] = None,
+        game_id: Optional[str] = None,
+    ) -> Iterator[PlyResult]:
+        """Like ``analysis.analyze_pgn`` on the daemon's engines.
+
+        Connects before returning, so an ``OSError`` here means no daemon is
+        listening. Raises ``RuntimeError`` while iterating if the job fails, and
+        ``ValueError`` on a message it cannot read (e.g. from a daemon of
+        another version).
+        """
+        job = {"pgn": pgn_text, "reuse": reuse, "last_move_only": last_move_only, "budget": budget, "game_id": game_id}
+        if limit is not None:
+            job.update(depth=limit.depth, time=limit.time)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            sock.sendall(json.dumps(job).encode("utf-8") + b"\n")
+        except OSError:
+            sock.close()
+            raise
+        return self._results(sock)
+
+    def analyze_game(self, game: chess.pgn.Game, **kwargs) -> Iterator[PlyResult]:
+        exporter = chess.pgn.StringExporter(headers=True, variations=False, comments=False)
+        return self.analyze_pgn(game.accept(exporter), **kwargs)
+
+    def _results(self, sock: socket.socket) -> Iterator[PlyResult]:
+        with sock, sock.makefile("rb") as lines:
+            for line in lines:
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    raise ValueError(f"Analysis daemon: unexpected message {line[:200]!r}")
+                if "error" in message:
+                    raise RuntimeError(f"Analysis daemon: {message['error']}")
+                if message.get("done"):
+                    self.calls += message.get("engine_calls", 0)
+                    return
+                try:
+                    result = PlyResult(**message)
+                except TypeError as e:  # fields this version does not know or lacks
+                    raise ValueError(f"Analysis daemon: unexpected ply {line[:200]!r} ({e})") from None
+                yield result
+        raise RuntimeError("Analysis daemon closed the connection before the job was done")
+
+
+def main() -> int:
+    try:
+        from . import analyze_chess_game as cli
+    except ImportError:
+        import analyze_chess_game as cli
+
+    ap = argparse.ArgumentParser(description="Serve game analysis with warm Stockfish engines over a Unix socket.")
+    ap.add_argument("--socket", default=DEFAULT_SOCKET, metavar="PATH",
+                    help=f"Unix socket to listen on (default: {DEFAULT_SOCKET})")
+    ap.add_argument("--engine", default="stockfish", help="Path to stockfish executable (default: stockfish)")
+    ap.add_argument("--engines", type=int, default=1, metavar="K", help="Warm engine processes (default: 1)")
+    ap.add_argument("--threads", type=cli._parse_threads, default=None, metavar="auto|N",
+                    help="Engine threads in total (default: auto = all usable logical cores)")
+    ap.add_argument("--hash-mb", type=cli._parse_hash_mb, default=None, metavar="auto|MB",
+                    help="Hash table size in MB in total (default: auto)")
+    ap.add_argument("--multipv", type=int, default=2, help="Number of principal variations (default: 2)")
+    ap.add_argument("--time", type=float, default=0.5,
+                    help="Seconds per search for jobs that do not set a limit (default: 0.5)")
+    ap.add_argument("--no-profile", action="store_true", help="Ignore the saved --tune profile")
+    ap.add_argument("--cache", default=None, metavar="PATH", help="SQLite evaluation cache (default: off)")
+    ap.add_argument("--cache-max-entries", type=int, default=1_000_000, metavar="N",
+                    help="Evict least recently used cache entries beyond N (default: 1000000)")
+    ap.add_argument("--progress", default=None, metavar="PATH",
+                    help="SQLite store of analysed plies per game (default: off)")
+    ap.add_argument("--book", default=None, metavar="PATH", help="Polyglot opening book (default: off)")
+    ap.add_argument("--syzygy", default=None, metavar="DIRS",
+                    help=f"Syzygy tablebase directories separated by '{os.pathsep}' (default: off)")
+    args = ap.parse_args()
+
+    shortcuts = cli._open_shortcuts(args)
+    engines, threads, hash_mb, multipv = cli._open_engines(args)
+    cache = cli._open_cache(args)
+    progress = cli._open_progress(args)
+    pool = EnginePool(engines, chess.engine.Limit(time=max(0.05, args.time)), multipv, cache)
+    try:
+        server = AnalysisServer(args.socket, pool, progress, shortcuts)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        if shortcuts is not None:
+            shortcuts.close()
+        for engine in engines:
+            engine.quit()
+        return 1
+    # SIGTERM stops the server like Ctrl-C; shutdown() must run outside the serving thread
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"Analysis daemon on {args.socket}: {len(engines)} engines x {threads} threads, "
+          f"Hash={hash_mb or '?'} MB, MultiPV={multipv}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Analysis daemon stopped after {server.jobs_done} jobs, {server.engine_calls} engine calls", flush=True)
+        if cache is not None:
+            print(cache.summary())
+            cache.close()
+        if progress is not None:
+            print(progress.summary())
+            progress.close()
+        if shortcuts is not None:
+            print(shortcuts.summary())
+            shortcuts.close()
+        for engine in engines:
+            engine.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,35 +3,43 @@
 Analyze a chess game's moves using a local Stockfish engine and rate each move.
 
 Usage:
-    python3 PYTHON/analyze_chess_game.py <path-to-file>
+    python3 PYTHON/analyze_chess_game.py <path-to-file> [more files, dirs or globs with --batch]
         [--engine stockfish]
         [--time 0.5 | --depth 20]
         [--threads auto|N]
         [--hash-mb auto|MB]
         [--multipv N]
-        [--last-move-only]
+        [--last-move-only] [--reuse | --budget SECONDS]
+        [--engines K]
+        [--batch [--out results.jsonl] [--resume]]
+        [--cache evals.sqlite [--cache-max-entries N]]
+        [--progress progress.sqlite]
+        [--book book.bin] [--syzygy DIR[:DIR...]]
+        [--daemon SOCKET]
+        [--format text|json|jsonl|csv]
+        [--tune [--tune-depth N] | --no-profile]
+        [--cpus LIST] [--nice N]
 
 Notes:
     - Requires python-chess. Install from PYTHON/stockfish_analysis/requirements.txt
     - The input file can be a pure PGN or a log file containing a PGN section.
     - The script tries to locate the PGN by looking for a 'PGN:' marker, PGN tags '[...]', or a move list starting with '1.'.
+    - The analysis itself lives in analysis.py and can be used in-process; this script only formats it.
     - Stockfish is CPU-based; it doesn't use GPU VRAM. "Full power" here means using many CPU threads and a large transposition table (Hash).
 """
 
 from __future__ import annotations
 
 import argparse
-import io
+import csv
+import glob
+import itertools
+import json
 import os
-import re
 import sys
-from typing import Optional, Tuple
-import multiprocessing
-
-try:
-    import psutil  # type: ignore
-except Exception:  # pragma: no cover - optional dependency; we fall back if unavailable
-    psutil = None  # type: ignore
+import time
+from dataclasses import asdict, fields
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 try:
     import chess
@@ -42,92 +50,61 @@ except Exception as e:  # pragma: no cover
     print("  pip install -r PYTHON/stockfish_analysis/requirements.txt", file=sys.stderr)
     raise
 
-
-def extract_pgn_text(raw: str) -> Optional[str]:
-    """Try to extract a PGN block from a possibly noisy file.
-
-    Strategies tried in order:
-      1) Everything after a line that equals or starts with 'PGN:'
-      2) From the first PGN tag line '[' to the end
-      3) From the first line starting with an integer and a dot (e.g., '1.') to the end
-    """
-    lines = raw.splitlines()
-
-    # 1) After 'PGN:' marker
-    for i, line in enumerate(lines):
-        if line.strip().startswith("PGN:"):
-            # everything after this line
-            pgn = "\n".join(lines[i + 1 :]).strip()
-            if pgn:
-                return pgn
-
-    # 2) From first tag line
-    for i, line in enumerate(lines):
-        if line.strip().startswith("[") and "]" in line:
-            pgn = "\n".join(lines[i:]).strip()
-            if pgn:
-                return pgn
-
-    # 3) From first move number
-    move_start_re = re.compile(r"^\s*\d+\.")
-    for i, line in enumerate(lines):
-        if move_start_re.match(line):
-            pgn = "\n".join(lines[i:]).strip()
-            if pgn:
-                return pgn
-
-    return None
-
-
-def score_to_cp(score: chess.engine.PovScore, pov_white: bool) -> Tuple[Optional[int], Optional[int]]:
-    """Return tuple (cp, mate_in) from a PovScore for the given POV color.
-
-    If it's a mate score, cp will be None and mate_in will be +/-N (positive means mate for POV side).
-    If it's a cp score, mate_in will be None.
-    """
-    pov = chess.WHITE if pov_white else chess.BLACK
-    s = score.pov(pov)
-    if s.is_mate():
-        mi = s.mate()
-        return None, mi
-    return s.score(mate_score=None), None
-
-
-def classify_cp_loss(cp_loss: Optional[int]) -> str:
-    """Classify move quality using Lichess-like centipawn loss bands.
-
-    Loss is best_eval(cp) - played_eval(cp), from the mover's POV (positive is worse).
-    Bands (approx, widely cited):
-      - Best:    0..10 cp
-      - Excellent: 11..20 cp
-      - Good:    21..50 cp
-      - Inaccuracy: 51..99 cp
-      - Mistake: 100..299 cp
-      - Blunder: >=300 cp
+try:
+    from .analysis import (
+        TABLE_HEADER,
+        AdaptiveReport,
+        EnginePool,
+        PlyResult,
+        _detect_total_mem_mb,
+        _usable_cpu_count,
+        analyze_game,
+        format_row,
+        open_engines,
+    )
+    from .analysis_daemon import DaemonClient
+    from .cpus import cpu_list_arg
+    from .eval_cache import EvalCache
+    from . import pgn_extract
+    from .progress import ProgressStore
+    from .shortcuts import Shortcuts
+    from . import tuning
+except ImportError:  # run as a script from its folder
+    from analysis import (
+        TABLE_HEADER,
+        AdaptiveReport,
+        EnginePool,
+        PlyResult,
+        _detect_total_mem_mb,
+        _usable_cpu_count,
+        analyze_game,
+        format_row,
+        open_engines,
+    )
+    from analysis_daemon import DaemonClient
+    from cpus import cpu_list_arg
+    from eval_cache import EvalCache
+    import pgn_extract
+    from progress import ProgressStore
+    from shortcuts import Shortcuts
+    import tuning
+
+
+def _summarize_game(plies):
+    """Per-side summary of a game (see stats.py), or None when NumPy is not installed.
+
+    stats is imported on first use, so analysing a game does not need NumPy.
     """
-    if cp_loss is None:
-        return "Unknown"
-    if cp_loss <= 10:
-        return "Best"
-    if cp_loss <= 20:
-        return "Excellent"
-    if cp_loss <= 50:
-        return "Good"
-    if cp_loss <= 99:
-        return "Inaccuracy"
-    if cp_loss <= 299:
-        return "Mistake"
-    return "Blunder"
-
-
-def fmt_eval(cp: Optional[int], mate_in: Optional[int]) -> str:
-    if mate_in is not None:
-        sign = "+" if mate_in > 0 else ""
-        return f"M{sign}{mate_in}"
-    if cp is None:
-        return "?"
-    # Convert cp to pawns with sign and 2 decimals
-    return f"{cp/100.0:+.2f}"
+    try:
+        if __package__:
+            from .stats import summarize_game
+        else:
+            from stats import summarize_game
+    except ModuleNotFoundError as e:
+        if e.name != "numpy":
+            raise
+        return None
+    return summarize_game(plies)
 
 
 def _parse_threads(value: str) -> Optional[int]:
@@ -152,359 +129,459 @@ def _parse_hash_mb(value: str) -> Optional[int]:
         raise argparse.ArgumentTypeError("--hash-mb must be an integer (MB) or 'auto'")
 
 
-def _detect_total_mem_mb() -> Optional[int]:
-    # Prefer psutil if available
-    if psutil is not None:
-        try:
-            return int(psutil.virtual_memory().total // (1024 * 1024))
-        except Exception:
-            pass
-    # Fallback: Linux /proc/meminfo
+def _open_engines(args) -> Tuple[List, int, Optional[int], int]:
+    """Start and configure ``--engines`` engines; exits if the engine cannot be launched.
+
+    Threads and hash left on auto come from the --tune profile for this machine, if there is one.
+    """
+    threads, hash_mb = args.threads, args.hash_mb
+    if threads is None and hash_mb is None and not args.no_profile:
+        tuned = tuning.load_profile(tuning.machine_key(args.engine, _usable_cpu_count()), args.multipv)
+        if tuned is not None:
+            threads, hash_mb = tuned
+            print(f"Using tuned profile from {tuning.profile_path()}: Threads={threads}, Hash={hash_mb} MB",
+                  file=sys.stderr)
     try:
-        with open("/proc/meminfo", "r", encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                if line.startswith("MemTotal:"):
-                    parts = line.split()
-                    if len(parts) >= 2 and parts[1].isdigit():
-                        # Value is in kB
-                        kb = int(parts[1])
-                        return kb // 1024
-    except Exception:
-        pass
-    return None
+        return open_engines(args.engine, args.engines, threads, hash_mb, args.multipv)
+    except FileNotFoundError:
+        print(f"Could not launch engine at: {args.engine}", file=sys.stderr)
+        print("Ensure Stockfish is installed and in PATH, or specify with --engine.", file=sys.stderr)
+        sys.exit(4)
+
 
+def run_tune(args) -> int:
+    """Benchmark Threads/Hash/MultiPV on a fixed position set and save the fastest settings."""
+    args.engines = 1
+    engines, _, _, _ = _open_engines(args)
+    engine = engines[0]
+    cpus = _usable_cpu_count()
+    threads = tuning.candidate_threads(args.threads or cpus)
+    hashes = [args.hash_mb] if args.hash_mb else tuning.candidate_hash(_detect_total_mem_mb())
+    multipvs = sorted({1, max(1, args.multipv)})
+    print(f"Tuning {args.engine}: depth {args.tune_depth} on {len(tuning.BENCH_FENS)} positions; "
+          f"Threads {threads}, Hash {hashes} MB, MultiPV {multipvs}")
+    print(f"{'threads':>7} {'hash_mb':>7} {'multipv':>7} {'seconds':>8} {'knps':>8}")
+
+    def show(t):
+        print(f"{t.threads:>7} {t.hash_mb:>7} {t.multipv:>7} {t.seconds:>8.3f} {t.nps / 1000:>8.0f}", flush=True)
 
-def _auto_hash_mb(threads_wanted: int, engine_options) -> int:
-    total_mb = _detect_total_mem_mb() or 2048
-    # Heuristic: cap at 4 GiB by default; keep at most half of RAM; ensure >= 64MB
-    half_ram = max(64, total_mb // 2)
-    target = half_ram
-    # Respect engine "Hash" max if exposed
-    opt = engine_options.get("Hash")
-    max_allowed = None
     try:
-        max_allowed = getattr(opt, "max") if opt is not None else None
-    except Exception:
-        max_allowed = None
-    if isinstance(max_allowed, int):
-        target = min(target, max_allowed)
-    # Some rough scaling: if very many threads, give a bit more (but not huge)
-    if threads_wanted >= 16:
-        target = min(target + 1024, (total_mb * 3) // 4)
-    return max(64, int(target))
+        trials = tuning.tune(engine, threads, hashes, multipvs, args.tune_depth, progress=show)
+    finally:
+        engine.quit()
+    best = tuning.winners(trials)
+    for mpv, t in sorted(best.items()):
+        print(f"Fastest for MultiPV={mpv}: Threads={t.threads}, Hash={t.hash_mb} MB ({t.seconds:.3f}s to depth)")
+    path = tuning.save_profile(tuning.machine_key(args.engine, cpus), best, args.tune_depth)
+    print(f"Saved profile to {path}; runs with --threads/--hash-mb on auto will use it")
+    return 0
+
+
+def _daemon_unreachable(path: str, error: OSError) -> None:
+    print(f"Could not reach the analysis daemon at {path}: {error}", file=sys.stderr)
+    print("Start it with analysis_daemon.py or analyze without --daemon.", file=sys.stderr)
+    sys.exit(4)
+
+
+def _open_cache(args):
+    if not args.cache:
+        return None
+    return EvalCache(args.cache, max_entries=args.cache_max_entries)
+
+
+def _open_progress(args):
+    if not args.progress:
+        return None
+    return ProgressStore(args.progress)
+
+
+def _open_shortcuts(args):
+    if not args.book and not args.syzygy:
+        return None
+    dirs = [d for d in (args.syzygy or "").split(os.pathsep) if d]
+    try:
+        return Shortcuts(args.book, dirs)
+    except (OSError, ValueError) as e:
+        print(f"Cannot open the book or tablebases: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def _analysis_limit(args) -> chess.engine.Limit:
+    if args.depth is not None:
+        return chess.engine.Limit(depth=args.depth)
+    return chess.engine.Limit(time=max(0.05, args.time))
+
+
+def _analyze(analyser, game: chess.pgn.Game, args, **kwargs) -> Iterator[PlyResult]:
+    """Analyze ``game`` on local engines (an ``EnginePool``) or through a running daemon (a ``DaemonClient``)."""
+    options = dict(reuse=args.reuse, last_move_only=args.last_move_only, budget=args.budget)
+    if isinstance(analyser, DaemonClient):
+        return analyser.analyze_game(game, limit=_analysis_limit(args), **options)
+    return analyze_game(analyser, game, **options, **kwargs)
+
+
+def iter_input_files(inputs: List[str]) -> Iterator[str]:
+    """Expand directories (recursively, *.pgn and *.log) and glob patterns into file paths, each once."""
+    seen: Set[str] = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            paths: List[str] = []
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                paths.extend(os.path.join(root, name) for name in sorted(files) if name.endswith((".pgn", ".log")))
+        elif glob.has_magic(item):
+            paths = [p for p in sorted(glob.glob(item, recursive=True)) if os.path.isfile(p)]
+        else:
+            paths = [item]
+        for path in paths:
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                yield path
+
+
+def iter_games(path: str) -> Iterator[Tuple[int, Optional[chess.pgn.Game]]]:
+    """Yield (index, game) for every game in a PGN file or bot log; game is None if no PGN was found.
+
+    The file is memory-mapped and games are parsed one at a time as they are reached.
+    """
+    return pgn_extract.read_games(path)
+
+
+def _done_games(out_path: str) -> Set[str]:
+    """Keys of games already written to a batch results file."""
+    done: Set[str] = set()
+    if not os.path.isfile(out_path):
+        return done
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["game"])
+            except (ValueError, KeyError, TypeError):
+                continue  # partial last line of an interrupted run
+    return done
+
+
+def run_batch(args, analyser, progress=None, shortcuts=None) -> int:
+    """Analyze every game of every input with warm engines; append one JSON line per game to ``args.out``.
+
+    ``analyser`` is an ``EnginePool`` or a ``DaemonClient``.
+    """
+    done = _done_games(args.out) if args.resume else set()
+    analysed = skipped = failed = 0
+    started = time.monotonic()
+    with open(args.out, "a", encoding="utf-8") as out:
+        for path in iter_input_files(args.files):
+            games = iter_games(path)
+            try:
+                first = next(games, None)  # the file is opened here
+            except OSError as e:
+                print(f"Cannot read {path}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            for index, game in itertools.chain([first] if first else [], games):
+                key = f"{os.path.abspath(path)}#{index}"
+                if key in done:
+                    skipped += 1
+                    continue
+                record: Dict = {"game": key}
+                t0 = time.monotonic()
+                calls0 = analyser.calls
+                if game is None:
+                    record["error"] = "Could not locate PGN text in the file."
+                    failed += 1
+                else:
+                    record["headers"] = {k: game.headers.get(k, "") for k in ("White", "Black", "Result", "Site")}
+                    try:
+                        # Results are streamed, so errors surface while they are consumed
+                        plies = [asdict(r) for r in _analyze(analyser, game, args, progress=progress, shortcuts=shortcuts)]
+                    except Exception as e:
+                        # An engine crash, a bad PGN or a failed daemon job costs this game only; it is
+                        # written with its error, so --resume moves on instead of retrying it first
+                        record["error"] = f"{type(e).__name__}: {e}"
+                        failed += 1
+                    else:
+                        record["plies"] = plies
+                        summary = _summarize_game(plies)
+                        if summary is not None:
+                            record["summary"] = {side: st.to_dict() for side, st in summary.items()}
+                        analysed += 1
+                record["engine_calls"] = analyser.calls - calls0
+                record["seconds"] = round(time.monotonic() - t0, 3)
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+
+                elapsed = time.monotonic() - started
+                rate = analysed * 3600.0 / elapsed if elapsed > 0 else 0.0
+                print(
+                    f"[{analysed} analysed, {skipped} skipped, {failed} failed] {rate:.1f} games/hour  {key}",
+                    file=sys.stderr,
+                    flush=True,
+                )
+
+    elapsed = time.monotonic() - started
+    rate = analysed * 3600.0 / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Batch done: {analysed} games analysed, {skipped} skipped, {failed} failed "
+        f"in {elapsed:.1f}s ({rate:.1f} games/hour); results in {args.out}"
+    )
+    return 0 if failed == 0 else 5
+
+
+class _TextWriter:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, r: PlyResult) -> None:
+        print(format_row(r), file=self.out, flush=True)
+
+    def close(self) -> None:
+        pass
+
+
+class _JsonLinesWriter(_TextWriter):
+    def write(self, r: PlyResult) -> None:
+        print(json.dumps(asdict(r)), file=self.out, flush=True)
+
+
+class _JsonWriter(_TextWriter):
+    """A JSON array, written element by element so it can be consumed while the analysis runs."""
+
+    def __init__(self, out):
+        super().__init__(out)
+        self._first = True
+
+    def write(self, r: PlyResult) -> None:
+        self.out.write(("[\n" if self._first else ",\n") + json.dumps(asdict(r)))
+        self.out.flush()
+        self._first = False
+
+    def close(self) -> None:
+        self.out.write("[]\n" if self._first else "\n]\n")
+        self.out.flush()
+
+
+class _CsvWriter(_TextWriter):
+    FIELDS = [f.name for f in fields(PlyResult)]
+
+    def __init__(self, out):
+        super().__init__(out)
+        self._csv = csv.DictWriter(out, fieldnames=self.FIELDS)
+        self._csv.writeheader()
+
+    def write(self, r: PlyResult) -> None:
+        row = asdict(r)
+        row["pv"] = " ".join(row["pv"])
+        self._csv.writerow(row)
+        self.out.flush()
+
+
+WRITERS = {"text": _TextWriter, "json": _JsonWriter, "jsonl": _JsonLinesWriter, "csv": _CsvWriter}
 
 
 def main():
     ap = argparse.ArgumentParser(description="Analyze a chess game's moves with Stockfish and rate each move.")
-    ap.add_argument("file", help="Path to a PGN file or a log containing a PGN section")
+    ap.add_argument("files", nargs="*", metavar="file",
+                    help="Path to a PGN file or a log containing a PGN section; with --batch also directories and globs")
     ap.add_argument("--engine", default="stockfish", help="Path to stockfish executable (default: stockfish)")
     # Exactly one of time or depth may be provided; default to time
     ap.add_argument("--time", type=float, default=0.5, help="Analysis time per evaluation in seconds (default: 0.5)")
     ap.add_argument("--depth", type=int, default=None, help="Fixed depth per evaluation (overrides --time)")
     # Performance knobs
     ap.add_argument("--threads", type=_parse_threads, default=None, metavar="auto|N",
-                    help="Engine threads to use (default: auto = all logical cores)")
+                    help="Engine threads to use (default: auto = all usable logical cores)")
     ap.add_argument("--hash-mb", type=_parse_hash_mb, default=None, metavar="auto|MB",
                     help="Hash table size in MB (default: auto = up to half RAM, capped)")
     ap.add_argument("--multipv", type=int, default=2, help="Number of principal variations to compute (default: 1)")
     ap.add_argument("--last-move-only", action="store_true",
                     help="Analyze only the last move of the main line (reports its eval and the best move)")
+    ap.add_argument("--reuse", action="store_true",
+                    help="Reuse search results across plies: about one engine search per ply instead of three")
+    ap.add_argument("--budget", type=float, default=None, metavar="SECONDS",
+                    help="Adaptive mode: a total time budget for the game, spent on a shallow pass over all "
+                         "plies and a deeper pass over critical ones (overrides --time/--depth)")
+    ap.add_argument("--engines", type=int, default=1, metavar="K",
+                    help="Run K engine processes in parallel, splitting threads and hash between them (default: 1)")
+    ap.add_argument("--batch", action="store_true",
+                    help="Analyze every game in the given files, directories and globs (multi-game PGN included)")
+    ap.add_argument("--out", default="analysis_results.jsonl", metavar="PATH",
+                    help="With --batch: JSON lines file receiving one result per game (default: analysis_results.jsonl)")
+    ap.add_argument("--resume", action="store_true",
+                    help="With --batch: skip games already present in --out")
+    ap.add_argument("--cache", default=None, metavar="PATH",
+                    help="SQLite evaluation cache shared across runs and processes (default: off)")
+    ap.add_argument("--cache-max-entries", type=int, default=1_000_000, metavar="N",
+                    help="Evict least recently used cache entries beyond N (default: 1000000)")
+    ap.add_argument("--progress", default=None, metavar="PATH",
+                    help="SQLite store of analysed plies per game: reruns only analyse new plies (default: off)")
+    ap.add_argument("--book", default=None, metavar="PATH",
+                    help="Polyglot opening book: book moves are classified without searching (default: off)")
+    ap.add_argument("--syzygy", default=None, metavar="DIRS",
+                    help=f"Syzygy tablebase directories separated by '{os.pathsep}': endgame plies are "
+                         "classified from the tablebases (default: off)")
+    ap.add_argument("--daemon", default=None, metavar="SOCKET",
+                    help="Submit the analysis to a running analysis_daemon.py instead of starting engines")
+    ap.add_argument("--format", choices=sorted(WRITERS), default="text",
+                    help="Per-ply output of a single game: text table, json array, jsonl or csv; non-text "
+                         "formats write everything else to stderr (default: text)")
+    ap.add_argument("--tune", action="store_true",
+                    help="Benchmark Threads/Hash/MultiPV on this machine, save the fastest settings and exit")
+    ap.add_argument("--tune-depth", type=int, default=14, metavar="N",
+                    help="With --tune: search depth per benchmark position (default: 14)")
+    ap.add_argument("--no-profile", action="store_true",
+                    help="Ignore the saved --tune profile and use the auto Threads/Hash heuristics")
+    ap.add_argument("--cpus", type=cpu_list_arg, default=None, metavar="LIST",
+                    help="Pin this process and Stockfish to these CPUs, e.g. 0-3,6 (default: inherit)")
+    ap.add_argument("--nice", type=int, default=0,
+                    help="Lower this process's and Stockfish's priority by N (default: 0)")
     args = ap.parse_args()
 
-    if not os.path.isfile(args.file):
-        print(f"Input not found: {args.file}", file=sys.stderr)
-        sys.exit(1)
+    # Apply CPU placement before launching Stockfish so the engine (and its search
+    # threads) inherit it.
+    if args.cpus:
+        try:
+            os.sched_setaffinity(0, args.cpus)
+        except (AttributeError, OSError) as e:
+            print(f"Could not pin to CPUs {sorted(args.cpus)}: {e}", file=sys.stderr)
+    if args.nice:
+        try:
+            os.nice(args.nice)
+        except (AttributeError, OSError) as e:
+            print(f"Could not change nice level: {e}", file=sys.stderr)
 
-    with open(args.file, "r", encoding="utf-8", errors="replace") as f:
-        raw = f.read()
+    if args.tune:
+        sys.exit(run_tune(args))
 
-    pgn_text = extract_pgn_text(raw)
-    if not pgn_text:
-        print("Could not locate PGN text in the file.", file=sys.stderr)
-        sys.exit(2)
+    if args.daemon and (args.cache or args.progress or args.book or args.syzygy):
+        ap.error("--cache, --progress, --book and --syzygy are options of the daemon, not of --daemon clients")
 
-    game = chess.pgn.read_game(io.StringIO(pgn_text))
-    if game is None:
+    if args.batch:
+        if not args.files:
+            ap.error("--batch needs at least one file, directory or glob")
+        if args.daemon:
+            try:
+                sys.exit(run_batch(args, DaemonClient(args.daemon)))
+            except OSError as e:
+                _daemon_unreachable(args.daemon, e)
+        shortcuts = _open_shortcuts(args)
+        engines, _, _, effective_mpv = _open_engines(args)
+        cache = _open_cache(args)
+        progress = _open_progress(args)
+        try:
+            sys.exit(run_batch(args, EnginePool(engines, _analysis_limit(args), effective_mpv, cache),
+                               progress, shortcuts))
+        finally:
+            if cache is not None:
+                print(cache.summary())
+                cache.close()
+            if progress is not None:
+                print(progress.summary())
+                progress.close()
+            if shortcuts is not None:
+                print(shortcuts.summary())
+                shortcuts.close()
+            for engine in engines:
+                engine.quit()
+
+    if len(args.files) != 1:
+        ap.error("analyzing several files requires --batch" if args.files else "a file to analyze is required")
+    path = args.files[0]
+    if not os.path.isfile(path):
+        print(f"Input not found: {path}", file=sys.stderr)
+        sys.exit(1)
+
+    # Only the first game is decoded and parsed, however large the file
+    games = iter_games(path)
+    first = next(games, None)
+    games.close()
+    if first is None:
         print("Failed to parse PGN.", file=sys.stderr)
         sys.exit(3)
+    game = first[1]
+    if game is None:
+        print("Could not locate PGN text in the file.", file=sys.stderr)
+        sys.exit(2)
 
-    # Prepare engine
-    try:
-        engine = chess.engine.SimpleEngine.popen_uci([args.engine])
-    except FileNotFoundError:
-        print(f"Could not launch engine at: {args.engine}", file=sys.stderr)
-        print("Ensure Stockfish is installed and in PATH, or specify with --engine.", file=sys.stderr)
-        sys.exit(4)
-
-    # Configure engine performance options if available
-    try:
-        options = engine.options  # type: ignore[attr-defined]
-    except Exception:
-        options = {}
-
-    # Threads
-    wanted_threads = args.threads if args.threads is not None else (multiprocessing.cpu_count() or 1)
-    # Respect engine bounds if present
-    if "Threads" in options:
-        try:
-            max_thr = getattr(options["Threads"], "max", None)
-            min_thr = getattr(options["Threads"], "min", 1)
-            if isinstance(max_thr, int):
-                wanted_threads = min(wanted_threads, max_thr)
-            if isinstance(min_thr, int):
-                wanted_threads = max(wanted_threads, min_thr)
-            engine.configure({"Threads": int(wanted_threads)})
-        except Exception:
-            pass
-
-    # Hash (MB)
-    if "Hash" in options:
-        try:
-            if args.hash_mb is not None:
-                target_hash = int(args.hash_mb)
-            else:
-                target_hash = _auto_hash_mb(int(wanted_threads), options)
-            # Respect bounds
-            max_hash = getattr(options["Hash"], "max", None)
-            min_hash = getattr(options["Hash"], "min", 16)
-            if isinstance(max_hash, int):
-                target_hash = min(target_hash, max_hash)
-            if isinstance(min_hash, int):
-                target_hash = max(target_hash, min_hash)
-            engine.configure({"Hash": int(target_hash)})
-        except Exception:
-            pass
-
-    # MultiPV
-    effective_mpv = max(1, int(args.multipv))
-    if "MultiPV" in options:
-        try:
-            max_mpv = getattr(options["MultiPV"], "max", None)
-            if isinstance(max_mpv, int):
-                effective_mpv = min(effective_mpv, max_mpv)
-            engine.configure({"MultiPV": int(effective_mpv)})
-        except Exception:
-            pass
-
-    # Enable NNUE if the option exists
-    for nnue_key in ("Use NNUE", "UseNNUE"):
-        if nnue_key in options:
-            try:
-                engine.configure({nnue_key: True})
-            except Exception:
-                pass
-
-    limit: chess.engine.Limit
-    if args.depth is not None:
-        limit = chess.engine.Limit(depth=args.depth)
-    else:
-        limit = chess.engine.Limit(time=max(0.05, args.time))
-
-    board = game.board()
-    print("Game:")
-    white = game.headers.get("White", "White")
-    black = game.headers.get("Black", "Black")
-    result = game.headers.get("Result", "*")
-    print(f"  {white} vs {black}  Result: {result}")
-    print()
-    print("Columns: ply  side  move  played_eval  best_eval  loss  class  best_suggestion")
-    # Brief performance summary (best-effort)
-    try:
-        thr_show = int(wanted_threads)
-    except Exception:
-        thr_show = 1
-    try:
-        hash_show = int(engine.options.get("Hash").value) if hasattr(engine, "options") and engine.options.get("Hash") else None
-    except Exception:
-        hash_show = None
-    if hash_show is not None:
-        print(f"Using engine options: Threads={thr_show}, Hash={hash_show} MB, MultiPV={effective_mpv}")
+    shortcuts = None if args.daemon else _open_shortcuts(args)
+
+    # Machine-readable formats keep stdout for the records and report everything else on stderr
+    info = sys.stdout if args.format == "text" else sys.stderr
+    if args.format == "text":
+        print("Game:")
+        white = game.headers.get("White", "White")
+        black = game.headers.get("Black", "Black")
+        result = game.headers.get("Result", "*")
+        print(f"  {white} vs {black}  Result: {result}")
+        print()
+        print(TABLE_HEADER)
+
+    if args.daemon:
+        engines, cache, progress = [], None, None
+        analyser = DaemonClient(args.daemon)
+        setup = f"analysis daemon at {args.daemon}"
+        print(f"Using {setup}", file=info)
     else:
-        print(f"Using engine options: Threads={thr_show}, MultiPV={effective_mpv}")
-
-    ply = 1
-    try:
-        node = game
-
-        if args.last_move_only:
-            # Walk to the last move in the main line and analyze only that ply.
-            if not node.variations:
-                print("No moves found in the game.")
-            else:
-                while node.variations:
-                    move_node = node.variations[0]
-                    move = move_node.move
-                    mover_white = board.turn
-
-                    # If this is the final move in the mainline, analyze it and stop.
-                    if not move_node.variations:
-                        # Analyse current position to get engine best move suggestion
-                        info_root_raw = engine.analyse(board, limit=limit, multipv=effective_mpv)
-                        info_root = info_root_raw[0] if isinstance(info_root_raw, list) else info_root_raw
-                        best_move = None
-                        if info_root is not None and "pv" in info_root and info_root["pv"]:
-                            best_move = info_root["pv"][0]
-                        if best_move is None:
-                            res = engine.play(board, limit)
-                            best_move = res.move
-
-                        san = board.san(move)
-
-                        # Evaluate played move
-                        board_played = board.copy()
-                        board_played.push(move)
-                        info_played_raw = engine.analyse(board_played, limit=limit, multipv=effective_mpv)
-                        info_played = info_played_raw[0] if isinstance(info_played_raw, list) else info_played_raw
-                        if info_played is None or "score" not in info_played:
-                            played_cp, played_mate = None, None
-                        else:
-                            played_cp, played_mate = score_to_cp(info_played["score"], pov_white=mover_white)
-
-                        # Evaluate best move position (for mover POV)
-                        best_san = board.san(best_move) if best_move is not None else "?"
-                        if best_move is not None:
-                            board_best = board.copy()
-                            board_best.push(best_move)
-                            info_best_raw = engine.analyse(board_best, limit=limit, multipv=effective_mpv)
-                            info_best = info_best_raw[0] if isinstance(info_best_raw, list) else info_best_raw
-                            if info_best is None or "score" not in info_best:
-                                best_cp, best_mate = None, None
-                            else:
-                                best_cp, best_mate = score_to_cp(info_best["score"], pov_white=mover_white)
-                        else:
-                            best_cp, best_mate = None, None
-
-                        # Compute loss/classification
-                        cp_loss: Optional[int] = None
-                        classification = "Unknown"
-                        if best_mate is not None or played_mate is not None:
-                            if best_mate is not None and played_mate is not None:
-                                if (best_mate > 0) and (played_mate > 0):
-                                    if abs(played_mate) == abs(best_mate):
-                                        classification = "Best"
-                                    elif abs(played_mate) > abs(best_mate):
-                                        classification = "Inaccuracy"
-                                    else:
-                                        classification = "Best"
-                                elif (best_mate < 0) and (played_mate < 0):
-                                    if abs(played_mate) == abs(best_mate):
-                                        classification = "Best"
-                                    elif abs(played_mate) < abs(best_mate):
-                                        classification = "Blunder"
-                                    else:
-                                        classification = "Good"
-                                else:
-                                    classification = "Blunder"
-                            else:
-                                classification = "Blunder"
-                        else:
-                            if best_cp is not None and played_cp is not None:
-                                cp_loss = max(0, best_cp - played_cp)
-                                classification = classify_cp_loss(cp_loss)
-
-                        side = "W" if mover_white else "B"
-                        print(
-                            f"{ply:>3}  {side}   {san:<8}  {fmt_eval(played_cp, played_mate):>10}  "
-                            f"{fmt_eval(best_cp, best_mate):>9}  "
-                            f"{(str(cp_loss) if cp_loss is not None else '—'):>5}  {classification:<12}  {best_san}"
-                        )
-                        break
-
-                    # Advance to keep searching for the last move
-                    board.push(move)
-                    node = move_node
-                    ply += 1
+        # Prepare engines; threads and hash are split between them
+        engines, thr_show, hash_show, effective_mpv = _open_engines(args)
+        n_engines = len(engines)
+        setup = f"{n_engines} engines x {thr_show} threads"
+        # Brief performance summary (best-effort)
+        per_engine = f"Engines={n_engines}, " if n_engines > 1 else ""
+        if hash_show is not None:
+            print(f"Using engine options: {per_engine}Threads={thr_show}, Hash={hash_show} MB, "
+                  f"MultiPV={effective_mpv}", file=info)
         else:
-            # Default behavior: analyze all moves
-            while node.variations:
-                move_node = node.variations[0]
-                move = move_node.move
-                mover_white = board.turn
-
-                # Analyse position to get engine best move suggestion
-                info_root_raw = engine.analyse(board, limit=limit, multipv=effective_mpv)
-                info_root = info_root_raw[0] if isinstance(info_root_raw, list) else info_root_raw
-                best_move = None
-                if info_root is not None and "pv" in info_root and info_root["pv"]:
-                    best_move = info_root["pv"][0]
-                # Fallback to engine.play if PV missing
-                if best_move is None:
-                    res = engine.play(board, limit)
-                    best_move = res.move
-
-                # Evaluate played move position (for mover POV) using a temp board
-                san = board.san(move)
-                board_played = board.copy()
-                board_played.push(move)
-                info_played_raw = engine.analyse(board_played, limit=limit, multipv=effective_mpv)
-                info_played = info_played_raw[0] if isinstance(info_played_raw, list) else info_played_raw
-                if info_played is None or "score" not in info_played:
-                    played_cp, played_mate = None, None
-                else:
-                    played_cp, played_mate = score_to_cp(info_played["score"], pov_white=mover_white)
-
-                # Evaluate best move position (for mover POV)
-                best_san = board.san(best_move) if best_move is not None else "?"
-                if best_move is not None:
-                    board_best = board.copy()
-                    board_best.push(best_move)
-                    info_best_raw = engine.analyse(board_best, limit=limit, multipv=effective_mpv)
-                    info_best = info_best_raw[0] if isinstance(info_best_raw, list) else info_best_raw
-                    if info_best is None or "score" not in info_best:
-                        best_cp, best_mate = None, None
-                    else:
-                        best_cp, best_mate = score_to_cp(info_best["score"], pov_white=mover_white)
-                else:
-                    best_cp, best_mate = None, None
-
-                # Compute centipawn loss bands
-                cp_loss: Optional[int] = None
-                classification = "Unknown"
-                # Handle mate cases first
-                if best_mate is not None or played_mate is not None:
-                    if best_mate is not None and played_mate is not None:
-                        # Same sign -> compare speed
-                        if (best_mate > 0) and (played_mate > 0):
-                            # Keeping a mate: equal speed Best; slower -> Inaccuracy; faster -> Best
-                            if abs(played_mate) == abs(best_mate):
-                                classification = "Best"
-                            elif abs(played_mate) > abs(best_mate):
-                                classification = "Inaccuracy"
-                            else:
-                                classification = "Best"
-                        elif (best_mate < 0) and (played_mate < 0):
-                            # Defending: equal delay Best; if played is sooner mate -> Blunder; if played delays more -> Good
-                            if abs(played_mate) == abs(best_mate):
-                                classification = "Best"
-                            elif abs(played_mate) < abs(best_mate):
-                                classification = "Blunder"
-                            else:
-                                classification = "Good"
-                        else:
-                            # Sign flip across who mates -> Blunder
-                            classification = "Blunder"
-                    else:
-                        # Losing a forced mate or missing one
-                        classification = "Blunder"
-                else:
-                    if best_cp is not None and played_cp is not None:
-                        cp_loss = max(0, best_cp - played_cp)
-                        classification = classify_cp_loss(cp_loss)
+            print(f"Using engine options: {per_engine}Threads={thr_show}, MultiPV={effective_mpv}", file=info)
+        cache = _open_cache(args)
+        progress = _open_progress(args)
+        analyser = EnginePool(engines, _analysis_limit(args), effective_mpv, cache)
 
-                side = "W" if mover_white else "B"
-                print(
-                    f"{ply:>3}  {side}   {san:<8}  {fmt_eval(played_cp, played_mate):>10}  "
-                    f"{fmt_eval(best_cp, best_mate):>9}  "
-                    f"{(str(cp_loss) if cp_loss is not None else '—'):>5}  {classification:<12}  {best_san}"
-                )
-
-                node = move_node
-                ply += 1
-                # Advance the live board for the next ply
-                board.push(move)
+    writer = WRITERS[args.format](sys.stdout)
+    started = time.monotonic()
+    try:
+        n_moves = sum(1 for _ in game.mainline_moves())
+        if not n_moves:
+            print("No moves found in the game.", file=info)
+        report = AdaptiveReport()
+        results: List[PlyResult] = []
+        try:
+            for r in _analyze(analyser, game, args, report=report, progress=progress, shortcuts=shortcuts):
+                writer.write(r)
+                results.append(r)
+        except OSError as e:
+            if not args.daemon:
+                raise
+            _daemon_unreachable(args.daemon, e)
+        writer.close()
+        print(file=info)
+        analysed = min(1, n_moves) if args.last_move_only else n_moves
+        if progress is not None:
+            analysed = progress.saved
+        summary = _summarize_game(results) if results else None
+        if summary is not None:
+            for side, st in summary.items():
+                if st.moves:
+                    name = game.headers.get("White" if side == "W" else "Black", "?")
+                    print(f"{'White' if side == 'W' else 'Black'} ({name}): {st.describe()}", file=info)
+        print(f"Engine calls: {analyser.calls} for {analysed} plies", file=info)
+        print(f"Wall time: {time.monotonic() - started:.2f}s ({setup})", file=info)
+        if args.budget is not None and not args.daemon:
+            print(report.summary(), file=info)
+        if cache is not None:
+            print(cache.summary(), file=info)
+        if progress is not None:
+            print(progress.summary(), file=info)
+        if shortcuts is not None:
+            print(shortcuts.summary(), file=info)
     finally:
-        engine.quit()
-
+        if cache is not None:
+            cache.close()
+        if progress is not None:
+            progress.close()
+        if shortcuts is not None:
+            shortcuts.close()
+        for engine in engines:
+            engine.quit()
 
 if __name__ == "__main__":
     main()
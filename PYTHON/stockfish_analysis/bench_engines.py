@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Compare wall-clock analysis time of one game for different engine splits.
+
+Runs analyze_chess_game.py once per K in --engines with the same total
+threads and hash, so K engines get 1/K of each, and prints the wall time
+reported by the analyzer. Pick the K with the lowest time for your machine
+and --time/--depth.
+
+Usage:
+    python3 PYTHON/stockfish_analysis/bench_engines.py <game-file>
+        [--engines 1,2,4] [-- analyzer options, e.g. --time 0.2 --reuse]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import List, Optional
+
+ANALYZER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analyze_chess_game.py")
+WALL_RE = re.compile(r"^Wall time: ([0-9.]+)s")
+
+
+def wall_time(game_file: str, engines: int, extra: List[str]) -> Optional[float]:
+    """Run the analyzer with ``--engines engines`` and return its reported wall time."""
+    proc = subprocess.run(
+        [sys.executable, ANALYZER, game_file, "--engines", str(engines), *extra],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr.strip(), file=sys.stderr)
+        return None
+    for line in proc.stdout.splitlines():
+        m = WALL_RE.match(line)
+        if m:
+            return float(m.group(1))
+    return None
+
+
+def main(argv: List[str]) -> int:
+    if "--" in argv:
+        i = argv.index("--")
+        argv, extra = argv[:i], argv[i + 1:]
+    else:
+        extra = []
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("file", help="Game to analyze (PGN or bot log)")
+    ap.add_argument("--engines", default="1,2,4", help="Comma-separated engine counts to try (default: 1,2,4)")
+    args = ap.parse_args(argv[1:])
+
+    results = []
+    for k in [int(x) for x in args.engines.split(",") if x.strip()]:
+        seconds = wall_time(args.file, k, extra)
+        results.append((k, seconds))
+        shown = f"{seconds:.2f}" if seconds is not None else "failed"
+        print(f"engines={k:<3} wall={shown}s", flush=True)
+
+    done = [(s, k) for k, s in results if s is not None]
+    if not done:
+        return 1
+    best_s, best_k = min(done)
+    print(f"Fastest: --engines {best_k} ({best_s:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
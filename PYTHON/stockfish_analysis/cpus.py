@@ -0,0 +1,50 @@
+"""
+CPU lists in the Linux format (``"0-3,6"``), as taken by ``taskset`` and
+``/sys/devices/system/cpu/*``.
+
+Shared by analyze_chess_game.py (``--cpus``) and the lichess bot's CPU
+pinning (lichess_bot/affinity.py). Standard library only, so the bot can
+import it at startup.
+"""
+
+import argparse
+from typing import FrozenSet, Iterable, List
+
+
+def parse_cpu_list(text: str) -> FrozenSet[int]:
+    """Parse a Linux-style CPU list such as ``"0-3,6"``."""
+    cpus = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.update(range(int(lo), int(hi) + 1))
+        else:
+            cpus.add(int(part))
+    if not cpus:
+        raise ValueError(f"Empty CPU list: {text!r}")
+    return frozenset(cpus)
+
+
+def cpu_list_arg(text: str) -> FrozenSet[int]:
+    """``parse_cpu_list`` as an argparse ``type``, with errors that show the expected format."""
+    try:
+        return parse_cpu_list(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"expected a CPU list such as 0-3,6: {e}")
+
+
+def format_cpu_list(cpus: Iterable[int]) -> str:
+    """Inverse of ``parse_cpu_list``: ``{0,1,2,3,6}`` -> ``"0-3,6"``."""
+    out: List[str] = []
+    items = sorted(cpus)
+    i = 0
+    while i < len(items):
+        j = i
+        while j + 1 < len(items) and items[j + 1] == items[j] + 1:
+            j += 1
+        out.append(str(items[i]) if i == j else f"{items[i]}-{items[j]}")
+        i = j + 1
+    return ",".join(out)
@@ -0,0 +1,216 @@
+"""
+On-disk cache of engine analyses for analyze_chess_game.py.
+
+Entries are keyed by the position without move counters (EPD, see
+positions.py), so transpositions share them, and store the search that
+produced them: MultiPV, depth reached and, for time-limited searches, the
+time per position. A request is served from the cache when an
+entry has at least as many lines and at least the requested depth (or time).
+An entry can also keep the best line's score at each depth, for callers
+that look at how the search evolved (adaptive analysis); a request for it
+is only served by an entry that has it.
+
+The cache is a SQLite database in WAL mode, so several analyzer processes can
+read and write it at the same time. Its size is bounded: when it grows past
+``max_entries`` the least recently used entries are evicted. Lookups only
+read: the use time of the entries they hit is kept in memory and written in
+one transaction with the next ``put``, on ``close`` or every
+``TOUCH_BATCH`` hits, so readers sharing the database do not queue for its
+write lock.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import chess
+import chess.engine
+
+try:
+    from .positions import position_key
+except ImportError:  # run as a script from its folder
+    from positions import position_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evals (
+    epd       TEXT    NOT NULL,
+    multipv   INTEGER NOT NULL,
+    depth     INTEGER NOT NULL,
+    time_ms   INTEGER NOT NULL,  -- 0 for depth-limited searches
+    lines     TEXT    NOT NULL,
+    last_used REAL    NOT NULL,
+    PRIMARY KEY (epd, multipv, depth, time_ms)
+);
+CREATE INDEX IF NOT EXISTS evals_last_used ON evals (last_used);
+"""
+
+# Check the size bound after this many inserts rather than on every one
+EVICT_EVERY = 256
+# Write pending last_used updates after this many hits even without a put
+TOUCH_BATCH = 1024
+
+
+def _cp_mate(rel: Optional[chess.engine.Score]) -> Tuple[Optional[int], Optional[int]]:
+    if rel is None:
+        return None, None
+    return (None, rel.mate()) if rel.is_mate() else (rel.score(), None)
+
+
+def _score(cp: Optional[int], mate: Optional[int]) -> Optional[chess.engine.Score]:
+    if mate is not None:
+        return chess.engine.Mate(mate)
+    return chess.engine.Cp(cp) if cp is not None else None
+
+
+def _encode(lines: List[dict], history: Optional[list] = None) -> str:
+    out = []
+    for info in lines:
+        score = info.get("score")
+        cp, mate = _cp_mate(score.relative if score is not None else None)
+        out.append({
+            "cp": cp,
+            "mate": mate,
+            "pv": [m.uci() for m in info.get("pv", [])],
+            "depth": info.get("depth"),
+        })
+    if history is not None and out:
+        out[0]["history"] = [_cp_mate(score) for score in history]
+    return json.dumps(out)
+
+
+def _decode(text: str, board: chess.Board, multipv: int, history: Optional[list] = None) -> Optional[List[dict]]:
+    """The stored lines, or None if ``history`` is wanted and the entry did not keep it."""
+    items = json.loads(text)
+    if history is not None:
+        if not items or "history" not in items[0]:
+            return None
+        history.extend(_score(cp, mate) for cp, mate in items[0]["history"])
+    lines = []
+    for item in items[:multipv]:
+        info: dict = {}
+        score = _score(item["cp"], item["mate"])
+        if score is not None:
+            info["score"] = chess.engine.PovScore(score, board.turn)
+        if item["pv"]:
+            info["pv"] = [chess.Move.from_uci(u) for u in item["pv"]]
+        if item["depth"] is not None:
+            info["depth"] = item["depth"]
+        lines.append(info)
+    return lines
+
+
+class EvalCache:
+    """Thread-safe SQLite cache of ``engine.analyse`` results."""
+
+    def __init__(self, path: str, max_entries: int = 1_000_000, busy_timeout: float = 30.0):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+        self._inserts = 0
+        # (epd, multipv, depth, time_ms) -> last hit time, not yet written
+        self._touched: Dict[Tuple[str, int, int, int], float] = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    @staticmethod
+    def _limit_key(limit: chess.engine.Limit):
+        """(depth, time_ms) requested by a limit; only depth and time limits are cacheable."""
+        if limit.depth is not None:
+            return int(limit.depth), 0
+        if limit.time is not None:
+            return 0, int(round(limit.time * 1000))
+        return None
+
+    def get(self, board: chess.Board, limit: chess.engine.Limit, multipv: int,
+            history: Optional[list] = None) -> Optional[List[dict]]:
+        """Cached lines for a search at least as deep as ``limit``, or None.
+
+        If ``history`` is given, the best line's score (relative) after each
+        depth is appended to it; entries stored without one are misses.
+        """
+        key = self._limit_key(limit)
+        if key is None:
+            return None
+        depth, time_ms = key
+        if not time_ms:
+            query = ("SELECT epd, multipv, depth, time_ms, lines FROM evals WHERE epd=? AND multipv>=? AND depth>=? "
+                     "ORDER BY depth DESC LIMIT 1")
+            params = (position_key(board), multipv, depth)
+        else:
+            query = ("SELECT epd, multipv, depth, time_ms, lines FROM evals WHERE epd=? AND multipv>=? AND time_ms>=? "
+                     "ORDER BY depth DESC LIMIT 1")
+            params = (position_key(board), multipv, time_ms)
+        with self._lock:
+            row = self._db.execute(query, params).fetchone()
+            lines = _decode(row[4], board, multipv, history) if row is not None else None
+            if lines is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[row[:4]] = time.time()
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touched_locked()
+        return lines
+
+    def put(self, board: chess.Board, limit: chess.engine.Limit, multipv: int, lines: List[dict],
+            history: Optional[list] = None) -> None:
+        key = self._limit_key(limit)
+        if key is None or not lines:
+            return
+        depth, time_ms = key
+        # Store the depth actually reached so deeper requests can reuse time-limited results
+        reached = min((info.get("depth") or 0) for info in lines)
+        depth = max(depth, reached) if not time_ms else reached
+        with self._lock:
+            self._flush_touched_locked()
+            self._db.execute(
+                "INSERT OR REPLACE INTO evals (epd, multipv, depth, time_ms, lines, last_used) VALUES (?,?,?,?,?,?)",
+                (position_key(board), multipv, depth, time_ms, _encode(lines, history), time.time()),
+            )
+            self._inserts += 1
+            if self._inserts % EVICT_EVERY == 0:
+                self._evict_locked()
+
+    def _flush_touched_locked(self) -> None:
+        if not self._touched:
+            return
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany(
+                "UPDATE evals SET last_used=max(last_used, ?) WHERE epd=? AND multipv=? AND depth=? AND time_ms=?",
+                [(t, *key) for key, t in self._touched.items()],
+            )
+            self._db.execute("COMMIT")
+        except sqlite3.Error:
+            self._db.execute("ROLLBACK")
+            raise
+        self._touched.clear()
+
+    def _evict_locked(self) -> None:
+        (count,) = self._db.execute("SELECT COUNT(*) FROM evals").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM evals WHERE rowid IN (SELECT rowid FROM evals ORDER BY last_used LIMIT ?)", (excess,)
+            )
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        return f"Cache: {self.hits} hits / {self.hits + self.misses} lookups ({self.hit_rate() * 100:.1f}%)"
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched_locked()
+            self._evict_locked()
+            self._db.close()
@@ -0,0 +1,159 @@
+"""
+Locate PGN text in bot logs and PGN files without reading them into memory.
+
+Files are memory-mapped and scanned forward with compiled byte patterns, so
+the scan runs in C over the mapping and only the text that is parsed gets
+decoded. The PGN starts, in order of preference:
+  1) after a line that starts with 'PGN:' (bot logs);
+  2) at the first PGN tag line '[...]';
+  3) at the first line starting with a move number (e.g. '1.').
+All three are looked for in one forward scan. A file whose first non-blank line is a well-formed tag (``[Name "value"]``)
+is a PGN file and starts there without looking for a marker, so a
+multi-gigabyte dump is not scanned end to end before its first game is read.
+
+``game_ranges`` then yields the byte range of each game lazily, one game ahead
+of the parser. Tag lines inside a ``{...}`` comment do not start a game:
+
+    with open_mapped(path) as buf:
+        for start, end in game_ranges(buf):
+            game = chess.pgn.read_game(io.StringIO(decode(buf, start, end)))
+
+``analysis.extract_pgn_text``, the analyzer's batch reader and the blunder
+test generator all use this module.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import mmap
+import re
+from typing import Iterator, Optional, Tuple, Union
+
+import chess.pgn
+
+Buffer = Union[bytes, mmap.mmap]
+
+# A well-formed tag such as [White "name"] as the first non-blank line
+_LEADING_TAG = re.compile(rb'[ \t\r\n]*(?=\[[A-Za-z0-9_]+[ \t]+"[^\n]*"\][ \t]*\r?$)', re.M)
+_START_KINDS = {
+    "marker": rb"(?P<marker>PGN:[^\n]*(?:\n|$))",
+    "tag": rb"(?P<tag>\[[^\n]*\])",
+    "move": rb"(?P<move>\d+\.)",
+}
+# The first line of any of the kinds a start is still looked for, by those kinds
+_START_LINE = {
+    kinds: re.compile(rb"^[ \t]*(?:" + b"|".join(_START_KINDS[k] for k in kinds) + rb")", re.M)
+    for kinds in (("marker", "tag", "move"), ("marker", "tag"), ("marker",))
+}
+# The next tag line, skipping comments: a brace comment may span lines, a ';' one runs to the end of its line
+_NEXT_TAG = re.compile(rb"(?P<tag>^[ \t]*\[[^\n]*\])|(?P<brace>\{)|;[^\n]*", re.M)
+# A line of movetext (or a comment): anything but a blank line or a tag line
+_CONTENT_LINE = re.compile(rb"^[ \t]*[^\[\s]", re.M)
+_NON_BLANK = re.compile(rb"\S")
+
+
+@contextlib.contextmanager
+def open_mapped(path: str) -> Iterator[Buffer]:
+    """Map ``path`` read-only for the duration of the block (empty files give ``b""``)."""
+    with open(path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            yield b""
+            return
+        try:
+            yield buf
+        finally:
+            buf.close()
+
+
+def pgn_start(buf: Buffer) -> Optional[int]:
+    """Byte offset where the PGN text starts in ``buf``, or None if there is none (see the module docstring)."""
+    m = _LEADING_TAG.match(buf)
+    if m:
+        return m.end()
+    # First tag line and first move line; once one is found, only what beats it is still looked for
+    found = {}
+    pos = 0
+    while True:
+        kinds = ("marker",) if "tag" in found else ("marker", "tag") if "move" in found else ("marker", "tag", "move")
+        m = _START_LINE[kinds].search(buf, pos)
+        if m is None:
+            return found.get("tag", found.get("move"))
+        if m.lastgroup != "marker":
+            found[m.lastgroup] = m.start()
+        elif _NON_BLANK.search(buf, m.end()):
+            return m.end()
+        pos = m.end()
+
+
+def _next_tag_line(buf: Buffer, pos: int) -> Optional[int]:
+    """Offset of the first tag line at or after ``pos`` that is not inside a comment."""
+    while True:
+        m = _NEXT_TAG.search(buf, pos)
+        if m is None:
+            return None
+        if m.lastgroup == "tag":
+            return m.start()
+        pos = m.end()
+        if m.lastgroup == "brace":
+            close = buf.find(b"}", pos)
+            if close < 0:
+                return None
+            pos = close + 1
+
+
+def game_ranges(buf: Buffer, start: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+    """Yield ``(start, end)`` byte ranges of the games from ``start`` (default: ``pgn_start``) on.
+
+    A game ends where a tag line follows its movetext.
+    """
+    if start is None:
+        start = pgn_start(buf)
+        if start is None:
+            return
+    end = len(buf)
+    while start < end:
+        moves = _CONTENT_LINE.search(buf, start)
+        following = _next_tag_line(buf, moves.start()) if moves else None
+        if following is None:
+            if _NON_BLANK.search(buf, start):
+                yield start, end
+            return
+        yield start, following
+        start = following
+
+
+def decode(buf: Buffer, start: int = 0, end: Optional[int] = None) -> str:
+    return buf[start:end].decode("utf-8", errors="replace")
+
+
+def extract_pgn_text(buf: Buffer) -> Optional[str]:
+    """The PGN text of ``buf`` (all of its games), stripped; None if there is none."""
+    start = pgn_start(buf)
+    if start is None:
+        return None
+    return decode(buf, start).strip() or None
+
+
+def read_games(path: str) -> Iterator[Tuple[int, Optional[chess.pgn.Game]]]:
+    """Yield (index, game) for every game of a PGN file or bot log; a single (0, None) if it has no PGN.
+
+    The file stays mapped while the generator runs and each game is decoded
+    and parsed only when it is reached.
+    """
+    with open_mapped(path) as buf:
+        start = pgn_start(buf)
+        if start is None:
+            yield 0, None
+            return
+        index = 0
+        for lo, hi in game_ranges(buf, start):
+            stream = io.StringIO(decode(buf, lo, hi))
+            while True:
+                game = chess.pgn.read_game(stream)
+                if game is None:
+                    break
+                yield index, game
+                index += 1
@@ -0,0 +1,41 @@
+"""
+Position identity shared by everything that stores or collects positions.
+
+Two positions are the same when their EPD is: piece placement, side to move,
+castling rights and an en passant square only if a capture there is legal,
+without the halfmove and fullmove counters. The same position reached in
+another game, later in a game or by a transposition therefore gets the same
+key. Used by the evaluation cache, the blunder case store
+(lichess_bot/blunder_cases.py) and the puzzle tests.
+
+Collections keep one row per key and count duplicates as a weight
+(``count_duplicates``) instead of repeating rows.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List, Tuple, TypeVar, Union
+
+import chess
+
+T = TypeVar("T")
+
+
+def position_key(position: Union[chess.Board, str]) -> str:
+    """EPD of a board or FEN, without move counters and with en passant only when it matters."""
+    board = chess.Board(position) if isinstance(position, str) else position
+    return board.epd()
+
+
+def count_duplicates(items: Iterable[T], key: Callable[[T], str]) -> List[Tuple[T, int]]:
+    """(first item, number of items) per distinct ``key``, in order of first appearance."""
+    first: Dict[str, T] = {}
+    counts: Dict[str, int] = {}
+    for item in items:
+        k = key(item)
+        if k in counts:
+            counts[k] += 1
+        else:
+            first[k] = item
+            counts[k] = 1
+    return [(first[k], n) for k, n in counts.items()]
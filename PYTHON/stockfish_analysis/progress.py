@@ -0,0 +1,123 @@
+"""
+Per-game analysis progress for analyze_chess_game.py.
+
+Each analysed ply is stored as soon as it is known, keyed by the game and by
+the analysis settings (mode, search limit and MultiPV). A later run over the
+same game with the same settings reuses the stored plies and only analyses the
+ones after them: a game log that grew since the last run costs only its new
+plies, and an interrupted run picks up at the last completed ply.
+
+Stored plies also record the position and move, and are only reused while
+they match the game being analysed, so a different game that happens to share
+a key is analysed from the first ply that differs.
+
+Like the evaluation cache, the store is a SQLite database in WAL mode and can
+be shared by several analyzer processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import List
+
+import chess
+import chess.engine
+import chess.pgn
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plies (
+    game     TEXT    NOT NULL,
+    settings TEXT    NOT NULL,
+    ply      INTEGER NOT NULL,
+    fen      TEXT    NOT NULL,  -- position before the move
+    uci      TEXT    NOT NULL,
+    result   TEXT    NOT NULL,  -- PlyResult fields as JSON
+    saved    REAL    NOT NULL,
+    PRIMARY KEY (game, settings, ply)
+);
+"""
+
+# Tags that identify a game when it has no Site URL (bot logs and lichess exports have one)
+_IDENTITY_TAGS = ("Event", "Site", "Date", "Round", "White", "Black", "FEN")
+
+
+def game_key(game: chess.pgn.Game) -> str:
+    """Stable identity of a game that does not change as moves are added to it."""
+    site = game.headers.get("Site", "")
+    if site.startswith(("http://", "https://")):
+        return site
+    tags = "\n".join(f"{t}={game.headers.get(t, '')}" for t in _IDENTITY_TAGS)
+    return "tags:" + hashlib.sha1(tags.encode("utf-8")).hexdigest()
+
+
+def settings_key(mode: str, limit: chess.engine.Limit, multipv: int) -> str:
+    """E.g. ``"reuse time=0.2 multipv=2"``; results are only reused under identical settings."""
+    parts = [mode]
+    for name in ("depth", "time", "nodes"):
+        value = getattr(limit, name)
+        if value is not None:
+            parts.append(f"{name}={value:g}")
+    parts.append(f"multipv={multipv}")
+    return " ".join(parts)
+
+
+class ProgressStore:
+    """Thread-safe SQLite store of analysed plies per game and settings."""
+
+    def __init__(self, path: str, busy_timeout: float = 30.0):
+        self.path = path
+        self.reused = 0
+        self.saved = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def load(self, game: str, settings: str) -> List[dict]:
+        """Stored results for a game in ply order, each with ``ply``, ``fen`` and ``uci`` keys."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT result FROM plies WHERE game=? AND settings=? ORDER BY ply", (game, settings)
+            ).fetchall()
+        return [json.loads(text) for (text,) in rows]
+
+    def save(self, game: str, settings: str, result: dict) -> None:
+        """Store one ply's result (a dict with at least ``ply``, ``fen`` and ``uci``)."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO plies (game, settings, ply, fen, uci, result, saved) VALUES (?,?,?,?,?,?,?)",
+                (game, settings, result["ply"], result["fen"], result["uci"], json.dumps(result), time.time()),
+            )
+            self.saved += 1
+
+    def discard(self, game: str, settings: str, from_ply: int) -> None:
+        """Forget plies from ``from_ply`` on, e.g. when the game no longer matches them."""
+        with self._lock:
+            self._db.execute("DELETE FROM plies WHERE game=? AND settings=? AND ply>=?", (game, settings, from_ply))
+
+    def summary(self) -> str:
+        return f"Progress: {self.reused} plies reused, {self.saved} analysed and saved"
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def matching_prefix(stored: List[dict], board: chess.Board, moves) -> int:
+    """Number of leading plies of ``moves`` (played from ``board``) that ``stored`` covers.
+
+    ``board`` is not modified.
+    """
+    board = board.copy()
+    n = 0
+    for item, move in zip(stored, moves):
+        if item["ply"] != n + 1 or item["uci"] != move.uci() or item["fen"] != board.fen():
+            break
+        board.push(move)
+        n += 1
+    return n
@@ -0,0 +1,161 @@
+"""
+Opening book and endgame tablebase shortcuts for analyze_chess_game.py.
+
+Plies that a local Polyglot book or Syzygy tablebases already answer are
+classified without asking the engine:
+
+- Book: the leading plies of a game whose played move is in the book are
+  classified ``"Book"``, with the book's most played move as the suggestion
+  and no evals. The book phase ends at the first move that is not in it.
+- Tablebase: once a position is covered by the tablebases, every later one is
+  too (pieces only come off), so the trailing plies of a game are classified
+  from the exact outcome. Every legal move is probed; the best keeps the best
+  outcome, winning fastest (lowest DTZ) or losing slowest. A move that gives
+  up a win or a draw is a ``"Blunder"``, any other move is ``"Best"``. Evals
+  are the outcome as +/-``TB_WIN_CP`` or 0, and a blunder loses
+  ``TB_LOSS_CP``. Wins and losses that the 50-move rule turns into draws
+  count as draws: cursed wins and blessed losses, and wins whose DTZ no
+  longer fits in what is left of the game's halfmove clock.
+
+The plies in between are analysed by the engine as usual. Both sources are
+optional and probed on the caller's thread; probes are serialized, so one
+``Shortcuts`` can serve concurrent analyses (e.g. the daemon's jobs).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import chess
+import chess.polyglot
+import chess.syzygy
+
+BOOK = "Book"
+# A tablebase win in centipawns, on the same scale as a mate in stats.py
+TB_WIN_CP = 10_000
+# The cp_loss of a tablebase blunder: the cap stats.py puts on any loss (LOSS_CAP)
+TB_LOSS_CP = 1000
+
+
+def _outcome(wdl: int, dtz: int, halfmove_clock: int) -> int:
+    """Practical result (1, 0, -1) of a WDL/DTZ pair for the side to move.
+
+    A win or loss whose DTZ runs the halfmove clock past 100 plies is a draw
+    under the 50-move rule.
+    """
+    if abs(dtz) + halfmove_clock > 100:
+        return 0
+    return 1 if wdl == 2 else -1 if wdl == -2 else 0
+
+
+class Shortcuts:
+    """A Polyglot book (``book_path``) and/or Syzygy tablebases (``syzygy_dirs``) consulted before the engine.
+
+    ``book_plies`` and ``tablebase_plies`` count the plies answered so far and
+    ``calls_saved`` the engine calls they would have cost. Raises ``OSError``
+    if the book cannot be opened and ``ValueError`` if the directories hold no
+    tables.
+    """
+
+    def __init__(self, book_path: Optional[str] = None, syzygy_dirs: Sequence[str] = ()):
+        self.book = chess.polyglot.open_reader(book_path) if book_path else None
+        self.tablebase: Optional[chess.syzygy.Tablebase] = None
+        if syzygy_dirs:
+            tablebase = chess.syzygy.Tablebase()
+            found = sum(tablebase.add_directory(d) for d in syzygy_dirs)
+            if not found:
+                tablebase.close()
+                raise ValueError(f"No Syzygy tables found in {os.pathsep.join(syzygy_dirs)}")
+            self.tablebase = tablebase
+        self.book_plies = 0
+        self.tablebase_plies = 0
+        self.calls_saved = 0
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> str:
+        """E.g. ``"+book+syzygy"``; appended to the analysis mode so stored progress is not mixed up."""
+        return ("+book" if self.book is not None else "") + ("+syzygy" if self.tablebase is not None else "")
+
+    def book_line(self, board: chess.Board, moves) -> List[chess.Move]:
+        """The book's most played move for each leading ply of ``moves`` that was played from the book."""
+        if self.book is None:
+            return []
+        board = board.copy()
+        line = []
+        with self._lock:
+            for move in moves:
+                entries = list(self.book.find_all(board))
+                if not any(entry.move == move for entry in entries):
+                    break
+                line.append(max(entries, key=lambda entry: entry.weight).move)
+                board.push(move)
+        return line
+
+    def tablebase_line(self, board: chess.Board, moves, stop: int = 0) -> List[Tuple[int, int, chess.Move]]:
+        """(played outcome, best outcome, best move) for the trailing plies of ``moves`` in the tablebases.
+
+        Outcomes are 1, 0 or -1 for the mover, counting the halfmove clock of
+        ``board`` toward the 50-move rule. Plies before ``moves[stop]`` are not
+        probed.
+        """
+        if self.tablebase is None:
+            return []
+        boards = []
+        board = board.copy()
+        for move in moves:
+            boards.append(board.copy(stack=False))
+            board.push(move)
+        line = []
+        with self._lock:
+            for i in range(len(moves) - 1, stop - 1, -1):
+                probed = self._probe_ply(boards[i], moves[i])
+                if probed is None:
+                    break
+                line.append(probed)
+        line.reverse()
+        return line
+
+    def _probe_ply(self, before: chess.Board, played: chess.Move) -> Optional[Tuple[int, int, chess.Move]]:
+        if chess.popcount(before.occupied) > chess.syzygy.TBPIECES or before.castling_rights:
+            return None
+        ranked = []
+        for move in before.legal_moves:
+            after = before.copy(stack=False)
+            after.push(move)
+            if after.is_checkmate():
+                outcome, dtz = 1, 0
+            elif after.is_game_over():
+                outcome, dtz = 0, 0
+            else:
+                wdl = self.tablebase.get_wdl(after)
+                dtz = self.tablebase.get_dtz(after)
+                if wdl is None or dtz is None:
+                    return None
+                outcome = -_outcome(wdl, dtz, after.halfmove_clock)
+            # Higher is better: win fastest, lose slowest; the played move wins ties
+            ranked.append(((outcome, -abs(dtz) if outcome > 0 else abs(dtz) if outcome < 0 else 0, move == played),
+                           outcome, move))
+        if not ranked:
+            return None
+        _, best_outcome, best_move = max(ranked, key=lambda item: item[0])
+        played_outcome = next(outcome for _, outcome, move in ranked if move == played)
+        return played_outcome, best_outcome, best_move
+
+    def count(self, book: int = 0, tablebase: int = 0, calls_per_ply: int = 1) -> None:
+        with self._lock:
+            self.book_plies += book
+            self.tablebase_plies += tablebase
+            self.calls_saved += (book + tablebase) * calls_per_ply
+
+    def summary(self) -> str:
+        return (f"Shortcuts: {self.book_plies} book plies, {self.tablebase_plies} tablebase plies "
+                f"(about {self.calls_saved} engine calls saved)")
+
+    def close(self) -> None:
+        if self.book is not None:
+            self.book.close()
+        if self.tablebase is not None:
+            self.tablebase.close()
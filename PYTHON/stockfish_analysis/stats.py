@@ -0,0 +1,127 @@
+"""
+Per-player move statistics: average centipawn loss (ACPL), accuracy and class counts.
+
+Everything is computed on NumPy arrays of plies, so one game and tens of
+thousands of batched games go through the same code.
+
+- Evals are (cp, mate) pairs from the mover's POV as in ``PlyResult``. A mate
+  counts as +/-``MATE_CP`` (mate 0, i.e. the move delivered mate, as a win).
+- The loss of a move is best minus played, at least 0 and capped at
+  ``LOSS_CAP`` like lichess, so one missed mate does not swamp the average.
+- Accuracy uses lichess's formulas: evals become win percentages
+  (``win_percent``) and a move's accuracy falls exponentially with the win
+  percentage it gives away. A player's accuracy is the plain mean over their
+  moves (lichess additionally weights moves by position volatility).
+
+Plies with an unknown eval (including book moves) count towards the class
+counts but not the averages.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+CLASSES = ("Best", "Excellent", "Good", "Inaccuracy", "Mistake", "Blunder", "Book", "Unknown")
+_CLASS_INDEX = {name: i for i, name in enumerate(CLASSES)}
+MATE_CP = 10_000
+LOSS_CAP = 1000
+# Evals beyond this make no difference to the win percentage
+WIN_CP_CAP = 1000
+
+
+def centipawns(cp, mate) -> np.ndarray:
+    """Centipawn equivalents of (cp, mate) sequences; None becomes NaN."""
+    cp = np.array(cp, dtype=float)
+    mate = np.array(mate, dtype=float)
+    return np.where(np.isnan(mate), cp, np.where(mate >= 0, MATE_CP, -MATE_CP))
+
+
+def win_percent(cp: np.ndarray) -> np.ndarray:
+    cp = np.clip(cp, -WIN_CP_CAP, WIN_CP_CAP)
+    return 50 + 50 * (2 / (1 + np.exp(-0.00368208 * cp)) - 1)
+
+
+def move_scores(best_cp, best_mate, played_cp, played_mate) -> Tuple[np.ndarray, np.ndarray]:
+    """(loss, accuracy) per ply; NaN where an eval is unknown."""
+    best = centipawns(best_cp, best_mate)
+    played = centipawns(played_cp, played_mate)
+    loss = np.clip(best - played, 0, LOSS_CAP)
+    drop = np.maximum(win_percent(best) - win_percent(played), 0)
+    accuracy = np.clip(103.1668 * np.exp(-0.04354 * drop) - 3.1669, 0, 100)
+    return loss, accuracy
+
+
+def class_indices(classifications: Iterable[str]) -> np.ndarray:
+    unknown = _CLASS_INDEX["Unknown"]
+    return np.array([_CLASS_INDEX.get(c, unknown) for c in classifications], dtype=np.int64)
+
+
+@dataclass
+class PlayerStats:
+    games: int
+    moves: int
+    acpl: Optional[float]
+    accuracy: Optional[float]
+    classes: Dict[str, int] = field(default_factory=dict)
+
+    def describe(self) -> str:
+        acpl = f"{self.acpl:.1f}" if self.acpl is not None else "?"
+        accuracy = f"{self.accuracy:.1f}%" if self.accuracy is not None else "?"
+        counts = ", ".join(f"{name} {self.classes[name]}" for name in CLASSES if self.classes.get(name))
+        return f"ACPL {acpl}, accuracy {accuracy} over {self.moves} moves ({counts or 'none'})"
+
+    def to_dict(self) -> dict:
+        out = asdict(self)
+        for key in ("acpl", "accuracy"):
+            if out[key] is not None:
+                out[key] = round(out[key], 2)
+        return out
+
+
+def _mean(total: np.ndarray, count: np.ndarray, i: int) -> Optional[float]:
+    return float(total[i] / count[i]) if count[i] else None
+
+
+def aggregate(keys: np.ndarray, n_keys: int, games: np.ndarray, loss: np.ndarray, accuracy: np.ndarray,
+              classes: np.ndarray) -> List[PlayerStats]:
+    """Statistics per key (0..n_keys-1) of plies labelled with ``keys`` and the game each belongs to."""
+    keys = np.asarray(keys, dtype=np.int64)
+    games = np.asarray(games, dtype=np.int64)
+    moves = np.bincount(keys, minlength=n_keys)
+    known = ~np.isnan(loss)
+    loss_sum = np.bincount(keys[known], weights=loss[known], minlength=n_keys)
+    loss_n = np.bincount(keys[known], minlength=n_keys)
+    known = ~np.isnan(accuracy)
+    acc_sum = np.bincount(keys[known], weights=accuracy[known], minlength=n_keys)
+    acc_n = np.bincount(keys[known], minlength=n_keys)
+    n_classes = len(CLASSES)
+    counts = np.bincount(keys * n_classes + classes, minlength=n_keys * n_classes).reshape(n_keys, n_classes)
+    stride = int(games.max()) + 1 if games.size else 1
+    pairs = np.unique(keys * stride + games)
+    game_counts = np.bincount(pairs // stride, minlength=n_keys)
+    return [
+        PlayerStats(
+            games=int(game_counts[i]),
+            moves=int(moves[i]),
+            acpl=_mean(loss_sum, loss_n, i),
+            accuracy=_mean(acc_sum, acc_n, i),
+            classes={name: int(counts[i, c]) for c, name in enumerate(CLASSES)},
+        )
+        for i in range(n_keys)
+    ]
+
+
+def summarize_game(results) -> Dict[str, PlayerStats]:
+    """Statistics per side ("W", "B") of one game's ``PlyResult`` records (or their dicts)."""
+    rows = [r if isinstance(r, dict) else asdict(r) for r in results]
+    loss, accuracy = move_scores(
+        [r["best_cp"] for r in rows], [r["best_mate"] for r in rows],
+        [r["played_cp"] for r in rows], [r["played_mate"] for r in rows],
+    )
+    keys = np.array([0 if r["side"] == "W" else 1 for r in rows], dtype=np.int64)
+    stats = aggregate(keys, 2, np.zeros(len(rows), dtype=np.int64), loss, accuracy,
+                      class_indices(r["classification"] for r in rows))
+    return {"W": stats[0], "B": stats[1]}
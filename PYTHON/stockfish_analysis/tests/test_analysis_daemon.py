@@ -0,0 +1,66 @@
+import sys
+import threading
+from pathlib import Path
+
+import chess
+import chess.engine
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import analysis  # noqa: E402
+from analysis_daemon import AnalysisServer, DaemonClient  # noqa: E402
+from test_analyze_chess_game import GAME, FakeEngine  # noqa: E402
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    engines = [FakeEngine(), FakeEngine()]
+    server = AnalysisServer(str(tmp_path / "analysis.sock"), analysis.EnginePool(engines, chess.engine.Limit(time=0.1), 2))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_daemon_streams_the_same_results_as_local_analysis(daemon):
+    expected = list(analysis.analyze_pgn(GAME, FakeEngine(), chess.engine.Limit(depth=8), reuse=True))
+    client = DaemonClient(daemon.server_address)
+    results = client.analyze_pgn(GAME, limit=chess.engine.Limit(depth=8), reuse=True)
+    assert next(results) == expected[0]
+    assert [expected[0], *results] == expected
+    assert client.calls == len(expected)
+
+    # Engines stay up between jobs; several jobs can run at once
+    outputs = []
+    jobs = [threading.Thread(target=lambda: outputs.append(list(client.analyze_pgn(GAME, reuse=True))))
+            for _ in range(3)]
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join()
+    assert [len(out) for out in outputs] == [14, 14, 14]
+    assert daemon.jobs_done == 4 and daemon.engine_calls == 4 * 14
+
+
+def test_daemon_reports_failed_jobs(daemon):
+    with pytest.raises(RuntimeError, match="No PGN game found"):
+        list(DaemonClient(daemon.server_address).analyze_pgn("no game here"))
+
+
+def test_client_fails_fast_without_a_daemon(tmp_path):
+    with pytest.raises(OSError):
+        DaemonClient(str(tmp_path / "missing.sock")).analyze_pgn(GAME)
+
+
+def test_stale_socket_is_replaced_but_a_live_one_is_not(tmp_path, daemon):
+    with pytest.raises(RuntimeError, match="already listening"):
+        AnalysisServer(daemon.server_address, daemon.pool)
+    stale = tmp_path / "stale.sock"
+    stale.touch()
+    server = AnalysisServer(str(stale), daemon.pool)
+    server.server_close()
+    assert not stale.exists()
@@ -0,0 +1,227 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+import chess
+import chess.engine
+import chess.pgn
+
+# Allow importing the script from its folder when running pytest from anywhere
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import analysis  # noqa: E402
+import analyze_chess_game as acg  # noqa: E402
+
+PIECE_CP = {chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 300, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+
+GAME = "1. e4 e5 2. Nf3 Nc6 3. Bc4 Nd4 4. Nxe5 Qg5 5. Nxf7 Qxg2 6. Rf1 Qxe4+ 7. Be2 Nf3# *"
+
+
+class FakeEngine:
+    """Scores every move by material after it; records how it was called."""
+
+    def __init__(self):
+        self.searches = []
+
+    def _material(self, board: chess.Board, color: bool) -> int:
+        return sum(PIECE_CP[p.piece_type] * (1 if p.color == color else -1) for p in board.piece_map().values())
+
+    def analyse(self, board, limit, multipv=1, root_moves=None):
+        self.searches.append((board.fen(), root_moves))
+        if board.is_game_over():
+            return [{"score": analysis._terminal_score(board)}]
+        scored = []
+        for move in root_moves or board.legal_moves:
+            board.push(move)
+            if board.is_checkmate():
+                score = chess.engine.Mate(1)
+            else:
+                score = chess.engine.Cp(self._material(board, not board.turn))
+            board.pop()
+            scored.append({"score": chess.engine.PovScore(score, board.turn), "pv": [move]})
+        scored.sort(key=lambda info: info["score"].relative, reverse=True)
+        return scored[:multipv]
+
+    def play(self, board, limit):  # pragma: no cover - PVs are always present
+        raise AssertionError("play() should not be needed")
+
+
+def _moves(pgn: str):
+    return list(chess.pgn.read_game(io.StringIO(pgn)).mainline_moves())
+
+
+def test_reuse_mode_needs_one_search_per_ply():
+    moves = _moves(GAME)
+    analyser = analysis.EnginePool(FakeEngine(), chess.engine.Limit(time=0.1), multipv=2)
+    rows = [analysis.format_row(r) for r in analysis.analyze_reusing(analyser, chess.Board(), moves)]
+    assert len(rows) == len(moves)
+    assert analyser.calls == len(moves)
+    # Mating move is found in the root MultiPV lines
+    assert rows[-1].split()[2:5] == ["Nf3#", "M+1", "M+1"]
+
+
+def test_reuse_mode_restricts_last_search_to_played_move():
+    moves = _moves("1. e4 d5 2. a3 *")  # 2. a3 leaves the pawn hanging and is not in the top line
+    engine = FakeEngine()
+    analyser = analysis.EnginePool(engine, chess.engine.Limit(time=0.1), multipv=1)
+    results = list(analysis.analyze_reusing(analyser, chess.Board(), moves))
+    assert analyser.calls == len(moves) + 1
+    assert engine.searches[-1][1] == [moves[-1]]
+    assert results[-1].best_san == "exd5"
+
+
+def test_full_mode_searches_three_times_per_ply():
+    moves = _moves(GAME)
+    analyser = analysis.EnginePool(FakeEngine(), chess.engine.Limit(time=0.1), multipv=2)
+    results = list(analysis.analyze_full(analyser, chess.Board(), moves))
+    assert analyser.calls == 3 * len(moves)
+    assert [r.ply for r in results] == list(range(1, len(moves) + 1))
+
+
+def test_classify_move():
+    assert analysis.classify_move(50, None, -260, None) == (310, "Blunder")
+    assert analysis.classify_move(20, None, 5, None) == (15, "Excellent")
+    # Delivering mate is reported by engines as mate 0 for the mover
+    assert analysis.classify_move(None, 1, None, 0) == (None, "Best")
+    assert analysis.classify_move(None, 2, 300, None) == (None, "Blunder")
+
+
+def test_several_engines_give_the_same_results_in_ply_order():
+    moves = _moves(GAME)
+    for analyze in (analysis.analyze_full, analysis.analyze_reusing):
+        serial = list(analyze(analysis.EnginePool(FakeEngine(), chess.engine.Limit(time=0.1), multipv=2), chess.Board(), moves))
+        engines = [FakeEngine() for _ in range(3)]
+        analyser = analysis.EnginePool(engines, chess.engine.Limit(time=0.1), multipv=2)
+        assert list(analyze(analyser, chess.Board(), moves)) == serial
+        assert sum(len(e.searches) for e in engines) == analyser.calls
+        assert all(e.searches for e in engines)
+
+
+def test_batch_reads_multi_game_pgn_and_resumes(tmp_path, monkeypatch, capsys):
+    (tmp_path / "two.pgn").write_text(f"[White \"A\"]\n\n{GAME}\n\n[White \"C\"]\n\n1. e4 d5 2. a3 *\n")
+    logs = tmp_path / "past_games"
+    logs.mkdir()
+    (logs / "lichess_bot_game_x.log").write_text("Date: today\n\nPGN:\n1. d4 d5 *\n")
+    out = tmp_path / "results.jsonl"
+    args = acg.argparse.Namespace(
+        files=[str(tmp_path / "*.pgn"), str(logs)], out=str(out), resume=True, reuse=True, last_move_only=False, budget=None
+    )
+    analyser = analysis.EnginePool(FakeEngine(), chess.engine.Limit(time=0.1), multipv=2)
+
+    assert acg.run_batch(args, analyser) == 0
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["game"].rsplit("/", 1)[-1] for r in records] == ["two.pgn#0", "two.pgn#1", "lichess_bot_game_x.log#0"]
+    assert [len(r["plies"]) for r in records] == [14, 3, 2]
+    assert records[1]["headers"]["White"] == "C"
+    assert records[0]["summary"]["W"]["moves"] == 7 and records[0]["summary"]["B"]["moves"] == 7
+
+    # Second run skips everything already in the results file
+    assert acg.run_batch(args, analyser) == 0
+    assert len(out.read_text().splitlines()) == 3
+    assert "0 games analysed, 3 skipped" in capsys.readouterr().out
+
+
+class CrashingEngine(FakeEngine):
+    """Dies on any position after 1. d4."""
+
+    def analyse(self, board, limit, multipv=1, root_moves=None):
+        if board.move_stack and board.move_stack[0] == chess.Move.from_uci("d2d4"):
+            raise chess.engine.EngineTerminatedError("engine process died unexpectedly")
+        return super().analyse(board, limit, multipv=multipv, root_moves=root_moves)
+
+
+def test_batch_records_a_failing_game_and_continues(tmp_path, capsys):
+    (tmp_path / "three.pgn").write_text(f"{GAME}\n\n1. d4 d5 *\n\n1. e4 d5 2. a3 *\n")
+    out = tmp_path / "results.jsonl"
+    args = acg.argparse.Namespace(
+        files=[str(tmp_path / "three.pgn")], out=str(out), resume=True, reuse=True, last_move_only=False, budget=None
+    )
+    analyser = analysis.EnginePool(CrashingEngine(), chess.engine.Limit(time=0.1), multipv=2)
+
+    assert acg.run_batch(args, analyser) == 5
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [len(r.get("plies", [])) for r in records] == [14, 0, 3]
+    assert records[1]["error"].startswith("EngineTerminatedError")
+    assert "2 games analysed, 0 skipped, 1 failed" in capsys.readouterr().out
+
+    # The failed game was written, so a resumed run does not retry it
+    assert acg.run_batch(args, analyser) == 0
+    assert len(out.read_text().splitlines()) == 3
+
+
+def test_cached_rerun_makes_no_engine_calls(tmp_path):
+    moves = _moves(GAME)
+    cache = acg.EvalCache(str(tmp_path / "evals.sqlite"))
+    first = analysis.EnginePool(FakeEngine(), chess.engine.Limit(depth=12), multipv=2, cache=cache)
+    expected = list(analysis.analyze_reusing(first, chess.Board(), moves))
+    again = analysis.EnginePool(FakeEngine(), chess.engine.Limit(depth=10), multipv=2, cache=cache)
+    assert list(analysis.analyze_reusing(again, chess.Board(), moves)) == expected
+    assert again.calls == 0 and cache.hits == len(moves)
+    cache.close()
+
+
+def test_library_api_streams_typed_results_from_a_log():
+    log = "Date: 2025-01-01\nPlayers: A vs B\n\nPGN:\n" + GAME + "\n"
+    results = analysis.analyze_pgn(log, FakeEngine(), chess.engine.Limit(depth=8), reuse=True)
+    first = next(results)
+    assert (first.ply, first.side, first.san) == (1, "W", "e4")
+    assert first.pv and first.best_uci == first.pv[0]
+    last = list(results)[-1]
+    assert (last.san, last.classification, last.best_uci) == ("Nf3#", "Best", "d4f3")
+
+
+def test_machine_readable_writers_stream_one_record_per_ply():
+    moves = _moves("1. e4 d5 2. a3 *")
+    results = list(analysis.analyze_reusing(analysis.EnginePool(FakeEngine(), chess.engine.Limit(depth=8), 2),
+                                            chess.Board(), moves))
+    outputs = {}
+    for fmt, writer_cls in acg.WRITERS.items():
+        out = io.StringIO()
+        writer = writer_cls(out)
+        writer.write(results[0])
+        if fmt == "jsonl":
+            assert json.loads(out.getvalue())["uci"] == "e2e4"  # available before the game is done
+        for r in results[1:]:
+            writer.write(r)
+        writer.close()
+        outputs[fmt] = out.getvalue()
+
+    records = json.loads(outputs["json"])
+    assert records == [json.loads(line) for line in outputs["jsonl"].splitlines()]
+    assert records[2]["fen"] == "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2"
+    assert records[2]["best_uci"] == "e4d5" and records[2]["best_san"] == "exd5"
+    rows = list(acg.csv.DictReader(io.StringIO(outputs["csv"])))
+    assert [row["san"] for row in rows] == ["e4", "d5", "a3"]
+    assert rows[2]["pv"] == " ".join(records[2]["pv"])
+    assert len(outputs["text"].splitlines()) == 3
+
+
+def test_adaptive_mode_spends_the_rest_of_the_budget_on_critical_plies():
+    moves = _moves("1. e4 d5 2. a3 dxe4 3. Nc3 *")  # 2. a3 drops a pawn
+    engine = FakeEngine()
+    limits = []
+    original = engine.analyse
+    engine.analyse = lambda board, limit, **kw: limits.append(limit.time) or original(board, limit, **kw)
+    report = analysis.AdaptiveReport()
+    results = list(analysis.analyze_adaptive(analysis.EnginePool(engine, chess.engine.Limit(depth=1), 2),
+                                             chess.Board(), moves, 10.0, report=report))
+
+    assert [r.ply for r in results] == [1, 2, 3, 4, 5]
+    assert results[2].classification in analysis.CRITICAL_CLASSES
+    assert report.critical_by_loss >= 1 and report.deep_searches >= 1
+    assert report.shallow_searches >= len(moves)  # plus a restricted search of the last move
+    shallow, deep = limits[: report.shallow_searches], limits[report.shallow_searches:]
+    assert set(shallow) == {report.shallow_time_per_search} and report.shallow_time_per_search == 10.0 * 0.3 / 5
+    assert set(deep) == {report.deep_time_per_search} and report.deep_time_per_search > 1.0
+    assert "Budget: 10.0s" in report.summary()
+
+
+def test_unstable_search_history():
+    cp, mate = chess.engine.Cp, chess.engine.Mate
+    assert not analysis._is_unstable([cp(20)])
+    assert not analysis._is_unstable([cp(-300), cp(20), cp(45)])
+    assert analysis._is_unstable([cp(20), cp(120)])
+    assert analysis._is_unstable([cp(400), mate(5)])
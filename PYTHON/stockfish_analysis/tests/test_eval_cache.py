@@ -0,0 +1,152 @@
+import contextlib
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import chess
+import chess.engine
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import analysis  # noqa: E402
+import eval_cache  # noqa: E402
+from eval_cache import EvalCache  # noqa: E402
+
+
+def _lines(board, depth, cp=35, mate=None):
+    score = chess.engine.Mate(mate) if mate is not None else chess.engine.Cp(cp)
+    move = next(iter(board.legal_moves))
+    return [{"score": chess.engine.PovScore(score, board.turn), "pv": [move], "depth": depth}]
+
+
+def test_deeper_entry_serves_shallower_request(tmp_path):
+    cache = EvalCache(str(tmp_path / "evals.sqlite"))
+    board = chess.Board()
+    board.push_san("e4")
+    cache.put(board, chess.engine.Limit(depth=18), 2, _lines(board, 18, cp=-30))
+
+    assert cache.get(board, chess.engine.Limit(depth=20), 1) is None
+    hit = cache.get(board, chess.engine.Limit(depth=12), 1)
+    assert hit[0]["score"].white() == chess.engine.Cp(30)
+    assert hit[0]["pv"] == _lines(board, 18)[0]["pv"]
+    # Requests for more lines than stored are misses
+    assert cache.get(board, chess.engine.Limit(depth=12), 3) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    cache.close()
+
+
+def test_time_limited_entries_and_transpositions(tmp_path):
+    path = str(tmp_path / "evals.sqlite")
+    cache = EvalCache(path)
+    a = chess.Board()
+    for san in ("Nf3", "Nf6", "Nc3", "Nc6"):
+        a.push_san(san)
+    cache.put(a, chess.engine.Limit(time=0.5), 1, _lines(a, 22, mate=3))
+    cache.close()
+
+    # Same position reached by another move order, with other counters, in a new process/connection
+    b = chess.Board()
+    for san in ("Nc3", "Nc6", "Nf3", "Nf6"):
+        b.push_san(san)
+    cache = EvalCache(path)
+    assert cache.get(b, chess.engine.Limit(time=1.0), 1) is None
+    assert cache.get(b, chess.engine.Limit(time=0.2), 1)[0]["score"].relative == chess.engine.Mate(3)
+    # A time-limited search that reached depth 22 also serves depth requests up to 22
+    assert cache.get(b, chess.engine.Limit(depth=22), 1) is not None
+    cache.close()
+
+
+def test_eviction_keeps_recently_used_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(eval_cache, "EVICT_EVERY", 1)
+    cache = EvalCache(str(tmp_path / "evals.sqlite"), max_entries=3)
+    limit = chess.engine.Limit(depth=10)
+    boards = []
+    board = chess.Board()
+    for san in ("e4", "e5", "Nf3", "Nc6", "Bb5"):
+        board.push_san(san)
+        boards.append(board.copy())
+        cache.put(boards[-1], limit, 1, _lines(boards[-1], 10))
+        if len(boards) == 3:
+            assert cache.get(boards[0], limit, 1)  # a hit refreshes the entry
+    present = [cache.get(b, limit, 1) is not None for b in boards]
+    assert present == [True, False, False, True, True]
+    cache.close()
+
+
+def test_hits_do_not_write_until_the_next_put_or_close(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(eval_cache.time, "time", lambda: now[0])
+    path = str(tmp_path / "evals.sqlite")
+    cache = EvalCache(path)
+    limit = chess.engine.Limit(depth=10)
+    board = chess.Board()
+    cache.put(board, limit, 1, _lines(board, 10))
+
+    def last_used():
+        return sqlite3.connect(path).execute("SELECT last_used FROM evals").fetchone()[0]
+
+    now[0] = 2000.0
+    changes = cache._db.total_changes
+    assert cache.get(board, limit, 1) and cache.get(board, limit, 1)
+    assert cache._db.total_changes == changes and last_used() == 1000.0
+    cache.close()
+    assert last_used() == 2000.0
+
+
+class HistoryEngine:
+    """Reports the best line at depths 1 and 2 through ``analysis``, like a UCI engine."""
+
+    def __init__(self):
+        self.searches = 0
+
+    @contextlib.contextmanager
+    def analysis(self, board, limit, multipv=1, root_moves=None):
+        self.searches += 1
+        infos = [{"multipv": 1, "depth": d, **_lines(board, d, cp=cp)[0]} for d, cp in ((1, 20), (2, 150))]
+        result = type("Analysis", (list,), {"multipv": infos[-1:]})(infos)
+        yield result
+
+
+def test_pool_takes_the_search_history_from_the_cache(tmp_path):
+    engine = HistoryEngine()
+    cache = EvalCache(str(tmp_path / "evals.sqlite"))
+    pool = analysis.EnginePool(engine, chess.engine.Limit(time=0.1), multipv=1, cache=cache)
+    board = chess.Board()
+    first, second = [], []
+    pool.lines(board, history=first)
+    pool.lines(board, history=second)
+    assert engine.searches == 1
+    assert second == first == [chess.engine.Cp(20), chess.engine.Cp(150)]
+    assert analysis._is_unstable(second)  # adaptive analysis still re-searches cached positions
+
+    # An entry stored without its history does not serve a request for it
+    board.push_san("e4")
+    cache.put(board, chess.engine.Limit(time=0.1), 1, _lines(board, 2))
+    assert cache.get(board, chess.engine.Limit(time=0.1), 1) is not None
+    history = []
+    pool.lines(board, history=history)
+    assert engine.searches == 2 and len(history) == 2
+    cache.close()
+
+
+def test_concurrent_writers(tmp_path):
+    path = str(tmp_path / "evals.sqlite")
+    caches = [EvalCache(path) for _ in range(4)]
+    board = chess.Board()
+
+    def work(cache, depth):
+        for d in range(depth, depth + 20):
+            cache.put(board, chess.engine.Limit(depth=d), 1, _lines(board, d))
+            cache.get(board, chess.engine.Limit(depth=d), 1)
+
+    threads = [threading.Thread(target=work, args=(c, i * 20)) for i, c in enumerate(caches)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert caches[0].get(board, chess.engine.Limit(depth=79), 1)[0]["depth"] == 79
+    for c in caches:
+        c.close()
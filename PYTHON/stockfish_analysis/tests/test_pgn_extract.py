@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pgn_extract  # noqa: E402
+from analysis import extract_pgn_text  # noqa: E402
+
+LOG = (
+    b"game abcd started\n[not a tag line] but bracketed\n"
+    b"Columns: ply  side  move\n  1  W   e4\n\n"
+    b"PGN:\n[White \"A\"]\n[Black \"B\"]\n\n1. e4 e5 *\n"
+)
+DUMP = (
+    b'[Event "one"]\n[White "A"]\n\n1. e4 e5\n2. Nf3 *\n\n'
+    b'[Event "two"]\n\n1. d4 { a comment } d5 *\n\n'
+    b'[Event "three"]\n[White "C"]\n\n1. c4 *\n'
+)
+
+
+def test_pgn_start_prefers_the_marker_then_tags_then_move_numbers():
+    assert LOG[pgn_extract.pgn_start(LOG):].startswith(b'[White "A"]')
+    assert pgn_extract.pgn_start(DUMP) == 0
+    assert pgn_extract.pgn_start(b"noise\nmore\n1. e4 *\n") == len(b"noise\nmore\n")
+    assert pgn_extract.pgn_start(b"PGN:\n   \n") is None
+    assert pgn_extract.pgn_start(b"") is None
+    assert extract_pgn_text(LOG.decode()) == '[White "A"]\n[Black "B"]\n\n1. e4 e5 *'
+
+
+def test_pgn_start_keeps_looking_for_what_beats_the_start_found_so_far():
+    assert pgn_extract.pgn_start(b"1. noise\n[Tag]\n2. e4\n") == len(b"1. noise\n")
+    assert pgn_extract.pgn_start(b"[x]\n1. e4\nPGN:\n1. d4 *\n") == len(b"[x]\n1. e4\nPGN:\n")
+
+
+def test_game_ranges_split_multi_game_files():
+    ranges = list(pgn_extract.game_ranges(DUMP))
+    texts = [pgn_extract.decode(DUMP, lo, hi) for lo, hi in ranges]
+    assert [t.split("\n", 1)[0] for t in texts] == ['[Event "one"]', '[Event "two"]', '[Event "three"]']
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(DUMP)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert list(pgn_extract.game_ranges(b"1. e4 e5 *\n")) == [(0, 11)]
+
+
+def test_tag_lines_inside_comments_do_not_start_a_game():
+    dump = (
+        b'[Event "one"]\n\n1. e4 { clock\n[%clk 0:03:00]\nstill the comment } e5 ; [not a tag] {\n'
+        b'2. Nf3 *\n\n[Event "two"]\n\n1. d4 *\n'
+    )
+    texts = [pgn_extract.decode(dump, lo, hi) for lo, hi in pgn_extract.game_ranges(dump)]
+    assert [t.split("\n", 1)[0] for t in texts] == ['[Event "one"]', '[Event "two"]']
+    assert "2. Nf3 *" in texts[0]
+
+
+def test_read_games_maps_the_file_and_parses_lazily(tmp_path):
+    dump = tmp_path / "dump.pgn"
+    dump.write_bytes(DUMP)
+    games = pgn_extract.read_games(str(dump))
+    index, first = next(games)
+    assert (index, first.headers["Event"]) == (0, "one")
+    assert [(i, g.headers["Event"]) for i, g in games] == [(1, "two"), (2, "three")]
+
+    log = tmp_path / "lichess_bot_game_x.log"
+    log.write_bytes(LOG)
+    assert [g.headers["White"] for _, g in pgn_extract.read_games(str(log))] == ["A"]
+    empty = tmp_path / "empty.log"
+    empty.write_bytes(b"")
+    assert list(pgn_extract.read_games(str(empty))) == [(0, None)]
@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import chess
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from positions import count_duplicates, position_key  # noqa: E402
+
+
+def test_key_ignores_move_counters_and_transpositions():
+    a = chess.Board()
+    for san in ("e4", "e5", "Nf3"):
+        a.push_san(san)
+    b = chess.Board()
+    for san in ("Nf3", "e5", "e4"):
+        b.push_san(san)
+    assert a.fen() != b.fen()  # en passant square and halfmove clock differ
+    assert position_key(a) == position_key(b) == position_key(b.fen())
+    assert position_key(a.fen().replace(" 1 2", " 0 40")) == position_key(a)
+    assert position_key(chess.Board()) != position_key(a)
+
+
+def test_count_duplicates_keeps_first_item_and_counts():
+    rows = [("x", 1), ("y", 2), ("x", 3)]
+    assert count_duplicates(rows, key=lambda r: r[0]) == [(("x", 1), 2), (("y", 2), 1)]
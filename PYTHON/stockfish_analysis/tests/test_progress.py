@@ -0,0 +1,95 @@
+import io
+import sys
+from itertools import islice
+from pathlib import Path
+
+import chess
+import chess.engine
+import chess.pgn
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import analysis  # noqa: E402
+from progress import ProgressStore, game_key, settings_key  # noqa: E402
+from test_analyze_chess_game import GAME, FakeEngine  # noqa: E402
+
+SITE = '[Site "https://lichess.org/abcd1234"]\n\n'
+
+
+def _game(movetext: str) -> chess.pgn.Game:
+    return chess.pgn.read_game(io.StringIO(SITE + movetext))
+
+
+def _pool(engine):
+    return analysis.EnginePool(engine, chess.engine.Limit(depth=8), multipv=2)
+
+
+def test_rerun_of_a_grown_game_only_analyses_new_plies(tmp_path):
+    store = ProgressStore(str(tmp_path / "progress.sqlite"))
+    full = list(analysis.analyze_game(_pool(FakeEngine()), _game(GAME), reuse=True))
+    partial = _game("1. e4 e5 2. Nf3 Nc6 3. Bc4 Nd4 *")
+
+    list(analysis.analyze_game(_pool(FakeEngine()), partial, reuse=True, progress=store))
+    assert store.saved == 6
+
+    engine = FakeEngine()
+    results = list(analysis.analyze_game(_pool(engine), _game(GAME), reuse=True, progress=store))
+    assert [r.ply for r in results] == list(range(1, 15))
+    assert results[6:] == full[6:]
+    assert store.reused == 6 and len(engine.searches) == 8
+    store.close()
+
+
+def test_interrupted_run_resumes_at_the_last_completed_ply(tmp_path):
+    store = ProgressStore(str(tmp_path / "progress.sqlite"))
+    list(islice(analysis.analyze_game(_pool(FakeEngine()), _game(GAME)), 4))
+    assert store.load(game_key(_game(GAME)), settings_key("full", chess.engine.Limit(depth=8), 2)) == []
+
+    list(islice(analysis.analyze_game(_pool(FakeEngine()), _game(GAME), progress=store), 4))
+    engine = FakeEngine()
+    results = list(analysis.analyze_game(_pool(engine), _game(GAME), progress=store))
+    assert [r.ply for r in results] == list(range(1, 15))
+    assert store.reused == 4 and len(engine.searches) == 3 * 10
+
+    # Other settings do not share progress
+    other = FakeEngine()
+    list(analysis.analyze_game(_pool(other), _game(GAME), reuse=True, progress=store))
+    assert len(other.searches) == 14
+    store.close()
+
+
+def test_stored_plies_are_dropped_when_the_game_differs(tmp_path):
+    store = ProgressStore(str(tmp_path / "progress.sqlite"))
+    list(analysis.analyze_game(_pool(FakeEngine()), _game("1. e4 e5 2. Nf3 Nc6 *"), reuse=True, progress=store))
+    results = list(analysis.analyze_game(_pool(FakeEngine()), _game("1. e4 e5 2. d4 *"), reuse=True, progress=store))
+    assert [r.san for r in results] == ["e4", "e5", "d4"]
+    assert store.reused == 2
+    key, settings = game_key(_game("")), settings_key("reuse", chess.engine.Limit(depth=8), 2)
+    assert [item["san"] for item in store.load(key, settings)] == ["e4", "e5", "d4"]
+    store.close()
+
+
+def test_last_move_only_reuses_a_stored_last_ply(tmp_path):
+    store = ProgressStore(str(tmp_path / "progress.sqlite"))
+    list(analysis.analyze_game(_pool(FakeEngine()), _game(GAME), reuse=True, progress=store))
+    engine = FakeEngine()
+    results = list(analysis.analyze_game(_pool(engine), _game(GAME), reuse=True, last_move_only=True, progress=store))
+    assert [r.san for r in results] == ["Nf3#"] and engine.searches == []
+
+    # A game that grew since: only its new last ply is analysed
+    store = ProgressStore(str(tmp_path / "other.sqlite"))
+    list(analysis.analyze_game(_pool(FakeEngine()), _game("1. e4 e5 2. Nf3 *"), reuse=True, progress=store))
+    engine = FakeEngine()
+    grown = _game("1. e4 e5 2. Nf3 Nc6 3. Bc4 *")
+    results = list(analysis.analyze_game(_pool(engine), grown, reuse=True, last_move_only=True, progress=store))
+    assert [r.ply for r in results] == [5] and len(engine.searches) <= 2
+    store.close()
+
+
+def test_game_key_prefers_the_site_url():
+    assert game_key(_game("1. e4 *")) == "https://lichess.org/abcd1234"
+    a = chess.pgn.read_game(io.StringIO('[White "A"]\n\n1. e4 *'))
+    b = chess.pgn.read_game(io.StringIO('[White "A"]\n\n1. d4 d5 *'))
+    assert game_key(a) == game_key(b) != game_key(chess.pgn.read_game(io.StringIO('[White "B"]\n\n1. e4 *')))
@@ -0,0 +1,133 @@
+import io
+import struct
+import sys
+from pathlib import Path
+
+import chess
+import chess.engine
+import chess.pgn
+import chess.polyglot
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import analysis  # noqa: E402
+from shortcuts import TB_LOSS_CP, TB_WIN_CP, Shortcuts  # noqa: E402
+from stats import summarize_game  # noqa: E402
+from test_analyze_chess_game import GAME, FakeEngine  # noqa: E402
+
+# White: Ke1 Qd1, Black: Ke8 Rd2. 1. Qxd2 Ke7 2. Qd7+?? Kxd7 throws the win away.
+ENDGAME = '[FEN "4k3/8/8/8/8/8/3r4/3QK3 w - - 0 1"]\n\n1. Qxd2 Ke7 2. Qd7+ Kxd7 *'
+
+
+def _game(pgn: str) -> chess.pgn.Game:
+    return chess.pgn.read_game(io.StringIO(pgn))
+
+
+def _pool(engine):
+    return analysis.EnginePool(engine, chess.engine.Limit(depth=8), multipv=2)
+
+
+def _write_book(path, entries):
+    """A Polyglot book from (board, move, weight) entries."""
+    rows = []
+    for board, move, weight in entries:
+        raw = move.to_square | move.from_square << 6 | (move.promotion - 1 if move.promotion else 0) << 12
+        rows.append(struct.pack(">QHHI", chess.polyglot.zobrist_hash(board), raw, weight, 0))
+    path.write_bytes(b"".join(sorted(rows)))
+    return str(path)
+
+
+class FakeTablebase:
+    """Three men or fewer: the side with the queen wins unless it hangs, anything else is a draw."""
+
+    def get_wdl(self, board):
+        if chess.popcount(board.occupied) > 3:
+            return None
+        if board.pieces(chess.QUEEN, board.turn):
+            return 2
+        for square in board.pieces(chess.QUEEN, not board.turn):
+            hanging = board.is_attacked_by(board.turn, square) and not board.is_attacked_by(not board.turn, square)
+            return 0 if hanging else -2
+        return 0
+
+    def get_dtz(self, board):
+        wdl = self.get_wdl(board)
+        return None if wdl is None else wdl * 5
+
+    def close(self):
+        pass
+
+
+def _tablebase_shortcuts():
+    shortcuts = Shortcuts()
+    shortcuts.tablebase = FakeTablebase()
+    return shortcuts
+
+
+@pytest.fixture
+def book(tmp_path):
+    board = chess.Board()
+    e4, d4 = chess.Move.from_uci("e2e4"), chess.Move.from_uci("d2d4")
+    after_e4 = board.copy()
+    after_e4.push(e4)
+    path = _write_book(tmp_path / "book.bin", [
+        (board, e4, 10), (board, d4, 20), (after_e4, chess.Move.from_uci("e7e5"), 5),
+    ])
+    shortcuts = Shortcuts(path)
+    yield shortcuts
+    shortcuts.close()
+
+
+def test_book_moves_are_classified_without_searching(book):
+    engine = FakeEngine()
+    results = list(analysis.analyze_game(_pool(engine), _game(GAME), reuse=True, shortcuts=book))
+    assert [r.classification for r in results[:2]] == ["Book", "Book"]
+    assert results[0].best_san == "d4"  # the book's most played move
+    assert results[0].played_cp is None and results[0].cp_loss is None
+    assert results[2].classification != "Book"
+    assert len(engine.searches) == 12
+    assert (book.book_plies, book.tablebase_plies, book.calls_saved) == (2, 0, 2)
+    assert summarize_game(results)["W"].classes["Book"] == 1
+
+
+def test_engine_results_after_the_book_are_unchanged(book):
+    plain = list(analysis.analyze_game(_pool(FakeEngine()), _game(GAME)))
+    with_book = list(analysis.analyze_game(_pool(FakeEngine()), _game(GAME), shortcuts=book))
+    assert with_book[2:] == plain[2:]
+    assert book.calls_saved == 6  # three searches per ply in full mode
+
+
+def test_tablebase_plies_use_the_exact_outcome():
+    shortcuts = _tablebase_shortcuts()
+    engine = FakeEngine()
+    results = list(analysis.analyze_game(_pool(engine), _game(ENDGAME), reuse=True, shortcuts=shortcuts))
+    assert [r.san for r in results] == ["Qxd2", "Ke7", "Qd7+", "Kxd7"]
+    assert {fen for fen, _ in engine.searches} == {results[0].fen}  # only the four-piece position
+    assert [r.classification for r in results[1:]] == ["Best", "Blunder", "Best"]
+    blunder = results[2]
+    assert (blunder.played_cp, blunder.best_cp, blunder.cp_loss) == (0, TB_WIN_CP, TB_LOSS_CP)
+    assert blunder.best_san != "Qd7+"
+    assert results[1].played_cp == -TB_WIN_CP
+    assert shortcuts.tablebase_plies == 3
+    assert "3 tablebase plies" in shortcuts.summary()
+
+
+def test_tablebase_wins_past_the_fifty_move_rule_are_draws():
+    # After Ke7 the queen's win (DTZ 5) no longer fits in the 4 plies left
+    # before the 50-move rule, so throwing it away with Qd7+ gives up nothing
+    pgn = '[FEN "4k3/8/8/8/8/8/8/3QK3 b - - 95 60"]\n\n60... Ke7 61. Qd7+ Kxd7 *'
+    results = list(analysis.analyze_game(_pool(FakeEngine()), _game(pgn), reuse=True,
+                                         shortcuts=_tablebase_shortcuts()))
+    assert [r.classification for r in results] == ["Best", "Best", "Best"]
+    assert (results[1].played_cp, results[1].best_cp, results[1].cp_loss) == (0, 0, 0)
+
+
+def test_last_move_only_skips_the_engine_in_the_tablebase():
+    engine = FakeEngine()
+    results = list(analysis.analyze_game(_pool(engine), _game(ENDGAME), last_move_only=True,
+                                         shortcuts=_tablebase_shortcuts()))
+    assert [r.san for r in results] == ["Kxd7"]
+    assert engine.searches == []
@@ -0,0 +1,62 @@
+import json
+import sys
+from pathlib import Path
+
+import chess.engine
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import aggregate_results  # noqa: E402
+import analysis  # noqa: E402
+import stats  # noqa: E402
+from test_analyze_chess_game import GAME, FakeEngine  # noqa: E402
+
+
+def test_move_scores_cap_losses_and_count_mates_as_wins():
+    loss, accuracy = stats.move_scores([30, 200, None, None], [None, None, 3, None],
+                                       [30, -900, None, 20], [None, None, -2, None])
+    assert loss[0] == 0 and accuracy[0] == pytest.approx(100, abs=0.01)
+    assert loss[1] == 1000 and loss[2] == 1000  # capped, including a mate turned into being mated
+    assert np.isnan(loss[3]) and np.isnan(accuracy[3])
+    _, graded = stats.move_scores([0, 0, 0], [None] * 3, [-50, -200, -2000], [None] * 3)
+    assert 100 > graded[0] > graded[1] > graded[2] >= 0
+    assert stats.win_percent(np.array([0.0]))[0] == 50
+
+
+def test_game_summary_per_side():
+    results = list(analysis.analyze_pgn(GAME, FakeEngine(), chess.engine.Limit(depth=8), reuse=True))
+    summary = stats.summarize_game(results)
+    white, black = summary["W"], summary["B"]
+    assert (white.games, white.moves, black.moves) == (1, 7, 7)
+    assert sum(white.classes.values()) == 7
+    expected = np.mean([min(r.cp_loss, stats.LOSS_CAP) for r in results if r.side == "W" and r.cp_loss is not None])
+    assert white.acpl == pytest.approx(expected)
+    assert summary == stats.summarize_game([json.loads(json.dumps(vars(r))) for r in results])
+
+
+def test_aggregate_batch_results_per_player(tmp_path):
+    def ply(n, best, played, cls):
+        return {"ply": n, "side": "W" if n % 2 else "B", "best_cp": best, "best_mate": None,
+                "played_cp": played, "played_mate": None, "classification": cls}
+
+    plies = [ply(1, 20, 20, "Best"), ply(2, 0, -100, "Mistake"), ply(3, 50, 50, "Best")]
+    lines = [
+        {"game": "a#0", "headers": {"White": "alice", "Black": "bob"}, "plies": plies[:1]},
+        {"game": "a#0", "headers": {"White": "alice", "Black": "bob"}, "plies": plies},  # rerun replaces it
+        {"game": "b#0", "headers": {"White": "bob", "Black": "carol"}, "plies": plies},
+        {"game": "c#0", "error": "Could not locate PGN text in the file."},
+    ]
+    out = tmp_path / "results.jsonl"
+    out.write_text("\n".join(json.dumps(r) for r in lines) + "\n{\"truncated\n")
+
+    records = list(aggregate_results.iter_records([str(out)]))
+    rows = dict(aggregate_results.player_stats(records))
+    assert [len(records), rows["bob"].games, rows["bob"].moves] == [2, 2, 3]
+    assert rows["alice"].acpl == 0 and rows["carol"].acpl == 100
+    assert rows["bob"].classes["Mistake"] == 1 and rows["bob"].acpl == pytest.approx(100 / 3)
+    sides = dict(aggregate_results.player_stats(records, by="side"))
+    assert (sides["White"].moves, sides["Black"].moves) == (4, 2)
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import chess.engine
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tuning  # noqa: E402
+from tuning import Trial  # noqa: E402
+
+
+class BenchEngine:
+    """Pretends more threads help up to 4 and that hash does not matter."""
+
+    options = {"Threads": None, "Hash": None, "Clear Hash": None}
+
+    def __init__(self):
+        self.configured = []
+        self.threads = 1
+
+    def configure(self, options):
+        self.configured.append(dict(options))
+        self.threads = options.get("Threads", self.threads)
+
+    def analyse(self, board, limit, multipv=1):
+        assert limit.depth == 9
+        return [{"score": chess.engine.PovScore(chess.engine.Cp(0), board.turn), "nodes": 1000 * min(self.threads, 4)}]
+
+
+def test_candidates():
+    assert tuning.candidate_threads(1) == [1]
+    assert tuning.candidate_threads(6) == [1, 2, 4, 6]
+    assert tuning.candidate_threads(8) == [1, 2, 4, 8]
+    assert tuning.candidate_hash(512) == [16, 64]
+
+
+def test_trial_clears_hash_before_every_position():
+    engine = BenchEngine()
+    trial = tuning.run_trial(engine, tuning.BENCH_FENS[:3], 9, threads=4, hash_mb=64, multipv=2)
+    assert engine.configured[0] == {"Threads": 4, "Hash": 64}
+    assert engine.configured[1:] == [{"Clear Hash": None}] * 3
+    assert trial.nodes == 3 * 4000 and trial.nps > 0
+
+
+def test_winners_are_saved_and_loaded_per_machine(tmp_path, monkeypatch):
+    monkeypatch.setenv(tuning.PROFILE_ENV, str(tmp_path / "profile.json"))
+    trials = [
+        Trial(1, 16, 1, 2.0, 100),
+        Trial(4, 64, 1, 0.8, 100),
+        Trial(2, 16, 3, 1.5, 100),
+        Trial(4, 16, 3, 1.9, 100),
+    ]
+    best = tuning.winners(trials)
+    assert (best[1].threads, best[3].threads) == (4, 2)
+
+    key = tuning.machine_key("stockfish", 8)
+    tuning.save_profile(key, best, depth=12)
+    tuning.save_profile("other-host|cpus=2|/usr/bin/stockfish", {1: Trial(2, 16, 1, 1.0, 1)}, depth=12)
+    assert tuning.load_profile(key, multipv=1) == (4, 64)
+    assert tuning.load_profile(key, multipv=2) == (4, 64)  # closest measured MultiPV, lower on ties
+    assert tuning.load_profile(key, multipv=5) == (2, 16)
+    assert tuning.load_profile(tuning.machine_key("stockfish", 4), multipv=1) is None
@@ -0,0 +1,153 @@
+"""
+Benchmark engine options on this machine and remember the fastest ones.
+
+``--tune`` in analyze_chess_game.py searches a fixed set of positions to a
+fixed depth for every combination of Threads, Hash and MultiPV, measuring
+nodes/sec and time-to-depth. For each MultiPV the Threads/Hash pair with the
+lowest total time-to-depth wins. Winners are saved in a JSON profile keyed by
+machine (host name and usable CPUs) and engine binary; later runs that leave
+``--threads``/``--hash-mb`` on auto use them.
+
+The profile lives in ``~/.cache/stockfish_analysis/tuning.json`` unless
+``STOCKFISH_TUNING_PROFILE`` points elsewhere.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import socket
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import chess
+import chess.engine
+
+PROFILE_ENV = "STOCKFISH_TUNING_PROFILE"
+DEFAULT_PROFILE = os.path.join(os.path.expanduser("~"), ".cache", "stockfish_analysis", "tuning.json")
+
+# Opening, middlegame and endgame positions of different character
+BENCH_FENS = (
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/3P1B2/2PBPN2/PP1N1PPP/R2QK2R w KQ - 5 9",
+    "2r2rk1/1bqnbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 14",
+    "8/5pk1/6p1/3P4/2p2P2/6P1/5K2/8 w - - 0 45",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 30",
+)
+
+
+@dataclass
+class Trial:
+    threads: int
+    hash_mb: int
+    multipv: int
+    seconds: float  # total time-to-depth over the position set
+    nodes: int
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+
+def profile_path() -> str:
+    return os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE
+
+
+def machine_key(engine_path: str, cpus: int) -> str:
+    binary = shutil.which(engine_path) or engine_path
+    return f"{socket.gethostname()}|cpus={cpus}|{os.path.realpath(binary)}"
+
+
+def candidate_threads(max_threads: int) -> List[int]:
+    """1, 2, 4, ... up to and including ``max_threads``."""
+    out, n = [], 1
+    while n < max_threads:
+        out.append(n)
+        n *= 2
+    out.append(max(1, max_threads))
+    return out
+
+
+def candidate_hash(total_mem_mb: Optional[int]) -> List[int]:
+    """A few sizes from small to a quarter of RAM; short searches rarely need more."""
+    cap = max(64, (total_mem_mb or 2048) // 4)
+    return [mb for mb in (16, 64, 256, 1024) if mb <= cap] or [16]
+
+
+def run_trial(engine, fens: Iterable[str], depth: int, threads: int, hash_mb: int, multipv: int) -> Trial:
+    """Search every position to ``depth`` with a cleared hash and return the totals."""
+    engine.configure({"Threads": threads, "Hash": hash_mb})
+    seconds, nodes = 0.0, 0
+    for fen in fens:
+        if "Clear Hash" in engine.options:
+            engine.configure({"Clear Hash": None})
+        board = chess.Board(fen)
+        t0 = time.perf_counter()
+        info = engine.analyse(board, chess.engine.Limit(depth=depth), multipv=multipv)
+        seconds += time.perf_counter() - t0
+        first = info[0] if isinstance(info, list) else info
+        nodes += int(first.get("nodes", 0))
+    return Trial(threads, hash_mb, multipv, seconds, nodes)
+
+
+def tune(engine, threads: List[int], hashes: List[int], multipvs: List[int], depth: int,
+         fens: Iterable[str] = BENCH_FENS, progress=None) -> List[Trial]:
+    fens = list(fens)
+    trials = []
+    for multipv in multipvs:
+        for t in threads:
+            for h in hashes:
+                trial = run_trial(engine, fens, depth, t, h, multipv)
+                trials.append(trial)
+                if progress is not None:
+                    progress(trial)
+    return trials
+
+
+def winners(trials: List[Trial]) -> Dict[int, Trial]:
+    """Fastest Threads/Hash per MultiPV."""
+    best: Dict[int, Trial] = {}
+    for trial in trials:
+        if trial.multipv not in best or trial.seconds < best[trial.multipv].seconds:
+            best[trial.multipv] = trial
+    return best
+
+
+def _read(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_profile(key: str, best: Dict[int, Trial], depth: int, path: Optional[str] = None) -> str:
+    path = path or profile_path()
+    data = _read(path)
+    data[key] = {
+        "depth": depth,
+        "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "by_multipv": {
+            str(mpv): {"threads": t.threads, "hash_mb": t.hash_mb, "seconds": round(t.seconds, 4), "nps": int(t.nps)}
+            for mpv, t in sorted(best.items())
+        },
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+    return path
+
+
+def load_profile(key: str, multipv: int, path: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """(threads, hash_mb) tuned for this machine/engine, using the closest MultiPV measured."""
+    entry = _read(path or profile_path()).get(key)
+    if not entry or not entry.get("by_multipv"):
+        return None
+    measured = {int(k): v for k, v in entry["by_multipv"].items()}
+    nearest = min(measured, key=lambda m: (abs(m - multipv), m))
+    return int(measured[nearest]["threads"]), int(measured[nearest]["hash_mb"])